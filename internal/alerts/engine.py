@@ -0,0 +1,300 @@
+import asyncio
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncGenerator, AsyncIterator, Awaitable, Callable
+
+import numpy as np
+import structlog
+from pydantic import BaseModel
+from tortoise.expressions import Q
+from tortoise.functions import Min
+
+from internal.db.models import Customers, Subscriptions
+from internal.nooa.aurora_snapshot import AuroraSnapshot, ovation_feed
+from internal.nooa.calc import nooa_cells
+from internal.nooa.grid import AuroraGrid
+from internal.settings import ALERT_BATCH_SIZE, ALERT_COOLDOWN
+
+logger = structlog.stdlib.get_logger(__name__)
+
+# Размер списка ячеек в одном запросе (лимит параметров SQL)
+CELLS_PER_QUERY = 500
+
+# Подписка вместе с координатами клиента одним запросом
+SUBSCRIBER_FIELDS = (
+    "id",
+    "cust_id",
+    "email",
+    "alert_probability",
+    "geo_push_type",
+    "cust__selected_geo_lat",
+    "cust__selected_geo_long",
+    "cust__current_geo_lat",
+    "cust__current_geo_long",
+)
+
+
+class AlertEvent(BaseModel):
+    subscription_id: uuid.UUID
+    cust_id: int
+    email: str
+    probability: int
+    alert_probability: int
+    lat: float
+    lon: float
+    forecast_time: datetime
+
+
+AlertSink = Callable[[list[AlertEvent]], Awaitable[None]]
+
+
+def hot_cells(grid: AuroraGrid, threshold: int) -> np.ndarray:
+    """Ячейки сетки с вероятностью не ниже порога"""
+    # Порядок хранения сетки совпадает с индексом ячейки `grid_index`
+    return np.flatnonzero(grid.array.reshape(-1) >= threshold)
+
+
+def in_cells(cells: list[int]) -> Q:
+    """Подписки, координаты оповещения которых попадают в ячейки"""
+    return (
+        Q(geo_push_type="SELECTED", cust__selected_cell__in=cells)
+        | Q(geo_push_type="CURRENT", cust__current_cell__in=cells)
+        | Q(
+            geo_push_type="CURRENT",
+            cust__current_cell__isnull=True,
+            cust__selected_cell__in=cells,
+        )
+    )
+
+
+async def min_threshold() -> int | None:
+    rows = (
+        await Subscriptions.filter(active=True)
+        .annotate(threshold=Min("alert_probability"))
+        .values("threshold")
+    )
+    return rows[0]["threshold"] if rows else None
+
+
+async def stream_subscribers(
+    batch_size: int = ALERT_BATCH_SIZE,
+    cells: np.ndarray | None = None,
+) -> AsyncIterator[list[dict[str, Any]]]:
+    """Активные подписки пачками, по возрастанию id (keyset, без OFFSET)
+
+    Если переданы `cells`, то только подписки в этих ячейках сетки
+    """
+    if cells is None:
+        filters = [Q(active=True)]
+    else:
+        filters = [
+            Q(active=True)
+            & in_cells([int(c) for c in cells[i : i + CELLS_PER_QUERY]])
+            for i in range(0, len(cells), CELLS_PER_QUERY)
+        ]
+    for where in filters:
+        last_id: uuid.UUID | None = None
+        while True:
+            query = Subscriptions.filter(where)
+            if last_id is not None:
+                query = query.filter(id__gt=last_id)
+            rows = (
+                await query.order_by("id")
+                .limit(batch_size)
+                .values(*SUBSCRIBER_FIELDS)
+            )
+            if not rows:
+                break
+            yield rows
+            if len(rows) < batch_size:
+                break
+            last_id = rows[-1]["id"]
+
+
+async def backfill_cells(batch_size: int = 1000) -> int:
+    """Ячейки для клиентов, созданных до появления колонок"""
+    total = 0
+    while True:
+        customers = await Customers.filter(selected_cell__isnull=True).limit(
+            batch_size
+        )
+        if not customers:
+            return total
+        for customer in customers:
+            customer.update_cells()
+        await Customers.bulk_update(
+            customers, fields=["selected_cell", "current_cell"]
+        )
+        total += len(customers)
+
+
+def _column(rows: list[dict[str, Any]], name: str) -> np.ndarray:
+    # None превращается в nan
+    return np.array([row[name] for row in rows], dtype=np.float64)
+
+
+def subscriber_coordinates(
+    rows: list[dict[str, Any]],
+) -> tuple[np.ndarray, np.ndarray]:
+    """Координаты для оповещения: текущие для CURRENT, если они известны"""
+    selected_lat = _column(rows, "cust__selected_geo_lat")
+    selected_lon = _column(rows, "cust__selected_geo_long")
+    current_lat = _column(rows, "cust__current_geo_lat")
+    current_lon = _column(rows, "cust__current_geo_long")
+    push_current = np.array([row["geo_push_type"] == "CURRENT" for row in rows])
+    use_current = push_current & ~np.isnan(current_lat) & ~np.isnan(current_lon)
+    return (
+        np.where(use_current, current_lat, selected_lat),
+        np.where(use_current, current_lon, selected_lon),
+    )
+
+
+class AlertEngine:
+    """Проверка порогов всех активных подписок на каждой новой карте OVATION
+
+    Оповещение отправляется не чаще раза в `cooldown` секунд на подписку
+    и не больше одного раза на время прогноза. `_sent` - быстрый фильтр
+    одного процесса, отметка ставится только после успешной передачи
+    во все `sinks`; между процессами и после перезапуска повторы
+    отсекает очередь `outbox` по той же таблице
+    """
+
+    def __init__(
+        self,
+        batch_size: int = ALERT_BATCH_SIZE,
+        cooldown: float = ALERT_COOLDOWN,
+    ):
+        self.batch_size = batch_size
+        self.cooldown = cooldown
+        self.sinks: list[AlertSink] = []
+        # subscription id -> (время отправки, время прогноза)
+        self._sent: dict[uuid.UUID, tuple[float, datetime]] = {}
+        self._pending: AuroraSnapshot | None = None
+        self._wakeup = asyncio.Event()
+
+    def add_sink(self, sink: AlertSink):
+        self.sinks.append(sink)
+
+    def select(
+        self,
+        rows: list[dict[str, Any]],
+        grid: AuroraGrid,
+        forecast_time: datetime,
+        now: float | None = None,
+    ) -> list[AlertEvent]:
+        """Подписки из пачки, для которых порог превышен"""
+        if not rows:
+            return []
+        now = time.monotonic() if now is None else now
+        lats, lons = subscriber_coordinates(rows)
+        nooa_lons, nooa_lats = nooa_cells(lats, lons)
+        probabilities = grid.get_many(nooa_lons, nooa_lats)
+        # Нулевой порог не должен означать оповещение на каждой карте
+        thresholds = np.array(
+            [row["alert_probability"] for row in rows], dtype=np.int32
+        )
+        over = np.flatnonzero(probabilities >= np.maximum(thresholds, 1))
+
+        events = []
+        for i in over:
+            row = rows[i]
+            sent = self._sent.get(row["id"])
+            if sent is not None:
+                sent_at, sent_forecast = sent
+                if (
+                    sent_forecast == forecast_time
+                    or now - sent_at < self.cooldown
+                ):
+                    continue
+            events.append(
+                AlertEvent(
+                    subscription_id=row["id"],
+                    cust_id=row["cust_id"],
+                    email=row["email"],
+                    probability=int(probabilities[i]),
+                    alert_probability=row["alert_probability"],
+                    lat=float(lats[i]),
+                    lon=float(lons[i]),
+                    forecast_time=forecast_time,
+                )
+            )
+        return events
+
+    def mark_sent(self, events: list[AlertEvent], now: float | None = None):
+        now = time.monotonic() if now is None else now
+        for event in events:
+            self._sent[event.subscription_id] = (now, event.forecast_time)
+
+    def _expire(self, now: float):
+        self._sent = {
+            key: sent
+            for key, sent in self._sent.items()
+            if now - sent[0] < self.cooldown
+        }
+
+    async def evaluate(self, snapshot: AuroraSnapshot) -> int:
+        """Один проход по всем подпискам, возвращает число оповещений"""
+        started = time.monotonic()
+        forecast_time = snapshot.res.Forecast_Time
+        total = 0
+        subscribers = 0
+        threshold = await min_threshold()
+        if threshold is None:
+            return 0
+        # Обходим только ячейки, где порог может быть превышен
+        cells = hot_cells(snapshot.grid, max(threshold, 1))
+        async for rows in stream_subscribers(self.batch_size, cells):
+            subscribers += len(rows)
+            now = time.monotonic()
+            events = self.select(rows, snapshot.grid, forecast_time, now)
+            if not events:
+                continue
+            try:
+                for sink in self.sinks:
+                    await sink(events)
+            except Exception:
+                # Не отмечены как отправленные: повтор на следующей карте
+                logger.exception(f"Failed to pass {len(events)} alerts")
+                continue
+            self.mark_sent(events, now)
+            total += len(events)
+        self._expire(time.monotonic())
+        logger.info(
+            f"Evaluated {subscribers} subscriptions, {total} alerts",
+            version=snapshot.version,
+            cells=len(cells),
+            duration=round(time.monotonic() - started, 3),
+        )
+        return total
+
+    async def on_snapshot(self, snapshot: AuroraSnapshot):
+        # Проверка идёт в фоне, обновление источника её не ждёт
+        self._pending = snapshot
+        self._wakeup.set()
+
+    async def run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            snapshot, self._pending = self._pending, None
+            if snapshot is None:
+                continue
+            try:
+                await self.evaluate(snapshot)
+            except Exception:
+                logger.exception("Alert evaluation failed")
+
+    @asynccontextmanager
+    async def running(self) -> AsyncGenerator[None, None]:
+        task = asyncio.create_task(self.run())
+        try:
+            yield
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+alert_engine = AlertEngine()
+ovation_feed.subscribe(alert_engine.on_snapshot)
@@ -0,0 +1,217 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from typing import AsyncGenerator
+
+import structlog
+from tortoise import timezone
+from tortoise.expressions import F
+from tortoise.transactions import in_transaction
+
+from internal.alerts.engine import AlertEvent, alert_engine
+from internal.alerts.transport import AlertMessage, Transport, create_transport
+from internal.db.models import AlertOutbox
+from internal.settings import (
+    ALERT_COOLDOWN,
+    ALERT_MAX_ATTEMPTS,
+    ALERT_SEND_RATE,
+    ALERT_WORKERS,
+)
+
+logger = structlog.stdlib.get_logger(__name__)
+
+PENDING = "PENDING"
+SENT = "SENT"
+FAILED = "FAILED"
+
+
+def alert_message(row: AlertOutbox) -> AlertMessage:
+    return AlertMessage(
+        email=row.email,
+        subject=f"Северное сияние: вероятность {row.probability}%",
+        text=(
+            f"Вероятность северного сияния в точке "
+            f"{row.lat:.1f}, {row.long:.1f} достигла {row.probability}% "
+            f"(прогноз OVATION на {row.forecast_time:%Y-%m-%d %H:%M} UTC)."
+        ),
+    )
+
+
+def backoff(attempts: int, base: float = 30, limit: float = 3600) -> float:
+    """Пауза перед повтором: 30 с, 1 мин, 2 мин, ... но не больше часа"""
+    return min(base * 2 ** (attempts - 1), limit)
+
+
+class RateLimiter:
+    """Не больше `rate` отправок в секунду на все обработчики"""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate
+        self._next = 0.0
+
+    async def acquire(self):
+        now = time.monotonic()
+        wait = self._next - now
+        self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class Outbox:
+    """Очередь оповещений в таблице `alert_outbox` и обработчики доставки
+
+    Запись появляется один раз на подписку и время прогноза, поэтому
+    повторная проверка той же карты не создаёт новых писем, и не чаще раза
+    в `cooldown` секунд на подписку - это общее для всех процессов и
+    перезапусков ограничение, в отличие от памяти `AlertEngine`. Выбранные
+    записи получают аренду `lease` секунд: если процесс упадёт во время
+    отправки, они будут выбраны снова
+    """
+
+    def __init__(
+        self,
+        transport: Transport,
+        workers: int = ALERT_WORKERS,
+        rate: float = ALERT_SEND_RATE,
+        max_attempts: int = ALERT_MAX_ATTEMPTS,
+        cooldown: float = ALERT_COOLDOWN,
+        batch_size: int = 100,
+        lease: float = 300,
+        poll_interval: float = 30,
+    ):
+        self.transport = transport
+        self.workers = workers
+        self.limiter = RateLimiter(rate)
+        self.max_attempts = max_attempts
+        self.cooldown = cooldown
+        self.batch_size = batch_size
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self._wakeup = asyncio.Event()
+
+    async def enqueue(self, events: list[AlertEvent]):
+        now = timezone.now()
+        # Подписки, оповещение для которых уже поставлено в очередь
+        # внутри cooldown (в том числе другим процессом)
+        recent = set(
+            await AlertOutbox.filter(
+                subscription_id__in=[e.subscription_id for e in events],
+                created_at__gte=now - timedelta(seconds=self.cooldown),
+            ).values_list("subscription_id", flat=True)
+        )
+        events = [e for e in events if e.subscription_id not in recent]
+        if not events:
+            return
+        await AlertOutbox.bulk_create(
+            [
+                AlertOutbox(
+                    subscription_id=e.subscription_id,
+                    email=e.email,
+                    probability=e.probability,
+                    lat=e.lat,
+                    long=e.lon,
+                    forecast_time=e.forecast_time,
+                    next_attempt_at=now,
+                )
+                for e in events
+            ],
+            ignore_conflicts=True,
+        )
+        self._wakeup.set()
+
+    async def claim(self) -> list[AlertOutbox]:
+        """Записи, готовые к отправке, с арендой на время доставки"""
+        now = timezone.now()
+        async with in_transaction("default"):
+            rows = (
+                await AlertOutbox.filter(
+                    status=PENDING, next_attempt_at__lte=now
+                )
+                .order_by("next_attempt_at")
+                .limit(self.batch_size)
+                .select_for_update(skip_locked=True)
+            )
+            if rows:
+                await AlertOutbox.filter(id__in=[r.id for r in rows]).update(
+                    attempts=F("attempts") + 1,
+                    next_attempt_at=now + timedelta(seconds=self.lease),
+                )
+        for row in rows:
+            row.attempts += 1
+        return rows
+
+    async def _deliver(
+        self, row: AlertOutbox, semaphore: asyncio.Semaphore
+    ) -> str | None:
+        async with semaphore:
+            await self.limiter.acquire()
+            try:
+                await self.transport.send(alert_message(row))
+            except Exception as e:
+                return repr(e)
+        return None
+
+    async def drain(self) -> int:
+        """Отправка одной пачки, возвращает число выбранных записей"""
+        rows = await self.claim()
+        if not rows:
+            return 0
+        semaphore = asyncio.Semaphore(self.workers)
+        errors = await asyncio.gather(
+            *(self._deliver(row, semaphore) for row in rows)
+        )
+
+        now = timezone.now()
+        sent = [row.id for row, error in zip(rows, errors) if error is None]
+        if sent:
+            await AlertOutbox.filter(id__in=sent).update(
+                status=SENT, sent_at=now, last_error=None
+            )
+        for row, error in zip(rows, errors):
+            if error is None:
+                continue
+            if row.attempts >= self.max_attempts:
+                logger.warning(
+                    f"Alert {row.id} failed after {row.attempts} attempts",
+                    error=error,
+                )
+                await AlertOutbox.filter(id=row.id).update(
+                    status=FAILED, last_error=error
+                )
+            else:
+                await AlertOutbox.filter(id=row.id).update(
+                    next_attempt_at=now
+                    + timedelta(seconds=backoff(row.attempts)),
+                    last_error=error,
+                )
+        return len(rows)
+
+    async def run(self):
+        while True:
+            try:
+                if await self.drain():
+                    continue
+            except Exception:
+                logger.exception("Alert delivery failed")
+            # Новые записи будят обработчик сразу, повторы - по таймеру
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), timeout=self.poll_interval
+                )
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    @asynccontextmanager
+    async def running(self) -> AsyncGenerator[None, None]:
+        task = asyncio.create_task(self.run())
+        try:
+            yield
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+outbox = Outbox(create_transport())
+alert_engine.add_sink(outbox.enqueue)
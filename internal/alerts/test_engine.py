@@ -0,0 +1,151 @@
+import asyncio
+import json
+from typing import Awaitable, Callable, TypeVar
+
+import numpy as np
+from tortoise import Tortoise
+
+from internal.db.models import Customers, Subscriptions
+from internal.db.testing import init_test_db
+from internal.nooa.aurora_snapshot import AuroraSnapshot
+from internal.nooa.grid import nooa_cell
+
+from .engine import AlertEngine, AlertEvent, backfill_cells, stream_subscribers
+
+T = TypeVar("T")
+
+
+def make_snapshot(forecast: str) -> AuroraSnapshot:
+    raw = json.dumps(
+        {
+            "Observation Time": "2025-01-11T15:06:00Z",
+            "Forecast Time": forecast,
+            "Data Format": "[Longitude, Latitude, Aurora]",
+            "coordinates": [[213, 69, 42]],
+        }
+    ).encode()
+    return AuroraSnapshot(forecast, raw)
+
+
+async def create_subscriptions():
+    murmansk = await Customers.create(
+        selected_geo_lat=68.9, selected_geo_long=33.1
+    )
+    travelling = await Customers.create(
+        selected_geo_lat=68.9,
+        selected_geo_long=33.1,
+        current_geo_lat=55.8,
+        current_geo_long=37.6,
+    )
+    for i, (cust, threshold, push_type, active) in enumerate(
+        [
+            (murmansk, 40, "SELECTED", True),
+            (travelling, 10, "CURRENT", True),
+            (murmansk, 50, "CURRENT", True),
+            (murmansk, 10, "SELECTED", False),
+            (travelling, 30, "SELECTED", True),
+        ]
+    ):
+        await Subscriptions.create(
+            cust=cust,
+            email=f"user{i}@example.com",
+            cust_name="user",
+            alert_probability=threshold,
+            sub_type=1,
+            geo_push_type=push_type,
+            active=active,
+        )
+
+
+async def with_db(test: Callable[[], Awaitable[T]]) -> T:
+    await init_test_db()
+    try:
+        await create_subscriptions()
+        return await test()
+    finally:
+        await Tortoise.close_connections()
+
+
+async def run_engine() -> list[list[AlertEvent]]:
+    engine = AlertEngine(batch_size=2)
+    sent: list[AlertEvent] = []
+
+    async def sink(events: list[AlertEvent]):
+        sent.extend(events)
+
+    engine.add_sink(sink)
+    first = make_snapshot("2025-01-11T16:06:00Z")
+    await engine.evaluate(first)
+    rounds = [sent.copy()]
+    # Та же карта и новая карта внутри cooldown
+    await engine.evaluate(first)
+    await engine.evaluate(make_snapshot("2025-01-11T16:11:00Z"))
+    rounds.append(sent[len(rounds[0]) :])
+    engine.cooldown = 0
+    await engine.evaluate(make_snapshot("2025-01-11T16:16:00Z"))
+    rounds.append(sent[len(rounds[0]) :])
+    return rounds
+
+
+def test_alert_engine():
+    first, repeated, after_cooldown = asyncio.run(with_db(run_engine))
+    assert sorted(e.email for e in first) == [
+        "user0@example.com",
+        "user4@example.com",
+    ]
+    assert {e.probability for e in first} == {42}
+    assert repeated == []
+    assert len(after_cooldown) == 2
+
+
+def test_alert_engine_retries_failed_sink():
+    async def test():
+        engine = AlertEngine()
+        sent: list[AlertEvent] = []
+
+        async def sink(events: list[AlertEvent]):
+            if not sent:
+                sent.append(events[0])
+                raise ConnectionError("db is down")
+            sent.extend(events)
+
+        engine.add_sink(sink)
+        snapshot = make_snapshot("2025-01-11T16:06:00Z")
+        assert await engine.evaluate(snapshot) == 0
+        # Неудачная передача не подавляет оповещения той же карты
+        assert await engine.evaluate(snapshot) == 2
+        assert await engine.evaluate(snapshot) == 0
+        return sent
+
+    assert len(asyncio.run(with_db(test))) == 3
+
+
+def test_subscribers_by_cells():
+    async def test():
+        murmansk = np.array([nooa_cell(68.9, 33.1)])
+        emails = [
+            row["email"]
+            async for rows in stream_subscribers(2, murmansk)
+            for row in rows
+        ]
+        await Customers.all().update(selected_cell=None, current_cell=None)
+        backfilled = await backfill_cells()
+        cells = (
+            await Customers.all()
+            .order_by("id")
+            .values_list("selected_cell", "current_cell")
+        )
+        return emails, backfilled, cells
+
+    emails, backfilled, cells = asyncio.run(with_db(test))
+    # user1 сейчас в Москве, user3 неактивна
+    assert sorted(emails) == [
+        "user0@example.com",
+        "user2@example.com",
+        "user4@example.com",
+    ]
+    assert backfilled == 2
+    assert cells == [
+        (nooa_cell(68.9, 33.1), None),
+        (nooa_cell(68.9, 33.1), nooa_cell(55.8, 37.6)),
+    ]
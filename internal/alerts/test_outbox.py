@@ -0,0 +1,105 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from tortoise import Tortoise
+
+from internal.db.models import AlertOutbox, Customers, Subscriptions
+from internal.db.testing import init_test_db
+
+from .engine import AlertEvent
+from .outbox import FAILED, SENT, Outbox, backoff
+from .transport import AlertMessage, FileTransport
+
+FORECAST = datetime(2025, 1, 11, 16, 6, tzinfo=timezone.utc)
+
+
+class BrokenTransport:
+    async def send(self, message: AlertMessage):
+        raise ConnectionError("smtp is down")
+
+
+async def with_db(test):
+    await init_test_db()
+    try:
+        cust = await Customers.create(
+            selected_geo_lat=68.9, selected_geo_long=33.1
+        )
+        sub = await Subscriptions.create(
+            cust=cust,
+            email="user@example.com",
+            cust_name="user",
+            alert_probability=40,
+            sub_type=1,
+            geo_push_type="SELECTED",
+            active=True,
+        )
+        event = AlertEvent(
+            subscription_id=sub.id,
+            cust_id=cust.id,
+            email=sub.email,
+            probability=42,
+            alert_probability=40,
+            lat=68.9,
+            lon=33.1,
+            forecast_time=FORECAST,
+        )
+        return await test(event)
+    finally:
+        await Tortoise.close_connections()
+
+
+def test_outbox_delivers_once(tmp_path: Path):
+    path = tmp_path / "alerts.ndjson"
+
+    async def test(event: AlertEvent):
+        outbox = Outbox(FileTransport(path), rate=1000)
+        await outbox.enqueue([event])
+        await outbox.enqueue([event])
+        assert await outbox.drain() == 1
+        assert await outbox.drain() == 0
+        return await AlertOutbox.all()
+
+    (row,) = asyncio.run(with_db(test))
+    assert row.status == SENT
+    assert row.attempts == 1
+    (line,) = path.read_text().splitlines()
+    assert json.loads(line)["email"] == "user@example.com"
+
+
+def test_outbox_cooldown_across_workers(tmp_path: Path):
+    async def test(event: AlertEvent):
+        later = event.model_copy(
+            update={"forecast_time": FORECAST + timedelta(minutes=5)}
+        )
+        # Две очереди - как два процесса с общей таблицей
+        await Outbox(FileTransport(tmp_path / "a")).enqueue([event])
+        await Outbox(FileTransport(tmp_path / "b")).enqueue([later])
+        assert await AlertOutbox.all().count() == 1
+        await Outbox(FileTransport(tmp_path / "b"), cooldown=0).enqueue([later])
+        return await AlertOutbox.all().count()
+
+    assert asyncio.run(with_db(test)) == 2
+
+
+def test_outbox_retries_and_fails():
+    async def test(event: AlertEvent):
+        outbox = Outbox(BrokenTransport(), rate=1000, max_attempts=2)
+        await outbox.enqueue([event])
+        assert await outbox.drain() == 1
+        # Повтор ещё не наступил
+        assert await outbox.drain() == 0
+        await AlertOutbox.all().update(next_attempt_at=datetime(2000, 1, 1))
+        assert await outbox.drain() == 1
+        return await AlertOutbox.all()
+
+    (row,) = asyncio.run(with_db(test))
+    assert row.status == FAILED
+    assert row.attempts == 2
+    assert "smtp is down" in row.last_error
+
+
+def test_backoff():
+    assert [backoff(n) for n in (1, 2, 3)] == [30, 60, 120]
+    assert backoff(20) == 3600
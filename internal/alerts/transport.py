@@ -0,0 +1,100 @@
+import asyncio
+import json
+import smtplib
+from email.message import EmailMessage
+from pathlib import Path
+from typing import Protocol
+
+import structlog
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+
+from internal.settings import (
+    ALERT_OUTBOX_FILE,
+    ALERT_TRANSPORT,
+    SMTP_HOST,
+    SMTP_PASS,
+    SMTP_PORT,
+    SMTP_SENDER,
+    SMTP_USER,
+)
+
+logger = structlog.stdlib.get_logger(__name__)
+
+
+class AlertMessage(BaseModel):
+    email: str
+    subject: str
+    text: str
+
+
+class Transport(Protocol):
+    """Доставка одного оповещения; ошибка означает повтор позже"""
+
+    async def send(self, message: AlertMessage) -> None: ...
+
+
+class LogTransport:
+    async def send(self, message: AlertMessage):
+        logger.info(f"Alert for {message.email}: {message.subject}")
+
+
+class FileTransport:
+    """Запись оповещений в файл NDJSON вместо отправки"""
+
+    def __init__(self, path: str | Path = ALERT_OUTBOX_FILE):
+        self.path = Path(path)
+        self._lock = asyncio.Lock()
+
+    def _write(self, line: str):
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    async def send(self, message: AlertMessage):
+        async with self._lock:
+            await run_in_threadpool(
+                self._write,
+                json.dumps(message.model_dump(), ensure_ascii=False),
+            )
+
+
+class SmtpTransport:
+    def __init__(
+        self,
+        host: str = SMTP_HOST,
+        port: int = SMTP_PORT,
+        sender: str = SMTP_SENDER,
+        user: str | None = SMTP_USER,
+        password: str | None = SMTP_PASS,
+    ):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.user = user
+        self.password = password
+
+    def _send(self, message: AlertMessage):
+        email = EmailMessage()
+        email["From"] = self.sender
+        email["To"] = message.email
+        email["Subject"] = message.subject
+        email.set_content(message.text)
+        with smtplib.SMTP(self.host, self.port, timeout=30) as smtp:
+            if self.user and self.password:
+                smtp.starttls()
+                smtp.login(self.user, self.password)
+            smtp.send_message(email)
+
+    async def send(self, message: AlertMessage):
+        # smtplib блокирующий, отправка идёт в пуле потоков
+        await run_in_threadpool(self._send, message)
+
+
+def create_transport(kind: str = ALERT_TRANSPORT) -> Transport:
+    if kind == "log":
+        return LogTransport()
+    if kind == "file":
+        return FileTransport()
+    if kind == "smtp":
+        return SmtpTransport()
+    raise ValueError(f"Unknown alert transport {kind}")
@@ -0,0 +1,184 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+import structlog
+from pydantic import AwareDatetime, BaseModel
+from starlette.concurrency import run_in_threadpool
+
+from internal.db.models import Cities
+from internal.db.schemas import City
+from internal.nooa import swpc_req
+from internal.nooa.aurora_snapshot import ovation_feed
+from internal.nooa.calc import (
+    AuroraProbabilityBatchBody,
+    AuroraProbabilityPoint,
+    NooaAuroraReq,
+    nearst_aurora_probability_batch,
+)
+from internal.nooa.probability_grid import aurora_probability_batch
+from internal.settings import LISTING_CACHE_TTL
+
+logger = structlog.stdlib.get_logger(__name__)
+
+
+class CityProbability(BaseModel):
+    id: int
+    name: str
+    lat: float
+    long: float
+    nooa_probability: int | None
+    probability: float | None
+
+
+class CitiesProbabilityResponse(BaseModel):
+    updated_at: AwareDatetime
+    nooa_version: str | None
+    cities: list[CityProbability]
+
+
+def city_local_time(now: datetime, long: float) -> datetime:
+    """Местное солнечное время города по долготе"""
+    return now.astimezone(timezone(timedelta(hours=round(long / 15))))
+
+
+class CityTable:
+    """Города в памяти с вероятностями, пересчитываемыми при новых данных
+
+    Список городов перечитывается админскими обработчиками и не реже раза
+    в `ttl` секунд - для записей через другие процессы
+    """
+
+    def __init__(self, ttl: float = LISTING_CACHE_TTL):
+        self.ttl = ttl
+        self._loaded_at = 0.0
+        self.cities: list[City] = []
+        self.content: bytes | None = None
+        # Значения источников, по которым посчитан `content`
+        self._inputs: tuple | None = None
+        self._task: asyncio.Task | None = None
+
+    async def load(self):
+        # До запроса: одновременные чтения не перечитывают список повторно
+        self._loaded_at = time.monotonic()
+        self.cities = [City.model_validate(c) for c in await Cities.all()]
+        self.recompute()
+
+    @staticmethod
+    def inputs(now: datetime | None = None) -> tuple:
+        """Всё, от чего зависят вероятности: версия OVATION, значения SWPC
+        и час UTC (от него зависит местное время городов)"""
+        now = now or datetime.now(timezone.utc)
+        snapshot = ovation_feed.value
+        dst = swpc_req.dst_feed.value
+        bz = swpc_req.bz_feed.value
+        kp = swpc_req.kp_feed.value
+        return (
+            snapshot.version if snapshot is not None else None,
+            dst.dst if dst is not None else None,
+            bz.bz_gse if bz is not None else None,
+            kp.kp if kp is not None else None,
+            now.hour,
+        )
+
+    def recompute(self, now: datetime | None = None) -> bytes:
+        now = now or datetime.now(timezone.utc)
+        # До чтения значений: обновление источника во время пересчёта
+        # приведёт к ещё одному пересчёту, а не к потерянному
+        inputs = self.inputs(now)
+        snapshot = ovation_feed.value
+        dst = swpc_req.dst_feed.value
+        bz = swpc_req.bz_feed.value
+        kp = swpc_req.kp_feed.value
+
+        nooa: list[int | None] = [None] * len(self.cities)
+        if snapshot is not None and self.cities:
+            nooa = [
+                r.probability
+                for r in nearst_aurora_probability_batch(
+                    [NooaAuroraReq(lat=c.lat, lon=c.long) for c in self.cities],
+                    snapshot.grid,
+                )
+            ]
+
+        model: list[float | None] = [None] * len(self.cities)
+        if (
+            dst is not None
+            and bz is not None
+            and kp is not None
+            and self.cities
+        ):
+            # Без проверки лимита точек пакетного запроса
+            body = AuroraProbabilityBatchBody.model_construct(
+                points=[
+                    AuroraProbabilityPoint(
+                        lat=c.lat,
+                        lon=c.long,
+                        local_time=city_local_time(now, c.long),
+                    )
+                    for c in self.cities
+                ],
+                speed=450,
+                clouds=30,
+            )
+            model = [
+                r.probability
+                for r in aurora_probability_batch(body, dst=dst, bz=bz, kp=kp)
+            ]
+
+        res = CitiesProbabilityResponse(
+            updated_at=now,
+            nooa_version=snapshot.version if snapshot is not None else None,
+            cities=[
+                CityProbability(
+                    id=c.id,
+                    name=c.name,
+                    lat=c.lat,
+                    long=c.long,
+                    nooa_probability=nooa_probability,
+                    probability=probability,
+                )
+                for c, nooa_probability, probability in zip(
+                    self.cities, nooa, model
+                )
+            ],
+        )
+        self.content = res.model_dump_json().encode()
+        self._inputs = inputs
+        return self.content
+
+    async def current(self) -> bytes:
+        """Таблица для текущих данных; пересчёт на месте, только если
+        фоновый пересчёт ещё не успел или список городов устарел"""
+        if time.monotonic() - self._loaded_at >= self.ttl:
+            await self.load()
+        if self.content is None or self.inputs() != self._inputs:
+            return self.recompute()
+        return self.content
+
+    async def _refresh(self):
+        try:
+            # Обновления во время пересчёта сливаются в один следующий проход
+            while self.inputs() != self._inputs:
+                await run_in_threadpool(self.recompute)
+        except Exception:
+            logger.exception("Failed to recompute city table")
+
+    async def on_update(self, _: Any):
+        """Пересчёт в фоне, чтобы не задерживать загрузку источника;
+        обновление без изменения входных значений (например, новая точка
+        Bz с тем же значением) таблицу не пересчитывает"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh())
+
+
+city_table = CityTable()
+
+for feed in (
+    ovation_feed,
+    swpc_req.dst_feed,
+    swpc_req.bz_feed,
+    swpc_req.kp_feed,
+):
+    feed.subscribe(city_table.on_update)
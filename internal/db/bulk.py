@@ -0,0 +1,207 @@
+import csv
+import json
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    Literal,
+    NamedTuple,
+    TextIO,
+)
+
+from pydantic import BaseModel, ValidationError
+from starlette.concurrency import run_in_threadpool
+from tortoise import models
+from tortoise.transactions import in_transaction
+
+ImportFormat = Literal["json", "ndjson", "csv"]
+
+# Строк в одном INSERT
+BATCH_SIZE = 1000
+# Ошибок в ответе, остальные только считаются
+MAX_ERRORS = 100
+READ_SIZE = 64 * 1024
+
+
+class RowError(BaseModel):
+    row: int
+    errors: list[dict[str, Any]]
+
+
+class BulkImportError(Exception):
+    def __init__(self, errors: list[RowError], total: int):
+        super().__init__(f"{total} invalid rows")
+        self.errors = errors
+        self.total = total
+
+
+class BulkImportResponse(BaseModel):
+    created: int
+
+
+def detect_format(
+    filename: str | None, content_type: str | None
+) -> ImportFormat:
+    name = (filename or "").lower()
+    content_type = (content_type or "").lower()
+    if name.endswith((".ndjson", ".jsonl")) or "ndjson" in content_type:
+        return "ndjson"
+    if name.endswith(".csv") or "csv" in content_type:
+        return "csv"
+    return "json"
+
+
+def iter_json_array(stream: TextIO) -> Iterator[Any]:
+    """Элементы JSON-массива по одному, без чтения всего файла в память"""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    started = False
+    eof = False
+    while True:
+        # Пропуск пробелов и разделителей между элементами
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+        if not started and pos < len(buffer):
+            if buffer[pos] != "[":
+                raise ValueError("Expected JSON array")
+            started = True
+            pos += 1
+            continue
+        if started and pos < len(buffer) and buffer[pos] == "]":
+            return
+        if pos < len(buffer):
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                # Число в конце буфера может продолжиться в следующем куске
+                if end < len(buffer) or eof:
+                    yield item
+                    pos = end
+                    continue
+        if eof:
+            raise ValueError("Unexpected end of JSON array")
+        chunk = stream.read(READ_SIZE)
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        eof = not chunk
+
+
+def iter_rows(stream: TextIO, fmt: ImportFormat) -> Iterator[Any]:
+    """Строки загружаемого файла в виде словарей"""
+    if fmt == "json":
+        yield from iter_json_array(stream)
+    elif fmt == "ndjson":
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+    else:
+        for row in csv.DictReader(stream):
+            # Пустая ячейка - значение по умолчанию
+            yield {k: v for k, v in row.items() if k and v not in ("", None)}
+
+
+def _row_errors(e: Exception) -> list[dict[str, Any]]:
+    if isinstance(e, ValidationError):
+        return [
+            {"loc": list(err["loc"]), "msg": err["msg"], "type": err["type"]}
+            for err in e.errors(include_url=False)
+        ]
+    return [{"loc": [], "msg": str(e), "type": "parse_error"}]
+
+
+class Chunk(NamedTuple):
+    items: list[models.Model]
+    errors: list[RowError]
+    invalid: int
+    # Файл прочитан до конца или дальше не читается
+    done: bool
+
+
+def read_chunk(
+    rows: Iterator[Any],
+    schema: type[BaseModel],
+    model: type[models.Model],
+    prepare: Callable[[Any], None] | None,
+    first: int,
+    build: bool,
+    max_errors: int,
+) -> Chunk:
+    """Разбор и проверка следующих BATCH_SIZE строк, начиная с номера
+    `first`; синхронно, для пула потоков. Без `build` только проверка"""
+    items: list[models.Model] = []
+    errors: list[RowError] = []
+    invalid = 0
+    for number in range(first, first + BATCH_SIZE):
+        try:
+            row = next(rows)
+            item = schema.model_validate(row)
+        except StopIteration:
+            return Chunk(items, errors, invalid, True)
+        except (ValidationError, ValueError, csv.Error) as e:
+            invalid += 1
+            if len(errors) < max_errors:
+                errors.append(RowError(row=number, errors=_row_errors(e)))
+            if not isinstance(e, ValidationError):
+                # После ошибки разбора файл дальше не читается
+                return Chunk(items, errors, invalid, True)
+            # Дальше только проверка, вставка всё равно откатится
+            build = False
+            continue
+        if build:
+            obj = model(**item.model_dump())
+            if prepare is not None:
+                prepare(obj)
+            items.append(obj)
+    return Chunk(items, errors, invalid, False)
+
+
+async def bulk_import(
+    model: type[models.Model],
+    schema: type[BaseModel],
+    rows: Iterable[Any],
+    replace: bool = False,
+    prepare: Callable[[Any], None] | None = None,
+) -> int:
+    """Вставка строк через `bulk_create` в одной транзакции
+
+    Все строки проверяются схемой; если хотя бы одна не прошла проверку,
+    транзакция откатывается и `BulkImportError` содержит ошибки по строкам.
+    При `replace` старые записи удаляются в той же транзакции, поэтому
+    таблица не остаётся пустой или заполненной наполовину. Разбор файла и
+    проверка идут в пуле потоков пачками, цикл событий ими не занят
+    """
+    errors: list[RowError] = []
+    invalid = 0
+    created = 0
+    async with in_transaction("default") as conn:
+        if replace:
+            await model.all().using_db(conn).delete()
+        row_iter = iter(rows)
+        number = 1
+        while True:
+            chunk = await run_in_threadpool(
+                read_chunk,
+                row_iter,
+                schema,
+                model,
+                prepare,
+                number,
+                not invalid,
+                MAX_ERRORS - len(errors),
+            )
+            number += BATCH_SIZE
+            invalid += chunk.invalid
+            errors.extend(chunk.errors)
+            if chunk.items and not invalid:
+                await model.bulk_create(chunk.items, using_db=conn)
+                created += len(chunk.items)
+            if chunk.done:
+                break
+        if invalid:
+            raise BulkImportError(errors, invalid)
+    return created
@@ -1,19 +1,93 @@
 from functools import partial
+from pathlib import Path
+from typing import Any
 
+from tortoise import connections
+from tortoise.backends.base.client import BaseDBAsyncClient
+from tortoise.backends.base.config_generator import expand_db_url
 from tortoise.contrib.fastapi import RegisterTortoise
 
-from internal.settings import DB_URL
+from internal.settings import (
+    DB_IS_POSTGRES,
+    DB_MIGRATE,
+    DB_POOL_MAX,
+    DB_POOL_MIN,
+    DB_STATEMENT_CACHE_SIZE,
+    DB_STATEMENT_TIMEOUT,
+    DB_URL,
+    SQLITE_BUSY_TIMEOUT,
+    SQLITE_CACHE_SIZE,
+    SQLITE_MMAP_SIZE,
+    SQLITE_PERFORMANCE,
+    SQLITE_READERS,
+)
 
-register_orm = partial(
-    RegisterTortoise,
-    db_url=DB_URL,
-    modules={"models": ["internal.db.models"]},
-    generate_schemas=True,
-    add_exception_handlers=True,
+# Миграции SQLite и PostgreSQL отличаются диалектом SQL
+MIGRATIONS_LOCATION = str(
+    Path(__file__).parents[2]
+    / ("migrations/postgres" if DB_IS_POSTGRES else "migrations")
 )
 
-TORTOISE_ORM = {
-    "connections": {"default": DB_URL},
+
+def db_connection(db_url: str) -> dict[str, Any]:
+    """Параметры подключения; для PostgreSQL - настройки пула asyncpg
+
+    Параметры из строки подключения (`?maxsize=...`) важнее настроек
+    """
+    config = expand_db_url(db_url)
+    if config["engine"] == "tortoise.backends.asyncpg":
+        credentials = config["credentials"]
+        # Из строки подключения значения приходят строками
+        for key, default in (
+            ("minsize", DB_POOL_MIN),
+            ("maxsize", DB_POOL_MAX),
+            ("statement_cache_size", DB_STATEMENT_CACHE_SIZE),
+        ):
+            credentials[key] = int(credentials.get(key, default))
+        credentials.setdefault("application_name", "aurora-api")
+        credentials["server_settings"] = {
+            "statement_timeout": str(DB_STATEMENT_TIMEOUT),
+        }
+    if config["engine"] == "tortoise.backends.sqlite" and SQLITE_PERFORMANCE:
+        credentials = config["credentials"]
+        credentials.setdefault("journal_mode", "WAL")
+        credentials.setdefault("synchronous", "NORMAL")
+        credentials.setdefault("mmap_size", SQLITE_MMAP_SIZE)
+        credentials.setdefault("cache_size", SQLITE_CACHE_SIZE)
+        credentials.setdefault("busy_timeout", SQLITE_BUSY_TIMEOUT)
+    return config
+
+
+def read_connection(config: dict[str, Any]) -> dict[str, Any] | None:
+    """Пул соединений для чтения рядом с основным соединением SQLite"""
+    if (
+        not SQLITE_PERFORMANCE
+        or SQLITE_READERS < 1
+        or config["engine"] != "tortoise.backends.sqlite"
+        or config["credentials"]["file_path"] == ":memory:"
+    ):
+        return None
+    return {
+        "engine": "internal.db.sqlite_read",
+        "credentials": {**config["credentials"], "readers": SQLITE_READERS},
+    }
+
+
+def read_db() -> BaseDBAsyncClient:
+    """Соединение для чтений, которым не важна запись в той же транзакции"""
+    if "read" in TORTOISE_ORM["connections"]:
+        return connections.get("read")
+    return connections.get("default")
+
+
+DB_CONNECTION = db_connection(DB_URL)
+READ_CONNECTION = read_connection(DB_CONNECTION)
+
+TORTOISE_ORM: dict[str, Any] = {
+    "connections": {
+        "default": DB_CONNECTION,
+        **({"read": READ_CONNECTION} if READ_CONNECTION else {}),
+    },
     "apps": {
         "models": {
             "models": ["internal.db.models", "aerich.models"],
@@ -21,3 +95,10 @@ TORTOISE_ORM = {
         },
     },
 }
+
+register_orm = partial(
+    RegisterTortoise,
+    config=TORTOISE_ORM,
+    generate_schemas=not DB_MIGRATE,
+    add_exception_handlers=True,
+)
@@ -0,0 +1,134 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Literal, NamedTuple
+
+from tortoise.expressions import Q
+from tortoise.queryset import QuerySet
+
+from internal.db.models import Customers
+
+ExportFormat = Literal["json", "ndjson", "csv"]
+
+CHUNK_SIZE = 1000
+CUSTOMER_FIELDS = (
+    "id",
+    "current_geo_lat",
+    "current_geo_long",
+    "selected_geo_lat",
+    "selected_geo_long",
+    "locale",
+    "created_at",
+    "updated_at",
+)
+
+
+class GeoBox(NamedTuple):
+    min_lon: float
+    min_lat: float
+    max_lon: float
+    max_lat: float
+
+
+def parse_geo_box(value: str) -> GeoBox:
+    """`min_lon,min_lat,max_lon,max_lat`; `min_lon > max_lon` - через 180°"""
+    try:
+        box = GeoBox(*(float(v) for v in value.split(",")))
+    except (TypeError, ValueError) as e:
+        raise ValueError("bbox must be min_lon,min_lat,max_lon,max_lat") from e
+    if not -90 <= box.min_lat <= box.max_lat <= 90:
+        raise ValueError("bbox latitude must be within -90..90")
+    if not (-180 <= box.min_lon <= 180 and -180 <= box.max_lon <= 180):
+        raise ValueError("bbox longitude must be within -180..180")
+    return box
+
+
+def customers_query(
+    locale: str | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    bbox: GeoBox | None = None,
+) -> QuerySet[Customers]:
+    """Пользователи по фильтрам; координаты - выбранные пользователем"""
+    query = Customers.all()
+    if locale is not None:
+        query = query.filter(locale=locale)
+    if created_from is not None:
+        query = query.filter(created_at__gte=created_from)
+    if created_to is not None:
+        query = query.filter(created_at__lt=created_to)
+    if bbox is not None:
+        query = query.filter(
+            selected_geo_lat__gte=bbox.min_lat,
+            selected_geo_lat__lte=bbox.max_lat,
+        )
+        if bbox.min_lon <= bbox.max_lon:
+            query = query.filter(
+                selected_geo_long__gte=bbox.min_lon,
+                selected_geo_long__lte=bbox.max_lon,
+            )
+        else:
+            query = query.filter(
+                Q(selected_geo_long__gte=bbox.min_lon)
+                | Q(selected_geo_long__lte=bbox.max_lon)
+            )
+    return query
+
+
+def page(
+    query: QuerySet[Customers], after: int | None, limit: int
+) -> QuerySet[Customers]:
+    """Страница по курсору: `id` последней записи предыдущей страницы"""
+    if after is not None:
+        query = query.filter(id__gt=after)
+    return query.order_by("id").limit(limit)
+
+
+async def iter_chunks(
+    query: QuerySet[Customers], after: int | None = None
+) -> AsyncIterator[list[dict[str, Any]]]:
+    while True:
+        rows = await page(query, after, CHUNK_SIZE).values(*CUSTOMER_FIELDS)
+        if not rows:
+            return
+        yield rows
+        if len(rows) < CHUNK_SIZE:
+            return
+        after = rows[-1]["id"]
+
+
+def _default(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Can't serialize {type(value)}")
+
+
+async def export_ndjson(
+    query: QuerySet[Customers], after: int | None = None
+) -> AsyncIterator[bytes]:
+    async for rows in iter_chunks(query, after):
+        yield "".join(
+            json.dumps(row, default=_default) + "\n" for row in rows
+        ).encode()
+
+
+async def export_csv(
+    query: QuerySet[Customers], after: int | None = None
+) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CUSTOMER_FIELDS)
+    writer.writeheader()
+    async for rows in iter_chunks(query, after):
+        writer.writerows(
+            {
+                k: v.isoformat() if isinstance(v, datetime) else v
+                for k, v in row.items()
+            }
+            for row in rows
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
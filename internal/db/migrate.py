@@ -0,0 +1,37 @@
+from aerich import Command  # type: ignore[import-untyped]
+from tortoise import Tortoise
+
+from internal.db.config import MIGRATIONS_LOCATION, TORTOISE_ORM
+from internal.settings import DB_IS_POSTGRES
+
+# Ключ pg_advisory_lock: миграции выполняет один процесс из нескольких
+MIGRATION_LOCK = 0x61757261
+
+
+async def upgrade(
+    config: dict = TORTOISE_ORM, location: str = MIGRATIONS_LOCATION
+) -> list[str]:
+    """Применение новых миграций aerich, возвращает их имена"""
+    command = Command(
+        tortoise_config=config,
+        app="models",
+        location=location,
+    )
+    try:
+        await command.init()
+        if not DB_IS_POSTGRES:
+            return await command.upgrade(run_in_transaction=True)
+        conn = Tortoise.get_connection("default")
+        async with conn.acquire_connection() as lock_conn:
+            # Остальные воркеры ждут здесь и затем видят, что всё применено
+            await lock_conn.execute(
+                "SELECT pg_advisory_lock($1)", MIGRATION_LOCK
+            )
+            try:
+                return await command.upgrade(run_in_transaction=True)
+            finally:
+                await lock_conn.execute(
+                    "SELECT pg_advisory_unlock($1)", MIGRATION_LOCK
+                )
+    finally:
+        await Tortoise.close_connections()
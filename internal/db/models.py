@@ -1,6 +1,8 @@
 from tortoise import fields, models
 from tortoise.validators import MaxValueValidator, MinValueValidator
 
+from internal.nooa.grid import nooa_cell
+
 # Table customers
 # id (primary key) uuid4
 # current_geo_lat float (.1) = selected_geo_lat
@@ -39,6 +41,11 @@ class Customers(models.Model):
         ],
     )
     locale = fields.CharField(max_length=2, default="ru")
+    # Ячейки сетки OVATION для выбора подписчиков по активным ячейкам.
+    # Пересчитываются в save() и при импорте (`prepare`); QuerySet.update
+    # координат их не обновляет - после него нужны update_cells() и save()
+    selected_cell = fields.IntField(null=True, db_index=True)
+    current_cell = fields.IntField(null=True, db_index=True)
 
     created_at = fields.DatetimeField(auto_now_add=True)
     updated_at = fields.DatetimeField(auto_now=True)
@@ -46,6 +53,25 @@ class Customers(models.Model):
     class Meta:
         table = "customers"
 
+    class PydanticMeta:
+        exclude = ("selected_cell", "current_cell")
+
+    def update_cells(self):
+        self.selected_cell = (
+            None
+            if self.selected_geo_lat is None or self.selected_geo_long is None
+            else nooa_cell(self.selected_geo_lat, self.selected_geo_long)
+        )
+        self.current_cell = (
+            None
+            if self.current_geo_lat is None or self.current_geo_long is None
+            else nooa_cell(self.current_geo_lat, self.current_geo_long)
+        )
+
+    async def save(self, *args, **kwargs):
+        self.update_cells()
+        await super().save(*args, **kwargs)
+
 
 # Table subscriptions
 # id (pk) # not used
@@ -131,3 +157,39 @@ class Tours(models.Model):
 
     class Meta:
         table = "tours"
+
+
+# Таблица исходящих оповещений (outbox)
+# Одно оповещение на подписку и время прогноза OVATION
+
+
+class AlertOutbox(models.Model):
+    id = fields.IntField(primary_key=True)
+    subscription: fields.ForeignKeyRelation[Subscriptions] = (
+        fields.ForeignKeyField(
+            "models.Subscriptions",
+            related_name="alerts",
+        )
+    )  # subscription_id in db
+    email = fields.CharField(max_length=255)
+    probability = fields.IntField()
+    lat = fields.FloatField()
+    long = fields.FloatField()
+    forecast_time = fields.DatetimeField()
+    status = fields.CharField(
+        max_length=16,
+        choices=["PENDING", "SENT", "FAILED"],
+        default="PENDING",
+    )
+    attempts = fields.IntField(default=0)
+    next_attempt_at = fields.DatetimeField()
+    last_error = fields.TextField(null=True)
+    sent_at = fields.DatetimeField(null=True)
+
+    created_at = fields.DatetimeField(auto_now_add=True)
+    updated_at = fields.DatetimeField(auto_now=True)
+
+    class Meta:
+        table = "alert_outbox"
+        unique_together = (("subscription", "forecast_time"),)
+        indexes = (("status", "next_attempt_at"),)
@@ -0,0 +1,74 @@
+"""Движок tortoise: пул соединений SQLite только для чтения
+
+Основное соединение SQLite одно и закрыто блокировкой, поэтому чтения ждут
+записи подписок. В режиме WAL читатели не мешают писателю, так что чтения
+можно выполнять на отдельных соединениях с `query_only`
+"""
+
+import asyncio
+import sqlite3
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+import aiosqlite
+from tortoise.backends.sqlite.client import SqliteClient
+from tortoise.exceptions import TransactionManagementError
+
+
+class SqliteReadClient(SqliteClient):
+    def __init__(self, file_path: str, readers: int = 4, **kwargs: Any):
+        super().__init__(file_path, **kwargs)
+        self.readers = int(readers)
+        # Режим журнала задаёт пишущее соединение
+        self.pragmas.pop("journal_mode", None)
+        self.pragmas.pop("journal_size_limit", None)
+        self.pragmas["query_only"] = "ON"
+        self._pool: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+        self._opened = 0
+
+    async def _connect(self) -> aiosqlite.Connection:
+        connection = await aiosqlite.connect(
+            self.filename, isolation_level=None
+        )
+        connection.row_factory = sqlite3.Row
+        for pragma, val in self.pragmas.items():
+            cursor = await connection.execute(f"PRAGMA {pragma}={val}")
+            await cursor.close()
+        return connection
+
+    async def create_connection(self, with_db: bool) -> None:
+        pass
+
+    @asynccontextmanager
+    async def _acquire(self) -> AsyncIterator[aiosqlite.Connection]:
+        if self._pool.empty() and self._opened < self.readers:
+            self._opened += 1
+            try:
+                connection = await self._connect()
+            except BaseException:
+                self._opened -= 1
+                raise
+        else:
+            connection = await self._pool.get()
+        try:
+            yield connection
+        finally:
+            self._pool.put_nowait(connection)
+
+    def acquire_connection(self):  # type: ignore[override]
+        return self._acquire()
+
+    def _in_transaction(self):  # type: ignore[override]
+        raise TransactionManagementError("Read-only connection")
+
+    async def close(self) -> None:
+        while not self._pool.empty():
+            await self._pool.get_nowait().close()
+        self._opened = 0
+
+    async def db_delete(self) -> None:
+        # Файл базы принадлежит основному соединению
+        await self.close()
+
+
+client_class = SqliteReadClient
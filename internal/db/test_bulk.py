@@ -0,0 +1,115 @@
+import asyncio
+import io
+
+import pytest
+from tortoise import Tortoise
+
+from internal.db import bulk
+from internal.db.models import Cities, Customers
+from internal.db.schemas import CityIn, CustIn
+from internal.db.testing import init_test_db
+from internal.nooa.grid import nooa_cell
+
+
+def test_iter_json_array(monkeypatch: pytest.MonkeyPatch):
+    # Элементы и числа разрезаны границами кусков
+    monkeypatch.setattr(bulk, "READ_SIZE", 3)
+    stream = io.StringIO(' [{"a": 1}, 12345 ,\n{"b": [2, 3]}] ')
+    assert list(bulk.iter_json_array(stream)) == [
+        {"a": 1},
+        12345,
+        {"b": [2, 3]},
+    ]
+    with pytest.raises(ValueError):
+        list(bulk.iter_json_array(io.StringIO('[{"a": 1}, {"b"')))
+
+
+def test_iter_rows_csv_and_ndjson():
+    csv_rows = bulk.iter_rows(
+        io.StringIO("name,lat,long\nMurmansk,68.9,33.1\nEmpty,,\n"), "csv"
+    )
+    assert list(csv_rows) == [
+        {"name": "Murmansk", "lat": "68.9", "long": "33.1"},
+        {"name": "Empty"},
+    ]
+    ndjson_rows = bulk.iter_rows(
+        io.StringIO('{"a": 1}\n\n{"a": 2}\n'), "ndjson"
+    )
+    assert list(ndjson_rows) == [{"a": 1}, {"a": 2}]
+    assert bulk.detect_format("cities.csv", None) == "csv"
+    assert bulk.detect_format(None, "application/x-ndjson") == "ndjson"
+
+
+async def import_cities():
+    await init_test_db()
+    try:
+        await Cities.create(name="Old", lat=1, long=1)
+        rows = [{"name": f"City {i}", "lat": 60, "long": i} for i in range(3)]
+        with pytest.raises(bulk.BulkImportError) as e:
+            await bulk.bulk_import(
+                Cities,
+                CityIn,
+                [*rows, {"name": "Bad", "lat": 100, "long": 0}, {}],
+                replace=True,
+            )
+        # Старые записи на месте после отката
+        kept = await Cities.all().values_list("name", flat=True)
+        created = await bulk.bulk_import(Cities, CityIn, rows, replace=True)
+        names = await Cities.all().values_list("name", flat=True)
+        await bulk.bulk_import(
+            Customers,
+            CustIn,
+            [{"selected_geo_lat": 68.9, "selected_geo_long": 33.1}],
+            prepare=Customers.update_cells,
+        )
+        cells = await Customers.all().values_list("selected_cell", flat=True)
+        return e.value, kept, created, names, cells
+    finally:
+        await Tortoise.close_connections()
+
+
+def test_bulk_import():
+    error, kept, created, names, cells = asyncio.run(import_cities())
+    assert error.total == 2
+    assert [e.row for e in error.errors] == [4, 5]
+    assert error.errors[0].errors[0]["loc"] == ["lat"]
+    assert kept == ["Old"]
+    assert created == 3
+    assert sorted(names) == ["City 0", "City 1", "City 2"]
+    assert cells == [nooa_cell(68.9, 33.1)]
+
+
+def test_bulk_import_chunks(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(bulk, "BATCH_SIZE", 2)
+
+    async def test():
+        await init_test_db()
+        try:
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    ticks += 1
+                    await asyncio.sleep(0)
+
+            task = asyncio.create_task(ticker())
+            rows = [
+                {"name": f"City {i}", "lat": 60, "long": 0} for i in range(5)
+            ]
+            created = await bulk.bulk_import(Cities, CityIn, iter(rows))
+            task.cancel()
+            with pytest.raises(bulk.BulkImportError) as e:
+                bad = {"name": "Bad", "lat": 100, "long": 0}
+                await bulk.bulk_import(Cities, CityIn, [*rows, bad, bad])
+            return created, ticks, e.value, await Cities.all().count()
+        finally:
+            await Tortoise.close_connections()
+
+    created, ticks, error, count = asyncio.run(test())
+    assert created == 5
+    # Пока строки разбираются в пуле потоков, цикл событий свободен
+    assert ticks >= 3
+    # Номера строк сквозные между пачками, вставки откатились
+    assert [e.row for e in error.errors] == [6, 7]
+    assert count == 5
@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+from tortoise import Tortoise
+
+from internal.db.config import db_connection
+from internal.db.models import Customers, Subscriptions
+from internal.db.testing import TEST_DB_URL
+from internal.settings import DB_POOL_MAX, DB_POOL_MIN, DB_STATEMENT_TIMEOUT
+
+
+def test_db_connection_postgres():
+    config = db_connection(
+        "postgres://user:pass@db:5432/aurora?maxsize=20"
+        "&statement_cache_size=0"
+    )
+    credentials = config["credentials"]
+    assert config["engine"] == "tortoise.backends.asyncpg"
+    assert credentials["minsize"] == DB_POOL_MIN
+    assert credentials["maxsize"] == 20
+    assert credentials["statement_cache_size"] == 0
+    assert credentials["server_settings"] == {
+        "statement_timeout": str(DB_STATEMENT_TIMEOUT)
+    }
+
+
+def test_db_connection_sqlite():
+    credentials = db_connection("sqlite://data/db.sqlite3")["credentials"]
+    assert "maxsize" not in credentials
+    assert "server_settings" not in credentials
+    assert DB_POOL_MAX >= DB_POOL_MIN
+
+
+async def concurrent_writes(db_url: str) -> int:
+    await Tortoise.init(
+        config={
+            "connections": {"default": db_connection(db_url)},
+            "apps": {"models": {"models": ["internal.db.models"]}},
+        }
+    )
+    await Tortoise.generate_schemas(safe=True)
+    try:
+        cust = await Customers.create(
+            selected_geo_lat=60, selected_geo_long=30, locale="ru"
+        )
+
+        async def subscribe(i: int):
+            await Subscriptions.create(
+                cust=cust,
+                email=f"user{i}@example.com",
+                cust_name="Test",
+                alert_probability=i,
+                sub_type=1,
+                geo_push_type="SELECTED",
+            )
+
+        await asyncio.gather(*(subscribe(i) for i in range(1, 51)))
+        count = await Subscriptions.filter(cust=cust).count()
+        await cust.delete()
+        return count
+    finally:
+        await Tortoise.close_connections()
+
+
+@pytest.mark.skipif(not TEST_DB_URL, reason="TEST_DB_URL is not set")
+def test_postgres_concurrent_writes():
+    assert asyncio.run(concurrent_writes(TEST_DB_URL)) == 50
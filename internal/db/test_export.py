@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+from tortoise import Tortoise
+
+from internal.db.export import (
+    GeoBox,
+    customers_query,
+    export_csv,
+    page,
+    parse_geo_box,
+)
+from internal.db.models import Customers
+from internal.db.testing import init_test_db
+
+
+def test_parse_geo_box():
+    assert parse_geo_box("170,50,-170,70") == GeoBox(170, 50, -170, 70)
+    with pytest.raises(ValueError):
+        parse_geo_box("0,80,10,70")
+    with pytest.raises(ValueError):
+        parse_geo_box("0,1,2")
+
+
+async def query_customers():
+    await init_test_db()
+    try:
+        for lat, long, locale in [
+            (60, 175, "ru"),
+            (61, -175, "ru"),
+            (62, 0, "ru"),
+            (63, 179, "ch"),
+        ]:
+            await Customers.create(
+                selected_geo_lat=lat, selected_geo_long=long, locale=locale
+            )
+        query = customers_query(
+            locale="ru", bbox=parse_geo_box("170,50,-170,70")
+        )
+        first = await page(query, None, 1).values_list("id", flat=True)
+        second = await page(query, first[-1], 10).values_list("id", flat=True)
+        exported = b"".join([chunk async for chunk in export_csv(query)])
+        return first, second, exported.decode().splitlines()
+    finally:
+        await Tortoise.close_connections()
+
+
+def test_customers_keyset_and_export():
+    first, second, lines = asyncio.run(query_customers())
+    assert first == [1]
+    assert second == [2]
+    assert lines[0].startswith("id,current_geo_lat")
+    assert [line.split(",")[0] for line in lines[1:]] == ["1", "2"]
@@ -0,0 +1,85 @@
+import asyncio
+import sqlite3
+from pathlib import Path
+
+from aerich.utils import import_py_file  # type: ignore[import-untyped]
+from tortoise import Tortoise
+
+from internal.alerts.engine import backfill_cells
+from internal.db import migrate
+from internal.db.models import Customers
+from internal.nooa.grid import nooa_cell
+
+SQLITE_MIGRATIONS = Path(__file__).parents[2] / "migrations"
+# Схема до появления ячеек сетки: таблицы первых трёх миграций
+BASELINE = sorted((SQLITE_MIGRATIONS / "models").glob("[012]_*.py"))
+
+
+def sqlite_config(path: Path) -> dict:
+    return {
+        "connections": {"default": f"sqlite://{path}"},
+        "apps": {
+            "models": {
+                "models": ["internal.db.models", "aerich.models"],
+                "default_connection": "default",
+            },
+        },
+    }
+
+
+async def baseline_db(path: Path):
+    """База, созданная generate_schemas до этой версии, без записей aerich"""
+    with sqlite3.connect(path) as conn:
+        for migration in BASELINE:
+            conn.executescript(await import_py_file(migration).upgrade(None))
+        conn.execute("DELETE FROM aerich")
+        conn.execute(
+            "INSERT INTO customers (selected_geo_lat, selected_geo_long)"
+            " VALUES (68.9, 33.1)"
+        )
+    # Запуск с generate_schemas: таблицы есть, колонки не добавляются
+    await Tortoise.init(config=sqlite_config(path))
+    try:
+        await Tortoise.generate_schemas(safe=True)
+    finally:
+        await Tortoise.close_connections()
+
+
+async def upgrade_from_baseline(path: Path):
+    await baseline_db(path)
+    applied = await migrate.upgrade(sqlite_config(path), str(SQLITE_MIGRATIONS))
+    # Повторный запуск ничего не применяет
+    assert (
+        await migrate.upgrade(sqlite_config(path), str(SQLITE_MIGRATIONS)) == []
+    )
+    await Tortoise.init(config=sqlite_config(path))
+    try:
+        assert await backfill_cells() == 1
+        await Customers.create(selected_geo_lat=55.8, selected_geo_long=37.6)
+        cells = (
+            await Customers.all()
+            .order_by("id")
+            .values_list("selected_cell", flat=True)
+        )
+    finally:
+        await Tortoise.close_connections()
+    return applied, cells
+
+
+def test_upgrade_from_baseline(tmp_path: Path):
+    path = tmp_path / "db.sqlite3"
+    applied, cells = asyncio.run(upgrade_from_baseline(path))
+    assert len(applied) == len(
+        list((SQLITE_MIGRATIONS / "models").glob("*.py"))
+    )
+    assert cells == [nooa_cell(68.9, 33.1), nooa_cell(55.8, 37.6)]
+    with sqlite3.connect(path) as conn:
+        # Индексы построены по колонкам, а не по строковым литералам
+        for index in (
+            "idx_customers_selecte_f028de",
+            "idx_customers_current_4a599f",
+        ):
+            ((_, _, column),) = conn.execute(
+                f"PRAGMA index_info({index})"
+            ).fetchall()
+            assert column in ("selected_cell", "current_cell")
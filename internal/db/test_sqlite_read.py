@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+from tortoise import Tortoise, connections
+from tortoise.exceptions import OperationalError
+from tortoise.transactions import in_transaction
+
+from internal.db import config
+from internal.db.models import Cities
+
+
+def test_performance_pragmas(monkeypatch):
+    monkeypatch.setattr(config, "SQLITE_PERFORMANCE", True)
+    db = config.db_connection("sqlite://data/db.sqlite3")
+    assert db["credentials"]["synchronous"] == "NORMAL"
+    assert db["credentials"]["busy_timeout"] == config.SQLITE_BUSY_TIMEOUT
+    read = config.read_connection(db)
+    assert read is not None
+    assert read["engine"] == "internal.db.sqlite_read"
+    memory = config.db_connection("sqlite://:memory:")
+    assert config.read_connection(memory) is None
+
+
+async def read_while_writing(path: str):
+    db = config.db_connection(f"sqlite://{path}")
+    db["credentials"].update(synchronous="NORMAL", busy_timeout=1000)
+    await Tortoise.init(
+        config={
+            "connections": {
+                "default": db,
+                "read": {
+                    "engine": "internal.db.sqlite_read",
+                    "credentials": {**db["credentials"], "readers": 2},
+                },
+            },
+            "apps": {"models": {"models": ["internal.db.models"]}},
+        }
+    )
+    await Tortoise.generate_schemas()
+    read = connections.get("read")
+    try:
+        await Cities.create(name="Мурманск", lat=68.9, long=33.1)
+        async with in_transaction("default"):
+            await Cities.create(name="Кировск", lat=67.6, long=33.7)
+            # Незакоммиченная запись не видна и не блокирует чтение
+            during = await Cities.all().using_db(read).count()
+        after = await asyncio.gather(
+            *(Cities.all().using_db(read).count() for _ in range(5))
+        )
+        with pytest.raises(OperationalError):
+            await Cities.create(
+                name="Апатиты", lat=67.6, long=33.4, using_db=read
+            )
+        return during, after
+    finally:
+        await Tortoise.close_connections()
+
+
+def test_read_pool(tmp_path):
+    during, after = asyncio.run(
+        read_while_writing(str(tmp_path / "db.sqlite3"))
+    )
+    assert during == 1
+    assert after == [2] * 5
@@ -0,0 +1,26 @@
+import os
+
+from tortoise import Tortoise, connections
+
+from internal.db.config import db_connection
+
+# Для проверки на живой базе: TEST_DB_URL=postgres://... pytest
+TEST_DB_URL = os.getenv("TEST_DB_URL", "")
+
+
+async def init_test_db():
+    """Пустая база для теста: TEST_DB_URL или SQLite в памяти"""
+    await Tortoise.init(
+        config={
+            "connections": {
+                "default": db_connection(TEST_DB_URL or "sqlite://:memory:")
+            },
+            "apps": {"models": {"models": ["internal.db.models"]}},
+        }
+    )
+    if TEST_DB_URL:
+        # Живая база общая для всех тестов, начинаем с чистой схемы
+        await connections.get("default").execute_script(
+            "DROP SCHEMA public CASCADE; CREATE SCHEMA public;"
+        )
+    await Tortoise.generate_schemas()
@@ -0,0 +1,116 @@
+import gzip
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+import brotli  # type: ignore[import-untyped]
+from fastapi import Request, Response
+
+# Кодировки в порядке предпочтения сервера
+ENCODINGS = ("br", "gzip")
+# Курсор следующей страницы для параметра `after`
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def accepted_encodings(accept_encoding: str) -> set[str]:
+    """Кодировки из `Accept-Encoding` с ненулевым q"""
+    res = set()
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0
+        if coding and q > 0:
+            res.add(coding.strip().lower())
+    return res
+
+
+def http_date(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def is_not_modified(
+    request: Request,
+    etags: set[str],
+    last_modified: datetime | None = None,
+) -> bool:
+    """Проверка `If-None-Match`/`If-Modified-Since` (RFC 9110 13.2.2)"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        return not tags.isdisjoint(etags)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+
+class EncodedContent:
+    """Тело ответа, заранее сжатое во все поддерживаемые кодировки"""
+
+    __slots__ = ("etag", "bodies")
+
+    def __init__(self, content: bytes):
+        digest = hashlib.sha1(content).hexdigest()[:20]
+        # Сильный ETag отличается для каждой кодировки
+        self.etag = f'"{digest}"'
+        self.bodies = {
+            "identity": content,
+            "gzip": gzip.compress(content, compresslevel=6, mtime=0),
+            "br": brotli.compress(content, quality=5),
+        }
+
+    def etag_for(self, encoding: str) -> str:
+        if encoding == "identity":
+            return self.etag
+        return f'{self.etag[:-1]}-{encoding}"'
+
+    @property
+    def etags(self) -> set[str]:
+        return {self.etag_for(encoding) for encoding in self.bodies}
+
+    def response(
+        self,
+        request: Request,
+        media_type: str,
+        last_modified: datetime | None = None,
+        cache_control: str | None = None,
+    ) -> Response:
+        accepted = accepted_encodings(
+            request.headers.get("accept-encoding", "")
+        )
+        encoding = next((e for e in ENCODINGS if e in accepted), "identity")
+        headers = {
+            "ETag": self.etag_for(encoding),
+            "Vary": "Accept-Encoding",
+        }
+        if last_modified is not None:
+            headers["Last-Modified"] = http_date(last_modified)
+        if cache_control is not None:
+            headers["Cache-Control"] = cache_control
+        if is_not_modified(request, self.etags, last_modified):
+            return Response(status_code=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(
+            content=self.bodies[encoding],
+            media_type=media_type,
+            headers=headers,
+        )
@@ -0,0 +1,125 @@
+import asyncio
+import time
+from bisect import bisect_right
+from operator import attrgetter
+from typing import Any, Awaitable, Callable, Generic, TypeVar
+
+from pydantic import BaseModel, TypeAdapter
+
+from internal.db.config import read_db
+from internal.db.models import Cities, Tours
+from internal.db.schemas import City, Tour
+from internal.http_cache import EncodedContent
+from internal.lru import LRUCache
+from internal.settings import LISTING_CACHE_TTL
+
+M = TypeVar("M", bound=BaseModel)
+
+item_id = attrgetter("id")
+
+
+class ListingCache(Generic[M]):
+    """Записи таблицы в памяти вместе с готовыми байтами ответа
+
+    Таблица меняется через админские обработчики, которые вызывают
+    `invalidate`; следующее чтение загрузит её заново. Кэш свой у каждого
+    процесса, поэтому записи через другие процессы видны не позже чем через
+    `ttl` секунд
+    """
+
+    def __init__(
+        self,
+        load: Callable[[], Awaitable[list[Any]]],
+        schema: type[M],
+        pages: int = 64,
+        ttl: float = LISTING_CACHE_TTL,
+    ):
+        self._load = load
+        self.schema = schema
+        self.ttl = ttl
+        self._loaded_at = 0.0
+        self.adapter = TypeAdapter(list[schema])  # type: ignore[valid-type]
+        self.version = 0
+        self.items: list[M] | None = None
+        self._ids: list[int] = []
+        self._content: EncodedContent | None = None
+        self._pages: LRUCache[
+            tuple[int | None, int], tuple[EncodedContent, int | None]
+        ] = LRUCache(pages)
+        self._lock = asyncio.Lock()
+
+    def invalidate(self):
+        self.version += 1
+        self.items = None
+        self._ids = []
+        self._content = None
+        self._pages.clear()
+
+    def _expire(self):
+        if (
+            self.items is not None
+            and time.monotonic() - self._loaded_at >= self.ttl
+        ):
+            self.invalidate()
+
+    async def get_items(self) -> list[M]:
+        self._expire()
+        if self.items is not None:
+            return self.items
+        async with self._lock:
+            if self.items is not None:
+                return self.items
+            version = self.version
+            loaded_at = time.monotonic()
+            items = [self.schema.model_validate(r) for r in await self._load()]
+            # Запись во время загрузки: результат годится только для этого
+            # запроса
+            if version == self.version:
+                self.items = items
+                self._loaded_at = loaded_at
+                self._ids = [item_id(item) for item in items]
+            return items
+
+    async def content(self) -> EncodedContent:
+        """Весь список"""
+        self._expire()
+        if self._content is None:
+            items = await self.get_items()
+            content = EncodedContent(self.adapter.dump_json(items))
+            if items is self.items:
+                self._content = content
+            return content
+        return self._content
+
+    async def page(
+        self, after: int | None, limit: int
+    ) -> tuple[EncodedContent, int | None]:
+        """Страница после записи с id `after` и курсор следующей страницы"""
+        self._expire()
+        key = (after, limit)
+        cached = self._pages.get(key)
+        if cached is not None:
+            return cached
+        items = await self.get_items()
+        ids = (
+            self._ids
+            if items is self.items
+            else [item_id(item) for item in items]
+        )
+        start = 0 if after is None else bisect_right(ids, after)
+        chunk = items[start : start + limit]
+        next_cursor = (
+            ids[start + limit - 1] if start + limit < len(ids) else None
+        )
+        res = (EncodedContent(self.adapter.dump_json(chunk)), next_cursor)
+        if items is self.items:
+            self._pages.put(key, res)
+        return res
+
+
+cities_cache = ListingCache(
+    lambda: Cities.all().using_db(read_db()).order_by("id"), City
+)
+tours_cache = ListingCache(
+    lambda: Tours.all().using_db(read_db()).order_by("id"), Tour
+)
@@ -0,0 +1,104 @@
+import asyncio
+import hashlib
+import json
+import re
+from datetime import datetime, timezone
+from typing import Annotated
+
+import httpx
+from fastapi import Depends, Response
+from starlette.concurrency import run_in_threadpool
+
+from internal.http_cache import EncodedContent
+from internal.nooa import nooa_req
+from internal.nooa.feed import Feed
+from internal.nooa.grid import AuroraGrid
+from internal.nooa.upstream import UpstreamDep
+
+# Заголовок ответа OVATION, по которому определяется версия снимка
+VERSION_HEAD_SIZE = 512
+OBSERVATION_TIME_RE = re.compile(rb'"Observation Time"\s*:\s*"([^"]+)"')
+FORECAST_TIME_RE = re.compile(rb'"Forecast Time"\s*:\s*"([^"]+)"')
+
+
+def snapshot_version(raw: bytes) -> str:
+    """Версия снимка по `Observation Time`/`Forecast Time` без разбора JSON"""
+    head = raw[:VERSION_HEAD_SIZE]
+    observation = OBSERVATION_TIME_RE.search(head)
+    forecast = FORECAST_TIME_RE.search(head)
+    if observation is None or forecast is None:
+        return hashlib.sha1(raw).hexdigest()
+    return f"{observation[1].decode()}/{forecast[1].decode()}"
+
+
+class AuroraSnapshot:
+    """Разобранная карта OVATION, общая для всех обработчиков"""
+
+    __slots__ = ("version", "raw", "res", "grid", "encoded")
+
+    def __init__(self, version: str, raw: bytes):
+        self.version = version
+        self.raw = raw
+        self.res = nooa_req.NooaAuroraRes.model_validate(json.loads(raw))
+        self.grid: AuroraGrid = self.res.grid
+        self.encoded = EncodedContent(raw)
+
+    def cache_control(self, now: datetime | None = None) -> str:
+        """Кэширование ответа до времени прогноза OVATION"""
+        now = now or datetime.now(timezone.utc)
+        max_age = int((self.res.Forecast_Time - now).total_seconds())
+        return f"public, max-age={max(max_age, 0)}"
+
+
+class AuroraSnapshotCache:
+    """Разбирает ответ OVATION один раз на каждую версию данных"""
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        self._snapshot: AuroraSnapshot | None = None
+
+    @property
+    def snapshot(self) -> AuroraSnapshot | None:
+        return self._snapshot
+
+    async def get(self, raw: bytes) -> AuroraSnapshot:
+        version = snapshot_version(raw)
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        async with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.version != version:
+                # Разбор ~1 МБ JSON не должен блокировать цикл событий
+                snapshot = await run_in_threadpool(AuroraSnapshot, version, raw)
+                self._snapshot = snapshot
+            return snapshot
+
+    def clear(self):
+        self._snapshot = None
+
+
+snapshot_cache = AuroraSnapshotCache()
+
+
+async def parse_snapshot(res: httpx.Response) -> AuroraSnapshot:
+    return await snapshot_cache.get(res.content)
+
+
+ovation_feed = Feed(
+    "nooa",
+    "aurora client",
+    "https://services.swpc.noaa.gov/json/ovation_aurora_latest.json",
+    parse_snapshot,
+    interval=5 * 60,
+)
+
+
+async def use_aurora_snapshot(
+    client: UpstreamDep,
+    response: Response,
+) -> AuroraSnapshot:
+    return await ovation_feed.get(client, response)
+
+
+AuroraSnapshotDep = Annotated[AuroraSnapshot, Depends(use_aurora_snapshot)]
@@ -0,0 +1,133 @@
+"""Стоимость разбора и ответа для 3-дневного прогноза и 27-дневного обзора
+
+Запуск: `python -m internal.nooa.bench_kp_parser [повторы]`
+
+`models` - разбор в модели pydantic и сериализация на каждый запрос,
+`table` - только разбор в компактную таблицу,
+`serve` - ответ из `TextProductCache` для неизменившегося текста
+"""
+
+import sys
+import time
+from datetime import date, timedelta
+from typing import Any, Callable
+
+from pydantic import TypeAdapter
+
+from internal.nooa.nooa_parser import (
+    parse_kp_3_forecast,
+    parse_kp_3_table,
+    parse_kp_27_outlook,
+    parse_kp_27_table,
+)
+from internal.nooa.nooa_req import (
+    NooaAuroraKp3Req,
+    NooaAuroraKp27Req,
+    TextProductCache,
+)
+
+KP_3_TEXT = """:Product: 3-Day Forecast
+:Issued: 2025 Jan 11 1230 UTC
+# Prepared by the U.S. Dept. of Commerce, NOAA, Space Weather Prediction Center
+#
+A. NOAA Geomagnetic Activity Observation and Forecast
+
+The greatest observed 3 hr Kp over the past 24 hours was 4 (below NOAA
+Scale levels).
+The greatest expected 3 hr Kp for Jan 11-Jan 13 2025 is 5.00 (NOAA Scale
+G1).
+
+NOAA Kp index breakdown Jan 11-Jan 13 2025
+
+             Jan 11       Jan 12       Jan 13
+00-03UT       2.67         1.33         1.67
+03-06UT       0.67         1.67         1.67
+06-09UT       1.00         1.33         1.67
+09-12UT       1.67         1.33         1.33
+12-15UT       2.33         1.33         1.33
+15-18UT       2.67         1.33         1.33
+18-21UT       5.00 (G1)    1.67         1.33
+21-00UT       2.67         1.67         1.33
+
+Rationale: G1 (Minor) geomagnetic storms are likely on 11 Jan.
+
+B. NOAA Solar Radiation Activity Observation and Forecast
+
+Solar radiation, as observed by NOAA GOES-18 over the past 24 hours, was
+below S-scale storm level thresholds.
+
+Solar Radiation Storm Forecast for Jan 11-Jan 13 2025
+
+              Jan 11  Jan 12  Jan 13
+S1 or greater    1%      1%      1%
+"""
+
+
+def kp_27_text() -> str:
+    lines = [
+        ":Product: 27-day Space Weather Outlook Table 27DO.txt",
+        ":Issued: 2025 Jan 06 0242 UTC",
+        "#   UTC      Radio Flux   Planetary   Largest",
+        "#  Date       10.7 cm      A Index    Kp Index",
+    ]
+    start = date(2025, 1, 6)
+    for i in range(27):
+        day = start + timedelta(days=i)
+        lines.append(
+            f"{day:%Y %b %d}     {150 + i:3d}          {5 + i % 20:2d}"
+            f"          {1 + i % 5}"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def bench(fn: Callable[[], Any], number: int) -> float:
+    """Среднее время вызова в микросекундах"""
+    fn()
+    start = time.perf_counter()
+    for _ in range(number):
+        fn()
+    return (time.perf_counter() - start) / number * 1e6
+
+
+def run(number: int):
+    kp_3_raw = KP_3_TEXT.encode()
+    kp_27_raw = kp_27_text().encode()
+    kp_3_adapter = TypeAdapter(NooaAuroraKp3Req)
+    kp_27_adapter = TypeAdapter(NooaAuroraKp27Req)
+    kp_3_cache = TextProductCache(parse_kp_3_table)
+    kp_27_cache = TextProductCache(parse_kp_27_table)
+    cases: list[tuple[str, str, Callable[[], Any]]] = [
+        (
+            "kp-3",
+            "models",
+            lambda: kp_3_adapter.dump_json(
+                parse_kp_3_forecast(kp_3_raw.decode())
+            ),
+        ),
+        ("kp-3", "table", lambda: parse_kp_3_table(kp_3_raw.decode())),
+        (
+            "kp-3",
+            "serve",
+            lambda: kp_3_cache.get(kp_3_raw).content.bodies["identity"],
+        ),
+        (
+            "kp-27",
+            "models",
+            lambda: kp_27_adapter.dump_json(
+                parse_kp_27_outlook(kp_27_raw.decode())
+            ),
+        ),
+        ("kp-27", "table", lambda: parse_kp_27_table(kp_27_raw.decode())),
+        (
+            "kp-27",
+            "serve",
+            lambda: kp_27_cache.get(kp_27_raw).content.bodies["identity"],
+        ),
+    ]
+    print(f"{'product':8} {'case':8} {'us/call':>10}")
+    for product, case, fn in cases:
+        print(f"{product:8} {case:8} {bench(fn, number):10.2f}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
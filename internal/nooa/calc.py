@@ -1,10 +1,12 @@
 from datetime import datetime, timezone
 from typing import Annotated
 
+import numpy as np
 from fastapi import Body
 from pydantic import AwareDatetime, BaseModel, Field
 
 from internal.nooa import swpc_req
+from internal.nooa.grid import GRID_LON, AuroraGrid
 from internal.nooa.nooa_req import NooaAuroraRes
 from internal.validators import GeoFloat
 
@@ -108,6 +110,47 @@ UserBody = Annotated[
 ]
 
 
+# Максимум точек в одном пакетном запросе
+MAX_BATCH_POINTS = 5000
+
+
+class AuroraProbabilityPoint(BaseModel):
+    lat: float = Field(ge=-90, le=90)
+    lon: float = Field(ge=-180, le=180)
+    local_time: AwareDatetime | None = None
+    clouds: float | None = Field(default=None, ge=0, le=100)
+
+
+class AuroraProbabilityBatchBody(BaseModel):
+    points: list[AuroraProbabilityPoint] = Field(
+        min_length=1, max_length=MAX_BATCH_POINTS
+    )
+    speed: float = 450
+    clouds: float = 30
+
+
+UserBatchBody = Annotated[
+    AuroraProbabilityBatchBody,
+    Body(
+        openapi_examples={
+            "Cities": {
+                "value": {
+                    "points": [
+                        {"lat": 68.9792, "lon": 33.0925},
+                        {"lat": 58.6, "lon": 49.6, "clouds": 80},
+                        {
+                            "lat": 55.75,
+                            "lon": 37.62,
+                            "local_time": "2023-03-01T00:00:00+03:00",
+                        },
+                    ],
+                }
+            },
+        }
+    ),
+]
+
+
 # Основной расчёт:
 def aurora_probability(
     user_data: AuroraProbabilityBody,
@@ -156,8 +199,8 @@ def aurora_probability(
 
 
 class NooaAuroraReq(BaseModel):
-    lat: GeoFloat
-    lon: GeoFloat
+    lat: GeoFloat = Field(ge=-90, le=90)
+    lon: GeoFloat = Field(ge=-180, le=180)
 
 
 class AuroraNooaProbabilityResponse(BaseModel):
@@ -174,11 +217,9 @@ def nearst_aurora_probability(
 ):
     rounded_lat = round(pos.lat, 0)
     rounded_lon = round(pos.lon, 0)
-    nooa_lon, nooa_lat, pb = next(
-        v
-        for v in prob_map.coordinates
-        if v[:2] == [rounded_lon + 180, rounded_lat]
-    )
+    nooa_lon = (int(rounded_lon) + 180) % GRID_LON
+    nooa_lat = int(rounded_lat)
+    pb = prob_map.grid.get(nooa_lon, nooa_lat)
     return AuroraNooaProbabilityResponse(
         probability=pb,
         nooa_lat=nooa_lat,
@@ -186,3 +227,44 @@ def nearst_aurora_probability(
         lat=rounded_lat,
         lon=rounded_lon,
     )
+
+
+def nooa_cells(
+    lats: np.ndarray, lons: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Ячейки сетки OVATION (nooa_lon, nooa_lat) для массива координат
+
+    Та же привязка, что и в `nearst_aurora_probability`
+    """
+    nooa_lats = np.rint(lats).astype(np.int32)
+    nooa_lons = (np.rint(lons).astype(np.int32) + 180) % GRID_LON
+    return nooa_lons, nooa_lats
+
+
+class NooaAuroraBatchReq(BaseModel):
+    points: list[NooaAuroraReq] = Field(
+        min_length=1, max_length=MAX_BATCH_POINTS
+    )
+
+
+def nearst_aurora_probability_batch(
+    points: list[NooaAuroraReq],
+    grid: AuroraGrid,
+) -> list[AuroraNooaProbabilityResponse]:
+    """`nearst_aurora_probability` для многих точек одним обращением к сетке"""
+    rounded_lats = np.rint([p.lat for p in points]).astype(np.int32)
+    rounded_lons = np.rint([p.lon for p in points]).astype(np.int32)
+    nooa_lons, _ = nooa_cells(rounded_lats, rounded_lons)
+    pbs = grid.get_many(nooa_lons, rounded_lats)
+    return [
+        AuroraNooaProbabilityResponse(
+            probability=int(pb),
+            nooa_lat=int(lat),
+            nooa_lon=int(nooa_lon),
+            lat=int(lat),
+            lon=int(lon),
+        )
+        for pb, lat, lon, nooa_lon in zip(
+            pbs, rounded_lats, rounded_lons, nooa_lons
+        )
+    ]
@@ -0,0 +1,145 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Generic, TypeVar
+
+import httpx
+import structlog
+from fastapi import Response
+
+from internal.settings import FEED_MAX_STALENESS
+
+logger = structlog.stdlib.get_logger(__name__)
+
+T = TypeVar("T")
+
+# Возраст данных источника в секундах
+AGE_HEADER = "X-Data-Age"
+
+
+class UpstreamError(Exception):
+    """Источник NOAA/SWPC недоступен и подходящего значения нет"""
+
+
+class Feed(Generic[T]):
+    """Последний разобранный ответ одного источника NOAA/SWPC
+
+    Значение обновляется фоновым планировщиком (`refresher`) с периодом
+    `interval`, обработчики запросов только читают его. Устаревшее значение
+    отдаётся сразу, пока в фоне идёт обновление, но не дольше `max_stale`
+    секунд после `interval`. Если значения нет, оно загружается при запросе.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        name: str,
+        url: str,
+        parse: Callable[[httpx.Response], Awaitable[T]],
+        interval: float,
+        max_stale: float = FEED_MAX_STALENESS,
+    ):
+        self.source = source
+        self.name = name
+        self.url = url
+        self.parse = parse
+        self.interval = interval
+        self.max_stale = max_stale
+        self.value: T | None = None
+        self.updated_at: float | None = None
+        self._inflight: asyncio.Task[T] | None = None
+        self._listeners: list[Callable[[T], Awaitable[None]]] = []
+
+    @property
+    def age(self) -> float | None:
+        if self.updated_at is None:
+            return None
+        return time.monotonic() - self.updated_at
+
+    def subscribe(self, listener: Callable[[T], Awaitable[None]]):
+        """Вызов `listener` при получении нового значения"""
+        self._listeners.append(listener)
+
+    async def _notify(self, value: T):
+        for listener in self._listeners:
+            try:
+                await listener(value)
+            except Exception:
+                logger.exception(f"Feed {self.name} listener failed")
+
+    def _start_fetch(self, client: httpx.AsyncClient) -> asyncio.Task[T]:
+        """Загрузка нового значения, одна на все одновременные вызовы"""
+        task = self._inflight
+        if task is None:
+            task = asyncio.create_task(self._fetch(client))
+            task.add_done_callback(self._fetch_done)
+            self._inflight = task
+        return task
+
+    async def refresh(self, client: httpx.AsyncClient) -> T:
+        # Отмена одного ожидающего не должна отменять общую загрузку
+        return await asyncio.shield(self._start_fetch(client))
+
+    def _fetch_done(self, task: asyncio.Task[T]):
+        self._inflight = None
+        if task.cancelled():
+            return
+        e = task.exception()
+        if e is not None:
+            logger.warning(
+                f"Failed to refresh feed {self.name}: {e}",
+                feed=self.name,
+                age=self.age,
+            )
+
+    async def _fetch(self, client: httpx.AsyncClient) -> T:
+        try:
+            res = await client.get(self.url)
+        except httpx.HTTPError as e:
+            raise UpstreamError(
+                f"Failed to get data from {self.source} ({self.name})"
+            ) from e
+        if res.status_code != 200:
+            raise UpstreamError(
+                f"Failed to get data from {self.source} ({self.name})"
+            )
+        value = await self.parse(res)
+        previous = self.value
+        self.value = value
+        self.updated_at = time.monotonic()
+        if value is not previous and value != previous:
+            await self._notify(value)
+        return value
+
+    async def get(
+        self,
+        client: httpx.AsyncClient,
+        response: Response | None = None,
+    ) -> T:
+        """Текущее значение; возраст данных пишется в заголовок ответа"""
+        age = self.age
+        if self.value is None or age is None:
+            value = await self.refresh(client)
+        elif age <= self.interval:
+            value = self.value
+        elif age <= self.interval + self.max_stale:
+            # stale-while-revalidate: отдаём последнее значение сразу
+            self._start_fetch(client)
+            value = self.value
+        else:
+            value = await self.refresh(client)
+        if response is not None:
+            set_age_header(response, self)
+        return value
+
+    def clear(self):
+        self.value = None
+        self.updated_at = None
+
+
+def set_age_header(response: Response, feed: Feed):
+    """Заголовок с возрастом самых старых данных среди источников ответа"""
+    age = int(feed.age or 0)
+    current = response.headers.get(AGE_HEADER)
+    if current is not None:
+        age = max(age, int(current))
+    response.headers[AGE_HEADER] = str(age)
@@ -0,0 +1,59 @@
+from typing import Iterable
+
+import numpy as np
+
+# OVATION grid: longitude 0..359, latitude -90..90 with 1 degree step
+GRID_LON = 360
+GRID_LAT = 181
+GRID_SIZE = GRID_LON * GRID_LAT
+
+
+def grid_index(nooa_lon: int, nooa_lat: int) -> int:
+    """Индекс ячейки в плотной сетке OVATION"""
+    if not -90 <= nooa_lat <= 90:
+        raise IndexError(f"Latitude {nooa_lat} is out of OVATION grid")
+    return (nooa_lon % GRID_LON) * GRID_LAT + (nooa_lat + 90)
+
+
+def nooa_cell(lat: float, lon: float) -> int:
+    """Ячейка сетки для географических координат
+
+    Привязка как в `calc.nearst_aurora_probability`
+    """
+    return grid_index(round(lon) + 180, round(lat))
+
+
+class AuroraGrid:
+    """Плотная сетка вероятностей OVATION 360x181 (uint8) с доступом за O(1)
+
+    Ячейки хранятся по долготе, затем по широте, как в `coordinates` nooa
+    """
+
+    __slots__ = ("data", "array")
+
+    def __init__(self, data: bytes):
+        if len(data) != GRID_SIZE:
+            raise ValueError(f"Expected {GRID_SIZE} cells, got {len(data)}")
+        self.data = data
+        # Представление тех же байт без копирования: [долгота, широта + 90]
+        self.array = np.frombuffer(data, dtype=np.uint8).reshape(
+            GRID_LON, GRID_LAT
+        )
+
+    @classmethod
+    def from_coordinates(cls, coordinates: Iterable[list[int]]) -> "AuroraGrid":
+        data = bytearray(GRID_SIZE)
+        for lon, lat, aurora in coordinates:
+            data[grid_index(lon, lat)] = aurora
+        return cls(bytes(data))
+
+    def get(self, nooa_lon: int, nooa_lat: int) -> int:
+        return self.data[grid_index(nooa_lon, nooa_lat)]
+
+    def get_many(
+        self, nooa_lons: np.ndarray, nooa_lats: np.ndarray
+    ) -> np.ndarray:
+        """Значения сразу для массива точек"""
+        if np.any((nooa_lats < -90) | (nooa_lats > 90)):
+            raise IndexError("Latitude is out of OVATION grid")
+        return self.array[nooa_lons % GRID_LON, nooa_lats + 90]
@@ -0,0 +1,225 @@
+import fcntl
+import os
+import shutil
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import structlog
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+
+from internal.nooa.aurora_snapshot import AuroraSnapshot, ovation_feed
+from internal.nooa.grid import GRID_SIZE, nooa_cell
+from internal.nooa.history import timestamp
+from internal.settings import GRID_ARCHIVE_MAX_AGE, GRID_ARCHIVE_PATH
+
+logger = structlog.stdlib.get_logger(__name__)
+
+# Индекс: время наблюдения (unix, секунды) каждой записи архива
+INDEX = np.dtype("<i8")
+# Архив переписывается, когда устарела такая доля записей: на диске
+# хранится не больше ~4/3 max_age снимков
+COMPACT_SHARE = 0.25
+
+
+class PointHistoryRes(BaseModel):
+    """Вероятность OVATION в ячейке точки по снимкам архива"""
+
+    lat: float
+    lon: float
+    threshold: int
+    time: list[int]
+    probability: list[int]
+    # Снимков с вероятностью не ниже `threshold`
+    above: int
+
+
+class GridArchive:
+    """Архив снимков OVATION: сетки uint8 по GRID_SIZE байт подряд
+
+    `grids.u8` - записи фиксированного размера, `index.i8` - время
+    наблюдения каждой записи по возрастанию. Запись считается добавленной,
+    когда записан её индекс; хвост сетки без индекса перезаписывается.
+    Ряд для точки читается через memmap как срез с шагом GRID_SIZE, то есть
+    по одной странице на снимок без загрузки архива в память.
+    С `max_age` снимки старше срока удаляются сжатием при добавлении
+    """
+
+    def __init__(self, path: str | Path, max_age: float = 0):
+        self.path = Path(path)
+        self.grids_path = self.path / "grids.u8"
+        self.index_path = self.path / "index.i8"
+        self.grids_tmp = self.path / "grids.u8.tmp"
+        self.index_tmp = self.path / "index.i8.tmp"
+        # Снимки старше max_age секунд удаляются; 0 - хранить всё
+        self.max_age = max_age
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        try:
+            return self.index_path.stat().st_size // INDEX.itemsize
+        except FileNotFoundError:
+            return 0
+
+    @contextmanager
+    def _flock(self, operation: int) -> Iterator[None]:
+        """Блокировка архива между процессами: запись и сжатие - LOCK_EX"""
+        self.path.mkdir(parents=True, exist_ok=True)
+        with open(self.path / "lock", "a+b") as lock:
+            fcntl.flock(lock, operation)
+            yield
+
+    def append(self, observation_time: int, grid: bytes) -> bool:
+        """Добавление снимка новее последнего; False - снимок уже есть"""
+        if len(grid) != GRID_SIZE:
+            raise ValueError(f"Expected {GRID_SIZE} cells, got {len(grid)}")
+        # Архив могут дописывать несколько процессов
+        with self._lock, self._flock(fcntl.LOCK_EX):
+            self._recover()
+            if not self._write(observation_time, grid):
+                return False
+            if self.max_age:
+                self._compact(observation_time - self.max_age)
+            return True
+
+    def _write(self, observation_time: int, grid: bytes) -> bool:
+        with (
+            open(self.index_path, "a+b") as index,
+            open(self.grids_path, "a+b") as grids,
+        ):
+            count = os.fstat(index.fileno()).st_size // INDEX.itemsize
+            if count:
+                index.seek((count - 1) * INDEX.itemsize)
+                last = int(np.frombuffer(index.read(INDEX.itemsize), INDEX)[0])
+                if observation_time <= last:
+                    return False
+            grids.truncate(count * GRID_SIZE)
+            grids.write(grid)
+            grids.flush()
+            index.truncate(count * INDEX.itemsize)
+            index.write(np.array([observation_time], INDEX).tobytes())
+            return True
+
+    def _compact(self, cutoff: float):
+        """Удаление снимков старше `cutoff` переписыванием архива
+
+        Новые файлы пишутся рядом и подменяются: сначала сетки, затем
+        индекс. Если процесс упал между подменами, `_recover` завершит
+        сжатие по оставшемуся `index.i8.tmp`
+        """
+        times = self.times()
+        expired = int(np.searchsorted(times, cutoff))
+        if not expired or expired < len(times) * COMPACT_SHARE:
+            return
+        with (
+            open(self.grids_path, "rb") as src,
+            open(self.grids_tmp, "wb") as dst,
+        ):
+            src.seek(expired * GRID_SIZE)
+            shutil.copyfileobj(src, dst)
+            dst.truncate((len(times) - expired) * GRID_SIZE)
+            os.fsync(dst.fileno())
+        with open(self.index_tmp, "wb") as dst:
+            dst.write(times[expired:].tobytes())
+            os.fsync(dst.fileno())
+        os.replace(self.grids_tmp, self.grids_path)
+        os.replace(self.index_tmp, self.index_path)
+        logger.info("Compacted OVATION archive", removed=expired)
+
+    def _recover(self):
+        """Завершение прерванного сжатия; вызывается под LOCK_EX"""
+        if not self.index_tmp.exists():
+            return
+        if self.grids_tmp.exists():
+            # Сетки ещё не подменены: старый архив цел
+            self.grids_tmp.unlink()
+            self.index_tmp.unlink()
+        else:
+            os.replace(self.index_tmp, self.index_path)
+
+    def times(self) -> np.ndarray:
+        count = len(self)
+        if not count:
+            return np.empty(0, INDEX)
+        return np.fromfile(self.index_path, INDEX, count=count)
+
+    def grids(self, count: int) -> np.ndarray:
+        """Первые `count` сеток архива, [снимок, ячейка]"""
+        if not count:
+            return np.empty((0, GRID_SIZE), np.uint8)
+        return np.memmap(
+            self.grids_path, np.uint8, mode="r", shape=(count, GRID_SIZE)
+        )
+
+    def snapshot(self) -> tuple[np.ndarray, np.ndarray]:
+        """Согласованные индекс и сетки архива
+
+        memmap держит открытым файл сеток, поэтому сжатие после чтения
+        не меняет уже полученные данные
+        """
+        with self._flock(fcntl.LOCK_SH):
+            if not self.index_tmp.exists():
+                times = self.times()
+                return times, self.grids(len(times))
+        with self._lock, self._flock(fcntl.LOCK_EX):
+            self._recover()
+            times = self.times()
+            return times, self.grids(len(times))
+
+    def point_series(
+        self, lat: float, lon: float, start: int, end: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Время и вероятность в ячейке точки для снимков `[start, end)`"""
+        times, grids = self.snapshot()
+        lo, hi = np.searchsorted(times, [start, end])
+        cell = nooa_cell(lat, lon)
+        probability = np.array(grids[lo:hi, cell])
+        return times[lo:hi], probability
+
+    def point_history(
+        self, lat: float, lon: float, start: int, end: int, threshold: int
+    ) -> PointHistoryRes:
+        times, probability = self.point_series(lat, lon, start, end)
+        return PointHistoryRes(
+            lat=lat,
+            lon=lon,
+            threshold=threshold,
+            time=list(map(int, times.tolist())),
+            probability=list(map(int, probability.tolist())),
+            above=int(np.count_nonzero(probability >= threshold)),
+        )
+
+    async def query(
+        self,
+        lat: float,
+        lon: float,
+        start: datetime,
+        end: datetime,
+        threshold: int,
+    ) -> PointHistoryRes:
+        return await run_in_threadpool(
+            self.point_history,
+            lat,
+            lon,
+            timestamp(start),
+            timestamp(end),
+            threshold,
+        )
+
+    async def on_snapshot(self, snapshot: AuroraSnapshot):
+        try:
+            await run_in_threadpool(
+                self.append,
+                timestamp(snapshot.res.Observation_Time),
+                snapshot.grid.data,
+            )
+        except Exception:
+            logger.exception("Failed to archive OVATION grid")
+
+
+grid_archive = GridArchive(GRID_ARCHIVE_PATH, GRID_ARCHIVE_MAX_AGE)
+ovation_feed.subscribe(grid_archive.on_snapshot)
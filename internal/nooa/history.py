@@ -0,0 +1,241 @@
+import fcntl
+import os
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterable, Literal, NamedTuple
+
+import numpy as np
+import structlog
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+
+from internal.nooa.aurora_snapshot import AuroraSnapshot, ovation_feed
+from internal.settings import HISTORY_PATH
+
+logger = structlog.stdlib.get_logger(__name__)
+
+HistorySeries = Literal["dst", "bz_gsm", "kp", "ovation_north", "ovation_south"]
+
+# Запись ряда: время (unix, секунды) и значение, 12 байт без выравнивания
+RECORD = np.dtype([("t", "<i8"), ("v", "<f4")])
+# Больше точек в ответе не отдаётся: ряд прореживается по интервалам
+MAX_POINTS = 5000
+# Знаков после запятой в ответе: float32 хранит лишний шум
+PRECISION = 2
+
+
+class Buckets(NamedTuple):
+    """Ряд, сжатый до интервалов `step`: время начала и статистики"""
+
+    t: np.ndarray
+    min: np.ndarray
+    max: np.ndarray
+    mean: np.ndarray
+    size: np.ndarray
+
+
+def timestamp(value: datetime) -> int:
+    """Метки SWPC без зоны - UTC"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+class Series:
+    """Один ряд в файле: записи `RECORD` по возрастанию времени
+
+    Файл только дописывается; точки не новее последней отбрасываются, так
+    что повторная загрузка того же окна upstream ничего не меняет. Чтение -
+    через memmap без загрузки файла целиком
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def append(self, times: np.ndarray, values: np.ndarray) -> int:
+        """Добавление точек новее последней записанной; число добавленных"""
+        times = np.asarray(times, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float32)
+        order = np.argsort(times, kind="stable")
+        times, values = times[order], values[order]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock, open(self.path, "a+b") as f:
+            # Ряд могут дописывать несколько процессов
+            fcntl.flock(f, fcntl.LOCK_EX)
+            size = os.fstat(f.fileno()).st_size
+            size -= size % RECORD.itemsize
+            if size:
+                f.seek(size - RECORD.itemsize)
+                last = np.frombuffer(f.read(RECORD.itemsize), RECORD)[0]["t"]
+                keep = times > last
+                times, values = times[keep], values[keep]
+            if not len(times):
+                return 0
+            # Из точек с одним временем остаётся последняя
+            last_of_time = np.r_[times[1:] != times[:-1], True]
+            times, values = times[last_of_time], values[last_of_time]
+            records = np.rec.fromarrays([times, values], dtype=RECORD)
+            f.truncate(size)
+            f.write(records.tobytes())
+            return len(records)
+
+    def records(self) -> np.ndarray:
+        try:
+            size = self.path.stat().st_size // RECORD.itemsize
+        except FileNotFoundError:
+            size = 0
+        if not size:
+            return np.empty(0, RECORD)
+        return np.memmap(self.path, RECORD, mode="r", shape=(size,))
+
+    def range(self, start: int, end: int) -> np.ndarray:
+        """Точки с `start <= t < end` (копия)"""
+        records = self.records()
+        lo, hi = np.searchsorted(records["t"], [start, end])
+        return np.array(records[lo:hi])
+
+    def downsample(self, start: int, end: int, step: int) -> Buckets:
+        """min/max/mean/count по интервалам `step` секунд от `start`
+
+        Пустые интервалы пропускаются
+        """
+        records = self.range(start, end)
+        if not len(records):
+            empty = np.empty(0)
+            return Buckets(np.empty(0, np.int64), empty, empty, empty, empty)
+        buckets = (records["t"] - start) // step
+        firsts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        values = records["v"].astype(np.float64)
+        size = np.diff(np.r_[firsts, len(values)])
+        return Buckets(
+            t=start + buckets[firsts] * step,
+            min=np.minimum.reduceat(values, firsts),
+            max=np.maximum.reduceat(values, firsts),
+            mean=np.add.reduceat(values, firsts) / size,
+            size=size,
+        )
+
+
+class HistoryRes(BaseModel):
+    """Ряд по столбцам; при `step` - статистики по интервалам"""
+
+    series: HistorySeries
+    step: int | None = None
+    time: list[int]
+    value: list[float] | None = None
+    min: list[float] | None = None
+    max: list[float] | None = None
+    mean: list[float] | None = None
+    count: list[int] | None = None
+
+
+def values_list(values: np.ndarray) -> list[float]:
+    rounded: np.ndarray = np.round(values.astype(np.float64), PRECISION)
+    return list(map(float, rounded.tolist()))
+
+
+def ints_list(values: np.ndarray) -> list[int]:
+    return list(map(int, values.tolist()))
+
+
+def query_history(
+    series: Series, name: HistorySeries, start: int, end: int, step: int | None
+) -> HistoryRes:
+    """Точки за `[start, end)`; если их слишком много - интервалы"""
+    if step is None:
+        records = series.range(start, end)
+        if len(records) <= MAX_POINTS:
+            return HistoryRes(
+                series=name,
+                time=ints_list(records["t"]),
+                value=values_list(records["v"]),
+            )
+        step = 1
+    step = max(step, -(-(end - start) // MAX_POINTS))
+    buckets = series.downsample(start, end, step)
+    return HistoryRes(
+        series=name,
+        step=step,
+        time=ints_list(buckets.t),
+        min=values_list(buckets.min),
+        max=values_list(buckets.max),
+        mean=values_list(buckets.mean),
+        count=ints_list(buckets.size),
+    )
+
+
+class HistoryStore:
+    """История показателей SWPC/OVATION, один файл на ряд"""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._series: dict[str, Series] = {}
+
+    async def query(
+        self,
+        name: HistorySeries,
+        start: datetime,
+        end: datetime,
+        step: int | None = None,
+    ) -> HistoryRes:
+        return await run_in_threadpool(
+            query_history,
+            self.series(name),
+            name,
+            timestamp(start),
+            timestamp(end),
+            step,
+        )
+
+    def series(self, name: HistorySeries) -> Series:
+        series = self._series.get(name)
+        if series is None:
+            series = Series(self.path / f"{name}.bin")
+            self._series[name] = series
+        return series
+
+    async def record(
+        self, name: HistorySeries, times: Iterable[int], values: Iterable[float]
+    ):
+        """Запись точек; ошибка истории не должна ломать источник данных"""
+        try:
+            await run_in_threadpool(
+                self.series(name).append,
+                np.fromiter(times, np.int64),
+                np.fromiter(values, np.float32),
+            )
+        except Exception:
+            logger.exception(f"Failed to record history {name}")
+
+    async def record_rows(
+        self,
+        name: HistorySeries,
+        rows: list[dict[str, Any]],
+        key: str,
+        time_key: str = "time_tag",
+    ):
+        """Запись всех точек ответа SWPC, пропуская пустые значения"""
+        try:
+            points = [
+                (timestamp(datetime.fromisoformat(row[time_key])), row[key])
+                for row in rows
+                if row.get(key) is not None
+            ]
+        except (KeyError, TypeError, ValueError):
+            logger.exception(f"Failed to parse history {name}")
+            return
+        await self.record(name, (t for t, _ in points), (v for _, v in points))
+
+    async def on_snapshot(self, snapshot: AuroraSnapshot):
+        """Максимальная вероятность сияния по полушариям"""
+        t = [timestamp(snapshot.res.Observation_Time)]
+        array = snapshot.grid.array
+        # Столбцы сетки - широта + 90
+        await self.record("ovation_north", t, [array[:, 91:].max()])
+        await self.record("ovation_south", t, [array[:, :90].max()])
+
+
+history = HistoryStore(HISTORY_PATH)
+ovation_feed.subscribe(history.on_snapshot)
@@ -0,0 +1,266 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+from typing import Annotated
+
+import numpy as np
+from fastapi import Body
+from pydantic import BaseModel, Field
+
+from internal.lru import LRUCache
+from internal.nooa.calc import MAX_BATCH_POINTS, kp_zone, speed_factor
+from internal.nooa.nooa_parser import Kp3Table
+from internal.nooa.probability_grid import time_factors
+
+SLOT_HOURS = 3
+# Зоны видимости для Kp 0..9; Kp < 1 считается как 1: зона 0 в
+# `calc.kp_zone` означала бы сияние на любой широте
+KP_ZONES = np.array([kp_zone(max(kp, 1)) for kp in range(10)], np.float64)
+
+
+class KpForecastSlot(BaseModel):
+    start: datetime
+    end: datetime
+    kp: float
+
+
+class KpForecastWindow(KpForecastSlot):
+    probability: float
+
+
+class KpForecastPoint(BaseModel):
+    lat: float
+    lon: float
+    # По слотам `KpForecastRes.slots`
+    probability: list[float]
+    # Лучший ещё не закончившийся слот; None - вероятность везде нулевая
+    best: KpForecastWindow | None
+
+
+class KpForecastRes(BaseModel):
+    version: str
+    slots: list[KpForecastSlot]
+    points: list[KpForecastPoint]
+
+
+class KpForecastPointBody(BaseModel):
+    lat: float = Field(ge=-90, le=90)
+    lon: float = Field(ge=-180, le=180)
+    clouds: float | None = Field(default=None, ge=0, le=100)
+
+
+class KpForecastBatchBody(BaseModel):
+    points: list[KpForecastPointBody] = Field(
+        min_length=1, max_length=MAX_BATCH_POINTS
+    )
+    speed: float = 450
+    clouds: float = Field(default=30, ge=0, le=100)
+
+
+KpForecastBody = Annotated[
+    KpForecastBatchBody,
+    Body(
+        openapi_examples={
+            "Cities": {
+                "value": {
+                    "points": [
+                        {"lat": 68.9792, "lon": 33.0925},
+                        {"lat": 58.6, "lon": 49.6, "clouds": 80},
+                    ],
+                }
+            },
+        }
+    ),
+]
+
+
+def infer_date(value: str, now: datetime) -> datetime:
+    """Дата `Jan 11` без года: ближайшая к `now` (прогноз на стыке лет)"""
+    candidates = [
+        datetime.strptime(f"{year} {value}", "%Y %b %d").replace(
+            tzinfo=timezone.utc
+        )
+        for year in (now.year - 1, now.year, now.year + 1)
+    ]
+    return min(candidates, key=lambda d: abs(d - now))
+
+
+def forecast_rows(table: Kp3Table) -> list[tuple[str, str, float]]:
+    return [
+        (date, time, row[j])
+        for j, date in enumerate(table.dates)
+        for time, row in zip(table.times, table.kp)
+    ]
+
+
+def forecast_version(rows: list[tuple[str, str, float]]) -> str:
+    return hashlib.sha1(repr(rows).encode()).hexdigest()[:16]
+
+
+class KpForecast:
+    """Слоты 3-дневного прогноза одной версии в виде массивов"""
+
+    __slots__ = ("version", "starts", "kp", "zones")
+
+    def __init__(self, table: Kp3Table, now: datetime):
+        rows = forecast_rows(table)
+        self.version = forecast_version(rows)
+        # Год дат прогноза - по времени выпуска, если оно есть
+        issued = table.issued or now
+        days = {date: infer_date(date, issued) for date in table.dates}
+        starts = []
+        for date, slot, _ in rows:
+            # `00-03UT`: час начала слота
+            hour = int(slot.split("-", 1)[0])
+            starts.append(days[date] + timedelta(hours=hour))
+        order = sorted(range(len(starts)), key=starts.__getitem__)
+        self.starts: list[datetime] = [starts[i] for i in order]
+        self.kp = np.array([rows[i][2] for i in order], np.float64)
+        self.zones = KP_ZONES[np.clip(np.rint(self.kp), 0, 9).astype(int)]
+
+    def slots(self) -> list[KpForecastSlot]:
+        return [
+            KpForecastSlot(
+                start=start,
+                end=start + timedelta(hours=SLOT_HOURS),
+                kp=float(kp),
+            )
+            for start, kp in zip(self.starts, self.kp)
+        ]
+
+    def first_open_slot(self, now: datetime) -> int:
+        """Первый слот, который ещё не закончился"""
+        for i, start in enumerate(self.starts):
+            if start + timedelta(hours=SLOT_HOURS) > now:
+                return i
+        return len(self.starts)
+
+    def probabilities(
+        self,
+        lats: np.ndarray,
+        lons: np.ndarray,
+        clouds: np.ndarray,
+        speed: float,
+    ) -> np.ndarray:
+        """Вероятность по модели `calc.aurora_probability`, [слот, точка]
+
+        Bz и Dst на три дня не прогнозируются, их веса нейтральные (1.0);
+        время суток - местное солнечное в середине слота
+        """
+        geomagnetic_latitude = np.minimum(lats + 5, 90)
+        base = np.maximum(
+            0, 100 - (self.zones[:, None] - geomagnetic_latitude) * 10
+        )
+        mid_hours = np.array(
+            [s.hour + SLOT_HOURS // 2 for s in self.starts], np.int32
+        )
+        offsets = np.floor(lons / 15).astype(np.int32)
+        hours = (mid_hours[:, None] + offsets) % 24
+        weight = speed_factor(speed) * (1 - clouds / 100)
+        return np.minimum(base * time_factors(hours) * weight, 100)
+
+
+class KpForecastEngine:
+    """Прогноз вероятности сияния по 3-дневному прогнозу Kp
+
+    Слоты разбираются один раз на версию прогноза; ответы для отдельных
+    точек кэшируются до смены версии или начала следующего слота
+    """
+
+    def __init__(self, cache_size: int = 4096):
+        self._table: Kp3Table | None = None
+        self._forecast: KpForecast | None = None
+        self._responses: LRUCache[tuple, bytes] = LRUCache(cache_size)
+
+    def forecast(self, table: Kp3Table, now: datetime) -> KpForecast:
+        forecast = self._forecast
+        if forecast is not None and table is self._table:
+            return forecast
+        # Источник обновился, но прогноз мог остаться тем же
+        if forecast is None or forecast.version != forecast_version(
+            forecast_rows(table)
+        ):
+            forecast = KpForecast(table, now)
+            self._forecast = forecast
+            self._responses.clear()
+        self._table = table
+        return forecast
+
+    def evaluate(
+        self,
+        table: Kp3Table,
+        body: KpForecastBatchBody,
+        now: datetime | None = None,
+    ) -> KpForecastRes:
+        now = now or datetime.now(timezone.utc)
+        forecast = self.forecast(table, now)
+        points = body.points
+        lats = np.array([p.lat for p in points], np.float64)
+        lons = np.array([p.lon for p in points], np.float64)
+        clouds = np.array(
+            [body.clouds if p.clouds is None else p.clouds for p in points],
+            np.float64,
+        )
+        probabilities = np.round(
+            forecast.probabilities(lats, lons, clouds, body.speed), 1
+        )
+        slots = forecast.slots()
+        first = forecast.first_open_slot(now)
+        open_slots = probabilities[first:]
+        best = (
+            first + np.argmax(open_slots, axis=0)
+            if len(open_slots)
+            else np.zeros(len(points), int)
+        )
+        res = []
+        for i, point in enumerate(points):
+            b = int(best[i])
+            window = None
+            if len(open_slots) and probabilities[b, i] > 0:
+                window = KpForecastWindow(
+                    **slots[b].model_dump(),
+                    probability=float(probabilities[b, i]),
+                )
+            res.append(
+                KpForecastPoint(
+                    lat=point.lat,
+                    lon=point.lon,
+                    probability=probabilities[:, i].tolist(),
+                    best=window,
+                )
+            )
+        return KpForecastRes(version=forecast.version, slots=slots, points=res)
+
+    def point_json(
+        self,
+        table: Kp3Table,
+        point: KpForecastPointBody,
+        speed: float,
+        clouds: float,
+        now: datetime | None = None,
+    ) -> bytes:
+        """Сериализованный прогноз для одной точки"""
+        now = now or datetime.now(timezone.utc)
+        forecast = self.forecast(table, now)
+        point = KpForecastPointBody(
+            lat=round(point.lat, 1),
+            lon=round(point.lon, 1),
+            clouds=clouds if point.clouds is None else point.clouds,
+        )
+        key = (
+            forecast.version,
+            forecast.first_open_slot(now),
+            point.lat,
+            point.lon,
+            point.clouds,
+            speed,
+        )
+        cached = self._responses.get(key)
+        if cached is not None:
+            return cached
+        body = KpForecastBatchBody(points=[point], speed=speed, clouds=clouds)
+        content = self.evaluate(table, body, now).model_dump_json().encode()
+        self._responses.put(key, content)
+        return content
+
+
+kp_forecast_engine = KpForecastEngine()
@@ -1,7 +1,48 @@
-from datetime import date, datetime
+import json
+import re
+from datetime import date, datetime, timezone
+from typing import NamedTuple
 
 from pydantic import BaseModel
 
+MONTHS = {
+    name: number
+    for number, name in enumerate(
+        (
+            "Jan",
+            "Feb",
+            "Mar",
+            "Apr",
+            "May",
+            "Jun",
+            "Jul",
+            "Aug",
+            "Sep",
+            "Oct",
+            "Nov",
+            "Dec",
+        ),
+        start=1,
+    )
+}
+KP_3_DATE_RE = re.compile(r"[A-Z][a-z]{2} \d{1,2}")
+
+
+def parse_issued(line: str) -> datetime | None:
+    """`:Issued: 2025 Jan 11 1230 UTC`"""
+    try:
+        year, month, day, hhmm = line.split()[1:5]
+        return datetime(
+            int(year),
+            MONTHS[month],
+            int(day),
+            int(hhmm[:2]),
+            int(hhmm[2:]),
+            tzinfo=timezone.utc,
+        )
+    except (KeyError, ValueError):
+        return None
+
 
 class NooaAuroraKp27Row(BaseModel):
     date: date
@@ -10,29 +51,66 @@ class NooaAuroraKp27Row(BaseModel):
     largest_kp_index: int
 
 
-def parse_kp_27_outlook(data: str) -> list[NooaAuroraKp27Row]:
-    res = []
+class Kp27Row(NamedTuple):
+    date: date
+    radio_flux: int
+    planetary_index: int
+    largest_kp_index: int
+
+
+class Kp27Table:
+    """27-дневный прогноз: строки без моделей pydantic"""
+
+    __slots__ = ("issued", "rows")
+
+    def __init__(self, issued: datetime | None, rows: tuple[Kp27Row, ...]):
+        self.issued = issued
+        self.rows = rows
+
+    def to_json(self) -> bytes:
+        """JSON в формате `list[NooaAuroraKp27Row]`"""
+        return json.dumps(
+            [
+                {
+                    "date": row.date.isoformat(),
+                    "radio_flux": row.radio_flux,
+                    "planetary_index": row.planetary_index,
+                    "largest_kp_index": row.largest_kp_index,
+                }
+                for row in self.rows
+            ],
+            separators=(",", ":"),
+        ).encode()
+
+
+def parse_kp_27_table(data: str) -> Kp27Table:
+    issued = None
+    rows = []
     for line in data.splitlines():
-        if line.startswith("#"):
-            continue
-        if line.startswith(":"):
+        if line.startswith(":Issued:"):
+            issued = parse_issued(line)
+        if not line or line[0] in "#:":
             continue
-        line = line.strip()
-        if not line:
+        parts = line.split()
+        if not parts:
             continue
-        raw_date, radio_flux, planetary_index, largest_kp_index = line.rsplit(
-            maxsplit=3
-        )
-        date = datetime.strptime(raw_date, "%Y %b %d").date()
-        res.append(
-            NooaAuroraKp27Row(
-                date=date,
-                radio_flux=radio_flux,
-                planetary_index=planetary_index,
-                largest_kp_index=largest_kp_index,
+        year, month, day, radio_flux, planetary_index, largest_kp_index = parts
+        rows.append(
+            Kp27Row(
+                date(int(year), MONTHS[month], int(day)),
+                int(radio_flux),
+                int(planetary_index),
+                int(largest_kp_index),
             )
         )
-    return res
+    return Kp27Table(issued, tuple(rows))
+
+
+def parse_kp_27_outlook(data: str) -> list[NooaAuroraKp27Row]:
+    return [
+        NooaAuroraKp27Row(**row._asdict())
+        for row in parse_kp_27_table(data).rows
+    ]
 
 
 class NooaAuroraKp3RowValue(BaseModel):
@@ -45,38 +123,80 @@ class NooaAuroraKp3Col(BaseModel):
     values: list[NooaAuroraKp3RowValue]
 
 
-def parse_kp_3_forecast(data: str) -> list[NooaAuroraKp3Col]:
-    res: list[NooaAuroraKp3Col] = []
-    cols_init = False
+class Kp3Table:
+    """3-дневный прогноз Kp: столбцы - даты, строки - слоты `00-03UT`
+
+    `kp[i][j]` - Kp в слоте `times[i]` даты `dates[j]`
+    """
+
+    __slots__ = ("issued", "dates", "times", "kp")
+
+    def __init__(
+        self,
+        issued: datetime | None,
+        dates: tuple[str, ...],
+        times: tuple[str, ...],
+        kp: tuple[tuple[float, ...], ...],
+    ):
+        self.issued = issued
+        self.dates = dates
+        self.times = times
+        self.kp = kp
+
+    def to_json(self) -> bytes:
+        """JSON в формате `list[NooaAuroraKp3Col]`"""
+        return json.dumps(
+            [
+                {
+                    "date": d,
+                    "values": [
+                        {"time": time, "kp_index": row[j]}
+                        for time, row in zip(self.times, self.kp)
+                    ],
+                }
+                for j, d in enumerate(self.dates)
+            ],
+            separators=(",", ":"),
+        ).encode()
+
+
+def parse_kp_3_table(data: str) -> Kp3Table:
+    """Таблица `NOAA Kp index breakdown` за один проход по строкам
+
+    Пометки шкалы бурь после значения (`5.00 (G1)`) пропускаются
+    """
+    issued = None
+    dates: tuple[str, ...] = ()
+    times = []
+    kp = []
     for line in data.splitlines():
-        if line.startswith("#"):
-            continue
-        if line.startswith(":"):
-            continue
-        if len(line) < 3:
+        if line.startswith(":Issued:"):
+            issued = parse_issued(line)
+        if len(line) < 3 or line[0] in "#:":
             continue
-        if line.startswith("          ") and not cols_init:
-            columns = line.strip().rsplit("    ", maxsplit=2)
-            for col in columns:
-                res.append(NooaAuroraKp3Col(date=col.strip(), values=[]))
-            cols_init = True
-        if line[2] != "-":
+        if not dates and line.startswith("          "):
+            dates = tuple(KP_3_DATE_RE.findall(line))
             continue
-        if "UT" not in line:
+        if line[2] != "-" or "UT" not in line:
             continue
-        line = line.strip()
-        if not line:
-            continue
-        raw_date, raw_values = line.split(maxsplit=1)
-        values = raw_values.split(maxsplit=2)
-
-        for num in range(len(columns)):
-            if not res:
-                raise Exception("No cols init")
-            res[num].values.append(
-                NooaAuroraKp3RowValue(
-                    time=raw_date,
-                    kp_index=values[num],
-                )
-            )
-    return res
+        if not dates:
+            raise ValueError("No cols init")
+        time, *values = line.split()
+        row = tuple(float(v) for v in values if not v.startswith("("))
+        times.append(time)
+        kp.append(row[: len(dates)])
+    return Kp3Table(issued, dates, tuple(times), tuple(kp))
+
+
+def parse_kp_3_forecast(data: str) -> list[NooaAuroraKp3Col]:
+    table = parse_kp_3_table(data)
+    return [
+        NooaAuroraKp3Col(
+            date=d,
+            values=[
+                NooaAuroraKp3RowValue(time=time, kp_index=row[j])
+                for time, row in zip(table.times, table.kp)
+            ],
+        )
+        for j, d in enumerate(table.dates)
+    ]
@@ -1,22 +1,24 @@
+import hashlib
 from datetime import datetime
-from typing import Annotated
+from functools import cached_property
+from typing import Annotated, Callable, Generic, Protocol, TypeVar
 
-import hishel
-from fastapi import Depends
+import httpx
+from fastapi import Depends, Response
 from pydantic import BaseModel, Field
 
+from internal.http_cache import EncodedContent
+from internal.nooa.feed import Feed
+from internal.nooa.grid import AuroraGrid
 from internal.nooa.nooa_parser import (
+    Kp3Table,
+    Kp27Table,
     NooaAuroraKp3Col,
     NooaAuroraKp27Row,
-    parse_kp_3_forecast,
-    parse_kp_27_outlook,
+    parse_kp_3_table,
+    parse_kp_27_table,
 )
-
-storage = hishel.InMemoryStorage(capacity=64, ttl=3600)
-client = hishel.CacheClient(storage=storage)
-
-long_storage = hishel.InMemoryStorage(capacity=64, ttl=24 * 3600)
-long_client = hishel.CacheClient(storage=long_storage)
+from internal.nooa.upstream import UpstreamDep
 
 
 class NooaAuroraRes(BaseModel):
@@ -44,48 +46,105 @@ class NooaAuroraRes(BaseModel):
         },
     }
 
+    @cached_property
+    def grid(self) -> AuroraGrid:
+        return AuroraGrid.from_coordinates(self.coordinates)
+
+
+class JsonTable(Protocol):
+    def to_json(self) -> bytes: ...
+
+
+TableT = TypeVar("TableT", bound=JsonTable)
+
+
+class TextProduct(Generic[TableT]):
+    """Разобранный текстовый продукт SWPC и готовое тело ответа"""
+
+    __slots__ = ("version", "table", "content")
+
+    def __init__(self, version: str, table: TableT):
+        self.version = version
+        self.table = table
+        self.content = EncodedContent(table.to_json())
+
+
+class TextProductCache(Generic[TableT]):
+    """Разбирает текст продукта один раз на каждую версию содержимого
 
-def use_nooa_aurora_client() -> bytes:
-    res = client.get(
-        "https://services.swpc.noaa.gov/json/ovation_aurora_latest.json"
-    )
-    if res.status_code != 200:
-        raise Exception("Failed to get data from nooa (aurora client)")
-    # data = res.json()
-    # return NooaAuroraReq.model_validate(data)
-    return res.content
+    Для неизменившегося текста возвращается тот же объект, поэтому `Feed`
+    не оповещает подписчиков, а ответы не сериализуются заново
+    """
 
+    def __init__(self, parse: Callable[[str], TableT]):
+        self.parse = parse
+        self._product: TextProduct[TableT] | None = None
 
-AuroraDep = Annotated[NooaAuroraRes, Depends(use_nooa_aurora_client)]
+    def get(self, raw: bytes) -> TextProduct[TableT]:
+        version = hashlib.sha1(raw).hexdigest()[:16]
+        product = self._product
+        if product is None or product.version != version:
+            product = TextProduct(version, self.parse(raw.decode()))
+            self._product = product
+        return product
+
+    def clear(self):
+        self._product = None
 
 
 # https://services.swpc.noaa.gov/text/3-day-forecast.txt
 NooaAuroraKp3Req = list[NooaAuroraKp3Col]
+Kp3Product = TextProduct[Kp3Table]
+kp_3_cache = TextProductCache(parse_kp_3_table)
+
+
+async def parse_kp_3(res: httpx.Response) -> Kp3Product:
+    return kp_3_cache.get(res.content)
+
+
+kp_3_feed = Feed(
+    "nooa",
+    "3-day-forecast",
+    "https://services.swpc.noaa.gov/text/3-day-forecast.txt",
+    parse_kp_3,
+    interval=24 * 3600,
+)
 
 
-def use_nooa_aurora_kp_client() -> NooaAuroraKp3Req:
-    res = long_client.get(
-        "https://services.swpc.noaa.gov/text/3-day-forecast.txt"
-    )
-    if res.status_code != 200:
-        raise Exception("Failed to get data from nooa (3-day-forecast)")
-    return parse_kp_3_forecast(res.text)
+async def use_nooa_aurora_kp_client(
+    client: UpstreamDep,
+    response: Response,
+) -> Kp3Product:
+    return await kp_3_feed.get(client, response)
 
 
-Kp3Dep = Annotated[NooaAuroraKp3Req, Depends(use_nooa_aurora_kp_client)]
+Kp3Dep = Annotated[Kp3Product, Depends(use_nooa_aurora_kp_client)]
 
 
 # https://services.swpc.noaa.gov/text/27-day-outlook.txt
 NooaAuroraKp27Req = list[NooaAuroraKp27Row]
+Kp27Product = TextProduct[Kp27Table]
+kp_27_cache = TextProductCache(parse_kp_27_table)
+
+
+async def parse_kp_27(res: httpx.Response) -> Kp27Product:
+    return kp_27_cache.get(res.content)
+
+
+kp_27_feed = Feed(
+    "nooa",
+    "27-day-outlook",
+    "https://services.swpc.noaa.gov/text/27-day-outlook.txt",
+    parse_kp_27,
+    interval=24 * 3600,
+)
 
 
-def use_nooa_aurora_kp_27_client() -> NooaAuroraKp27Req:
-    res = long_client.get(
-        "https://services.swpc.noaa.gov/text/27-day-outlook.txt"
-    )
-    if res.status_code != 200:
-        raise Exception("Failed to get data from nooa (27-day-outlook)")
-    return parse_kp_27_outlook(res.text)
+async def use_nooa_aurora_kp_27_client(
+    client: UpstreamDep,
+    response: Response,
+) -> Kp27Product:
+    return await kp_27_feed.get(client, response)
 
 
-Kp27Dep = Annotated[NooaAuroraKp27Req, Depends(use_nooa_aurora_kp_27_client)]
+Kp27Dep = Annotated[Kp27Product, Depends(use_nooa_aurora_kp_27_client)]
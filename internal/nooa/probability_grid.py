@@ -0,0 +1,165 @@
+import json
+from datetime import datetime, timezone
+from functools import lru_cache
+
+import numpy as np
+from pydantic import AwareDatetime, BaseModel
+
+from internal.nooa import swpc_req
+from internal.nooa.calc import (
+    AuroraProbabilityBatchBody,
+    AuroraProbabilityCalculation,
+    bz_factor,
+    clouds_factor,
+    dst_factor,
+    kp_zone,
+    speed_factor,
+)
+from internal.nooa.grid import GRID_LON
+
+# Столбцы 0..359 и широта -90..90, как в сетке OVATION
+LONS = np.arange(GRID_LON, dtype=np.float32)
+# Географическая долгота столбца: столбец = долгота + 180, как в `nooa_cell`
+GEO_LONS = LONS - 180
+LATS = np.arange(-90, 91, dtype=np.float32)
+DATA_FORMAT = "[Longitude, Latitude, Probability]"
+
+
+class AuroraProbabilityGrid(BaseModel):
+    time: AwareDatetime
+    speed: float
+    clouds: float
+    data_format: str = DATA_FORMAT
+    coordinates: list[list[int]]
+
+
+def local_hours(utc_hour: int) -> np.ndarray:
+    """Местное солнечное время по долготе"""
+    return (utc_hour + GEO_LONS // 15).astype(np.int32) % 24
+
+
+def time_factors(hours: np.ndarray) -> np.ndarray:
+    return np.where((hours >= 22) | (hours <= 2), 1.0, 0.5)
+
+
+def base_probabilities(kp: int, lats: np.ndarray) -> np.ndarray:
+    """Базовая вероятность по широте, как в `calc.aurora_probability`"""
+    geomagnetic_latitude = np.minimum(lats + 5, 90)
+    visibility_zone = kp_zone(kp)
+    return np.maximum(0, 100 - (visibility_zone - geomagnetic_latitude) * 10)
+
+
+@lru_cache(maxsize=32)
+def probability_grid(
+    kp: int,
+    bz: float,
+    dst: float,
+    utc_hour: int,
+    speed: float,
+    clouds: float,
+) -> np.ndarray:
+    """Вероятность сияния на всей сетке 360x181 (долгота, широта)
+
+    Та же модель, что и `calc.aurora_probability`, посчитанная за один
+    проход; время суток берётся по местному солнечному времени долготы
+    """
+    weight = (
+        bz_factor(bz)
+        * speed_factor(speed)
+        * dst_factor(dst)
+        * clouds_factor(clouds)
+    )
+    base = base_probabilities(kp, LATS)
+    time_weight = time_factors(local_hours(utc_hour))
+    grid = np.minimum(np.outer(time_weight, base) * weight, 100)
+    grid = grid.astype(np.float32)
+    grid.flags.writeable = False
+    return grid
+
+
+@lru_cache(maxsize=32)
+def _probability_grid_json(
+    kp: int,
+    bz: float,
+    dst: float,
+    time: datetime,
+    speed: float,
+    clouds: float,
+) -> bytes:
+    grid = probability_grid(kp, bz, dst, time.hour, speed, clouds)
+    lon, lat = np.meshgrid(LONS, LATS, indexing="ij")
+    coordinates = np.stack([lon, lat, np.rint(grid)], axis=-1)
+    data = {
+        "time": time.isoformat(),
+        "speed": speed,
+        "clouds": clouds,
+        "data_format": DATA_FORMAT,
+        "coordinates": coordinates.reshape(-1, 3).astype(np.int32).tolist(),
+    }
+    return json.dumps(data, separators=(",", ":")).encode()
+
+
+def probability_grid_json(
+    dst: swpc_req.SwpcDstReq,
+    bz: swpc_req.SwpcBzReq,
+    kp: swpc_req.SwpcKpReq,
+    speed: float,
+    clouds: float,
+    now: datetime | None = None,
+) -> bytes:
+    """Сериализованная сетка, кэшируется на час для текущих данных SWPC"""
+    now = now or datetime.now(timezone.utc)
+    hour = now.astimezone(timezone.utc).replace(
+        minute=0, second=0, microsecond=0
+    )
+    return _probability_grid_json(
+        kp.kp, bz.bz_gse, dst.dst, hour, speed, clouds
+    )
+
+
+def aurora_probability_batch(
+    body: AuroraProbabilityBatchBody,
+    dst: swpc_req.SwpcDstReq,
+    bz: swpc_req.SwpcBzReq,
+    kp: swpc_req.SwpcKpReq,
+    now: datetime | None = None,
+) -> list[AuroraProbabilityCalculation]:
+    """`calc.aurora_probability` для многих точек за один проход"""
+    now = now or datetime.now(timezone.utc)
+    points = body.points
+    lats = np.array([p.lat for p in points], dtype=np.float64)
+    hours = np.array([(p.local_time or now).hour for p in points])
+    clouds = np.array(
+        [body.clouds if p.clouds is None else p.clouds for p in points],
+        dtype=np.float64,
+    )
+
+    base = base_probabilities(kp.kp, lats)
+    bz_weight = bz_factor(bz.bz_gse)
+    speed_weight = speed_factor(body.speed)
+    dst_weight = dst_factor(dst.dst)
+    clouds_weights = 1 - clouds / 100
+    time_weights = time_factors(hours)
+    probabilities = np.minimum(
+        base
+        * bz_weight
+        * speed_weight
+        * dst_weight
+        * clouds_weights
+        * time_weights,
+        100,
+    )
+    return [
+        AuroraProbabilityCalculation(
+            base_probability=float(base_probability),
+            bz_weight=bz_weight,
+            speed_weight=speed_weight,
+            dst_weight=dst_weight,
+            clouds_weight=float(clouds_weight),
+            time_weight=float(time_weight),
+            probability=float(probability),
+        )
+        for base_probability, clouds_weight, time_weight, probability in zip(
+            base, clouds_weights, time_weights, probabilities
+        )
+    ]
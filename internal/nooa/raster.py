@@ -0,0 +1,142 @@
+import hashlib
+import struct
+import zlib
+from datetime import datetime
+from typing import NamedTuple
+
+import numpy as np
+
+from internal.lru import LRUCache
+from internal.nooa.grid import GRID_LON, AuroraGrid
+
+# Заголовок бинарного формата: сигнатура, версия формата, шаг сетки,
+# ширина, высота, долгота первого столбца, широта первой (северной) строки,
+# время наблюдения OVATION (unix, секунды). Далее width * height байт uint8
+# построчно с севера на юг
+GRID_HEADER = struct.Struct("<4sBBHHhhq")
+GRID_MAGIC = b"AURG"
+GRID_FORMAT_VERSION = 1
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+class BBox(NamedTuple):
+    min_lon: int
+    min_lat: int
+    max_lon: int
+    max_lat: int
+
+
+WORLD = BBox(-180, -90, 179, 90)
+
+
+def parse_bbox(value: str | None) -> BBox:
+    """`min_lon,min_lat,max_lon,max_lat` в географических градусах
+
+    Для области через антимеридиан `max_lon` задаётся больше 180
+    """
+    if not value:
+        return WORLD
+    try:
+        min_lon, min_lat, max_lon, max_lat = (
+            float(v) for v in value.split(",")
+        )
+    except ValueError as e:
+        raise ValueError("bbox must be min_lon,min_lat,max_lon,max_lat") from e
+    bbox = BBox(
+        int(np.floor(min_lon)),
+        int(np.floor(min_lat)),
+        int(np.ceil(max_lon)),
+        int(np.ceil(max_lat)),
+    )
+    if not (-90 <= bbox.min_lat <= bbox.max_lat <= 90):
+        raise ValueError("bbox latitude must be within -90..90")
+    if not (-180 <= bbox.min_lon <= bbox.max_lon <= 360):
+        raise ValueError("bbox longitude must be within -180..360")
+    if bbox.max_lon - bbox.min_lon >= GRID_LON:
+        raise ValueError("bbox is wider than 360 degrees")
+    return bbox
+
+
+def crop(grid: AuroraGrid, bbox: BBox, step: int) -> np.ndarray:
+    """Растр (широта с севера на юг, долгота) с шагом `step` градусов
+
+    Столбец сетки - долгота + 180, как в `grid.nooa_cell`
+    """
+    lats = np.arange(bbox.max_lat, bbox.min_lat - 1, -step)
+    lons = np.arange(bbox.min_lon, bbox.max_lon + 1, step)
+    return grid.array[np.ix_((lons + 180) % GRID_LON, lats + 90)].T
+
+
+def encode_grid(
+    data: np.ndarray, bbox: BBox, step: int, observation_time: datetime
+) -> bytes:
+    height, width = data.shape
+    header = GRID_HEADER.pack(
+        GRID_MAGIC,
+        GRID_FORMAT_VERSION,
+        step,
+        width,
+        height,
+        bbox.min_lon,
+        bbox.max_lat,
+        int(observation_time.timestamp()),
+    )
+    return header + np.ascontiguousarray(data, dtype=np.uint8).tobytes()
+
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    return (
+        struct.pack(">I", len(data))
+        + kind
+        + data
+        + struct.pack(">I", zlib.crc32(kind + data))
+    )
+
+
+def encode_png(data: np.ndarray) -> bytes:
+    """PNG из uint8 массива: (h, w) оттенки серого или (h, w, 4) RGBA"""
+    height, width = data.shape[:2]
+    color_type = 6 if data.ndim == 3 else 0
+    rows = np.ascontiguousarray(data, dtype=np.uint8).reshape(height, -1)
+    # Байт фильтра 0 (None) в начале каждой строки
+    raw = np.hstack([np.zeros((height, 1), dtype=np.uint8), rows])
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0)
+    return (
+        PNG_SIGNATURE
+        + _png_chunk(b"IHDR", ihdr)
+        + _png_chunk(b"IDAT", zlib.compress(raw.tobytes(), 6))
+        + _png_chunk(b"IEND", b"")
+    )
+
+
+class Raster(NamedTuple):
+    content: bytes
+    etag: str
+
+
+raster_cache: LRUCache[tuple, Raster] = LRUCache(maxsize=256)
+
+
+def render_raster(
+    version: str,
+    grid: AuroraGrid,
+    observation_time: datetime,
+    fmt: str,
+    bbox: BBox,
+    step: int,
+) -> Raster:
+    """Растр снимка OVATION, кэшируется по версии снимка"""
+    key = (version, fmt, bbox, step)
+    raster = raster_cache.get(key)
+    if raster is not None:
+        return raster
+    data = crop(grid, bbox, step)
+    if fmt == "png":
+        content = encode_png(data)
+    else:
+        content = encode_grid(data, bbox, step, observation_time)
+    etag = f'"{hashlib.sha1(content).hexdigest()[:20]}"'
+    raster = Raster(content, etag)
+    raster_cache.put(key, raster)
+    return raster
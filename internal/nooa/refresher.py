@@ -0,0 +1,40 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, Iterable
+
+from internal.nooa import nooa_req, swpc_req, upstream
+from internal.nooa.aurora_snapshot import ovation_feed
+from internal.nooa.feed import Feed
+
+FEEDS: list[Feed[Any]] = [
+    ovation_feed,
+    swpc_req.dst_feed,
+    swpc_req.bz_feed,
+    swpc_req.kp_feed,
+    nooa_req.kp_3_feed,
+    nooa_req.kp_27_feed,
+]
+
+
+async def refresh_loop(feed: Feed[Any]):
+    """Обновление источника раньше, чем его значение устареет"""
+    while True:
+        try:
+            await feed.refresh(upstream.use_client())
+        except Exception:
+            # Ошибка уже записана в лог самим источником
+            pass
+        await asyncio.sleep(feed.interval)
+
+
+@asynccontextmanager
+async def run_refresher(
+    feeds: Iterable[Feed[Any]] = FEEDS,
+) -> AsyncGenerator[None, None]:
+    tasks = [asyncio.create_task(refresh_loop(feed)) for feed in feeds]
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -1,12 +1,13 @@
 from datetime import datetime
 from typing import Annotated
 
-import hishel
-from fastapi import Depends
+import httpx
+from fastapi import Depends, Response
 from pydantic import BaseModel, Field
 
-storage = hishel.InMemoryStorage(capacity=64, ttl=3600)
-client = hishel.CacheClient(storage=storage)
+from internal.nooa.feed import Feed
+from internal.nooa.history import history
+from internal.nooa.upstream import UpstreamDep
 
 
 class SwpcDstReq(BaseModel):
@@ -14,14 +15,26 @@ class SwpcDstReq(BaseModel):
     time_tag: datetime
 
 
-def use_dst_client() -> SwpcDstReq:
-    res = client.get(
-        "https://services.swpc.noaa.gov/json/geospace/geospace_dst_1_hour.json"
-    )
-    if res.status_code != 200:
-        raise Exception("Failed to get data from swpc (dst client)")
-    data = res.json()[0]
-    return SwpcDstReq.model_validate(data)
+async def parse_dst(res: httpx.Response) -> SwpcDstReq:
+    rows = res.json()
+    await history.record_rows("dst", rows, "dst")
+    return SwpcDstReq.model_validate(rows[0])
+
+
+dst_feed = Feed(
+    "swpc",
+    "dst client",
+    "https://services.swpc.noaa.gov/json/geospace/geospace_dst_1_hour.json",
+    parse_dst,
+    interval=5 * 60,
+)
+
+
+async def use_dst_client(
+    client: UpstreamDep,
+    response: Response,
+) -> SwpcDstReq:
+    return await dst_feed.get(client, response)
 
 
 DstDep = Annotated[SwpcDstReq, Depends(use_dst_client)]
@@ -33,14 +46,26 @@ class SwpcBzReq(BaseModel):
     time_tag: datetime
 
 
-def use_bz_client() -> SwpcBzReq:
-    res = client.get(
-        "https://services.swpc.noaa.gov/json/dscovr/dscovr_mag_1s.json"
-    )
-    if res.status_code != 200:
-        raise Exception("Failed to get data from swpc (bz client)")
-    data = res.json()[0]
-    return SwpcBzReq.model_validate(data)
+async def parse_bz(res: httpx.Response) -> SwpcBzReq:
+    rows = res.json()
+    await history.record_rows("bz_gsm", rows, "bz_gsm")
+    return SwpcBzReq.model_validate(rows[0])
+
+
+bz_feed = Feed(
+    "swpc",
+    "bz client",
+    "https://services.swpc.noaa.gov/json/dscovr/dscovr_mag_1s.json",
+    parse_bz,
+    interval=60,
+)
+
+
+async def use_bz_client(
+    client: UpstreamDep,
+    response: Response,
+) -> SwpcBzReq:
+    return await bz_feed.get(client, response)
 
 
 BzDep = Annotated[SwpcBzReq, Depends(use_bz_client)]
@@ -51,14 +76,26 @@ class SwpcKpReq(BaseModel):
     time_tag: datetime
 
 
-def use_kp_client() -> SwpcKpReq:
-    res = client.get(
-        "https://services.swpc.noaa.gov/json/planetary_k_index_1m.json"
-    )
-    if res.status_code != 200:
-        raise Exception("Failed to get data from swpc (kp client)")
-    data = res.json()[0]
-    return SwpcKpReq.model_validate(data)
+async def parse_kp(res: httpx.Response) -> SwpcKpReq:
+    rows = res.json()
+    await history.record_rows("kp", rows, "kp_index")
+    return SwpcKpReq.model_validate(rows[0])
+
+
+kp_feed = Feed(
+    "swpc",
+    "kp client",
+    "https://services.swpc.noaa.gov/json/planetary_k_index_1m.json",
+    parse_kp,
+    interval=60,
+)
+
+
+async def use_kp_client(
+    client: UpstreamDep,
+    response: Response,
+) -> SwpcKpReq:
+    return await kp_feed.get(client, response)
 
 
 KpDep = Annotated[SwpcKpReq, Depends(use_kp_client)]
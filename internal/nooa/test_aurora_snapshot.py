@@ -0,0 +1,37 @@
+import asyncio
+import json
+
+from .aurora_snapshot import AuroraSnapshotCache, snapshot_version
+
+
+def make_raw(observation: str, forecast: str) -> bytes:
+    return json.dumps(
+        {
+            "Observation Time": observation,
+            "Forecast Time": forecast,
+            "Data Format": "[Longitude, Latitude, Aurora]",
+            "coordinates": [[0, -90, 3], [218, 56, 5]],
+        }
+    ).encode()
+
+
+def test_snapshot_version():
+    raw = make_raw("2025-01-11T15:06:00Z", "2025-01-11T16:06:00Z")
+    assert snapshot_version(raw) == "2025-01-11T15:06:00Z/2025-01-11T16:06:00Z"
+    assert len(snapshot_version(b"{}")) == 40
+
+
+def get(cache: AuroraSnapshotCache, raw: bytes):
+    return asyncio.run(cache.get(raw))
+
+
+def test_snapshot_parsed_once_per_version():
+    cache = AuroraSnapshotCache()
+    first = get(cache, make_raw("2025-01-11T15:06:00Z", "2025-01-11T16:06:00Z"))
+    same = get(cache, make_raw("2025-01-11T15:06:00Z", "2025-01-11T16:06:00Z"))
+    assert same is first
+    assert first.grid.get(218, 56) == 5
+
+    new = get(cache, make_raw("2025-01-11T15:11:00Z", "2025-01-11T16:11:00Z"))
+    assert new is not first
+    assert cache.snapshot is new
@@ -1,4 +1,11 @@
-from internal.nooa.calc import nearst_aurora_probability
+import pytest
+from pydantic import ValidationError
+
+from internal.nooa.calc import (
+    AuroraProbabilityPoint,
+    nearst_aurora_probability,
+    nearst_aurora_probability_batch,
+)
 from internal.nooa.nooa_req import NooaAuroraRes
 from internal.routers.api_router import NooaAuroraReq
 
@@ -23,3 +30,75 @@ def test_nearest_aurora():
     assert prob_map.probability == 5
     assert prob_map.lat == 56
     assert prob_map.lon == 38
+
+
+def test_nearest_aurora_full_grid():
+    prob_map = NooaAuroraRes(
+        Observation_Time="2025-01-11T15:06:00Z",
+        Forecast_Time="2025-01-11T16:06:00Z",
+        Data_Format="[Longitude, Latitude, Aurora]",
+        coordinates=[
+            [lon, lat, (lon + lat) % 101]
+            for lon in range(360)
+            for lat in range(-90, 91)
+        ],
+    )
+    res = nearst_aurora_probability(
+        pos=NooaAuroraReq(lat=-89.9, lon=179.9),
+        prob_map=prob_map,
+    )
+    assert res.nooa_lon == 0
+    assert res.nooa_lat == -90
+    assert res.probability == (0 - 90) % 101
+    res = nearst_aurora_probability(
+        pos=NooaAuroraReq(lat=68.97, lon=33.09),
+        prob_map=prob_map,
+    )
+    assert res.probability == (213 + 69) % 101
+
+
+def test_nearest_aurora_batch_matches_single():
+    prob_map = NooaAuroraRes(
+        Observation_Time="2025-01-11T15:06:00Z",
+        Forecast_Time="2025-01-11T16:06:00Z",
+        Data_Format="[Longitude, Latitude, Aurora]",
+        coordinates=[
+            [lon, lat, (lon * 7 + lat) % 101]
+            for lon in range(360)
+            for lat in range(-90, 91)
+        ],
+    )
+    points = [
+        NooaAuroraReq(lat=lat, lon=lon)
+        for lat, lon in [
+            (55.75, 37.62),
+            (68.97, 33.09),
+            (-89.9, 179.9),
+            (0.45, -179.6),
+            (12.5, 13.5),
+        ]
+    ]
+    res = nearst_aurora_probability_batch(points, prob_map.grid)
+    assert res == [
+        nearst_aurora_probability(pos=p, prob_map=prob_map) for p in points
+    ]
+
+
+@pytest.mark.parametrize(
+    "point",
+    [
+        {"lat": 91, "lon": 0},
+        {"lat": 0, "lon": 181},
+        {"lat": 0, "lon": 0, "clouds": 101},
+    ],
+)
+def test_point_out_of_range(point: dict):
+    # Координаты вне сетки - ошибка валидации (422), а не IndexError
+    with pytest.raises(ValidationError):
+        AuroraProbabilityPoint(**point)
+
+
+def test_nooa_point_out_of_range():
+    with pytest.raises(ValidationError):
+        NooaAuroraReq(lat=-90.5, lon=0)
+    assert NooaAuroraReq(lat=90, lon=-180).lat == 90
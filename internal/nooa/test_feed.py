@@ -0,0 +1,130 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import Response
+
+from . import upstream
+from .feed import Feed, UpstreamError
+from .refresher import run_refresher
+
+
+async def parse_text(res: httpx.Response) -> str:
+    return res.text
+
+
+def make_feed(interval: float = 60) -> tuple[Feed[str], list[str]]:
+    calls: list[str] = []
+    feed = Feed(
+        "test",
+        "test feed",
+        "https://services.swpc.noaa.gov/json/test.json",
+        parse_text,
+        interval=interval,
+    )
+    return feed, calls
+
+
+def counting_transport(calls: list[str]) -> httpx.MockTransport:
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        return httpx.Response(200, text=f"value {len(calls)}")
+
+    return httpx.MockTransport(handler)
+
+
+def test_feed_reads_latest_value():
+    feed, calls = make_feed()
+
+    async def run():
+        async with upstream.open_client(counting_transport(calls)) as client:
+            first = await feed.get(client)
+            second = await feed.get(client)
+            return first, second
+
+    assert asyncio.run(run()) == ("value 1", "value 1")
+    assert len(calls) == 1
+
+
+def test_refresher_prefetches_feed():
+    feed, calls = make_feed(interval=0.01)
+
+    async def run():
+        async with upstream.open_client(counting_transport(calls)):
+            async with run_refresher([feed]):
+                await asyncio.sleep(0.1)
+        return feed.value
+
+    value = asyncio.run(run())
+    assert len(calls) > 1
+    assert value == f"value {len(calls)}"
+
+
+def test_concurrent_refresh_single_flight():
+    feed, calls = make_feed()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, text="value")
+
+    async def run():
+        transport = httpx.MockTransport(handler)
+        async with upstream.open_client(transport) as client:
+            return await asyncio.gather(*[feed.get(client) for _ in range(10)])
+
+    assert asyncio.run(run()) == ["value"] * 10
+    assert len(calls) == 1
+
+
+def test_stale_value_served_while_upstream_fails():
+    feed, calls = make_feed(interval=60)
+    feed.max_stale = 600
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        return httpx.Response(503)
+
+    async def run():
+        transport = httpx.MockTransport(handler)
+        async with upstream.open_client(transport) as client:
+            response = Response()
+            feed.value = "old value"
+            feed.updated_at = time.monotonic() - 120
+            stale = await feed.get(client, response)
+            # Даём фоновому обновлению завершиться
+            await asyncio.sleep(0.01)
+
+            feed.updated_at = time.monotonic() - 1200
+            with pytest.raises(UpstreamError):
+                await feed.get(client)
+            return stale, response
+
+    stale, response = asyncio.run(run())
+    assert stale == "old value"
+    assert response.headers["X-Data-Age"] == "120"
+    assert len(calls) == 2
+
+
+def test_listeners_notified_on_new_value():
+    feed, calls = make_feed()
+    seen: list[str] = []
+
+    async def listener(value: str):
+        seen.append(value)
+
+    feed.subscribe(listener)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        return httpx.Response(200, text=f"value {len(calls) // 2}")
+
+    async def run():
+        transport = httpx.MockTransport(handler)
+        async with upstream.open_client(transport) as client:
+            for _ in range(3):
+                await feed.refresh(client)
+
+    asyncio.run(run())
+    assert seen == ["value 0", "value 1"]
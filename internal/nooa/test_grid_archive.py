@@ -0,0 +1,75 @@
+import numpy as np
+
+from .grid import GRID_SIZE, nooa_cell
+from .grid_archive import GridArchive
+
+
+def make_grid(cell: int, value: int) -> bytes:
+    data = bytearray(GRID_SIZE)
+    data[cell] = value
+    return bytes(data)
+
+
+def test_grid_archive(tmp_path):
+    archive = GridArchive(tmp_path)
+    cell = nooa_cell(67.6, 33.7)
+    for t, value in [(100, 10), (200, 60), (300, 80)]:
+        assert archive.append(t, make_grid(cell, value))
+    # Повторный снимок и снимок из прошлого не добавляются
+    assert not archive.append(300, make_grid(cell, 99))
+    assert not archive.append(150, make_grid(cell, 99))
+    assert len(archive) == 3
+    assert archive.times().tolist() == [100, 200, 300]
+
+    times, probability = archive.point_series(67.6, 33.7, 150, 400)
+    assert times.tolist() == [200, 300]
+    assert probability.tolist() == [60, 80]
+
+    res = archive.point_history(67.6, 33.7, 0, 1000, threshold=50)
+    assert res.probability == [10, 60, 80]
+    assert res.above == 2
+    assert archive.point_history(0, 0, 0, 1000, 50).probability == [0, 0, 0]
+
+
+def test_grid_archive_recovers_partial_write(tmp_path):
+    archive = GridArchive(tmp_path)
+    archive.append(100, make_grid(0, 1))
+    # Сетка записана, а индекс - нет: запись не видна и будет перезаписана
+    with open(archive.grids_path, "ab") as f:
+        f.write(b"\xff" * 1000)
+    assert len(archive) == 1
+    archive.append(200, make_grid(0, 2))
+    assert archive.grids_path.stat().st_size == 2 * GRID_SIZE
+    assert np.array(archive.grids(2)[:, 0]).tolist() == [1, 2]
+
+
+def test_grid_archive_max_age(tmp_path):
+    archive = GridArchive(tmp_path, max_age=450)
+    for t in range(100, 700, 100):
+        archive.append(t, make_grid(0, t // 100))
+    # Устарела одна запись из шести - меньше COMPACT_SHARE, не переписываем
+    assert archive.times().tolist() == [100, 200, 300, 400, 500, 600]
+    archive.append(700, make_grid(0, 7))
+    assert archive.times().tolist() == [300, 400, 500, 600, 700]
+    assert archive.grids_path.stat().st_size == 5 * GRID_SIZE
+    series = archive.point_series(-90, -180, 0, 1000)[1]
+    assert series.tolist() == [3, 4, 5, 6, 7]
+    assert not archive.grids_tmp.exists()
+
+
+def test_grid_archive_recovers_compaction(tmp_path):
+    archive = GridArchive(tmp_path)
+    for t in (100, 200, 300):
+        archive.append(t, make_grid(0, t // 100))
+    # Сжатие прервано после подмены сеток: индекс остался старым
+    np.array(archive.grids(3)[1:]).tofile(archive.grids_path)
+    archive.times()[1:].tofile(archive.index_tmp)
+    assert archive.point_series(-90, -180, 0, 1000)[1].tolist() == [2, 3]
+    assert not archive.index_tmp.exists()
+
+    # Прервано до подмены сеток: временные файлы удаляются
+    archive.grids_tmp.write_bytes(b"\0")
+    archive.index_tmp.write_bytes(b"\0")
+    assert archive.append(400, make_grid(0, 4))
+    assert archive.times().tolist() == [200, 300, 400]
+    assert not archive.grids_tmp.exists()
@@ -0,0 +1,67 @@
+import asyncio
+from datetime import datetime, timezone
+
+import numpy as np
+
+from .history import MAX_POINTS, HistoryStore, Series, query_history
+
+
+def test_series_append_only(tmp_path):
+    series = Series(tmp_path / "dst.bin")
+    assert series.append(np.array([20, 10, 30]), np.array([2, 1, 3])) == 3
+    # Повтор окна upstream: старые точки и дубликаты отбрасываются
+    assert series.append(np.array([30, 40, 40]), np.array([9, 4, 5])) == 1
+    assert series.append(np.array([], np.int64), np.array([])) == 0
+    records = series.records()
+    assert records["t"].tolist() == [10, 20, 30, 40]
+    assert records["v"].tolist() == [1, 2, 3, 5]
+    assert series.range(15, 40)["t"].tolist() == [20, 30]
+
+
+def test_series_downsample(tmp_path):
+    series = Series(tmp_path / "kp.bin")
+    series.append(np.arange(0, 100, 10), np.arange(10, dtype=np.float32))
+    buckets = series.downsample(0, 100, 30)
+    assert buckets.t.tolist() == [0, 30, 60, 90]
+    assert buckets.min.tolist() == [0, 3, 6, 9]
+    assert buckets.max.tolist() == [2, 5, 8, 9]
+    assert buckets.mean.tolist() == [1, 4, 7, 9]
+    assert buckets.size.tolist() == [3, 3, 3, 1]
+    assert len(series.downsample(200, 300, 30).t) == 0
+
+
+def test_query_history_limits_points(tmp_path):
+    series = Series(tmp_path / "bz_gsm.bin")
+    n = MAX_POINTS * 3
+    series.append(np.arange(n), np.full(n, 1.25, np.float32))
+    raw = query_history(series, "bz_gsm", 0, 10, None)
+    assert raw.step is None
+    assert raw.value == [1.25] * 10
+    res = query_history(series, "bz_gsm", 0, n, None)
+    assert res.step == 3
+    assert len(res.time) == MAX_POINTS
+    assert res.count == [3] * MAX_POINTS
+
+
+def test_record_rows(tmp_path):
+    store = HistoryStore(tmp_path)
+    rows = [
+        {"time_tag": "2025-01-11 15:00:00.000", "bz_gsm": -3.5},
+        {"time_tag": "2025-01-11 15:00:01.000", "bz_gsm": None},
+        {"time_tag": "2025-01-11 15:00:02.000", "bz_gsm": 1.5},
+    ]
+    start = datetime(2025, 1, 11, 15, tzinfo=timezone.utc)
+    end = datetime(2025, 1, 11, 16, tzinfo=timezone.utc)
+
+    async def run():
+        await store.record_rows("bz_gsm", rows, "bz_gsm")
+        # Ошибка разбора пишется в лог и не ломает источник
+        await store.record_rows(
+            "bz_gsm", [{"time_tag": "bad", "bz_gsm": 1}], "bz_gsm"
+        )
+        return await store.query("bz_gsm", start, end)
+
+    res = asyncio.run(run())
+    t = int(start.timestamp())
+    assert res.time == [t, t + 2]
+    assert res.value == [-3.5, 1.5]
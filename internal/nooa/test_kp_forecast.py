@@ -0,0 +1,78 @@
+import json
+from datetime import datetime, timezone
+
+from .kp_forecast import (
+    KpForecastBatchBody,
+    KpForecastEngine,
+    KpForecastPointBody,
+    infer_date,
+)
+from .nooa_parser import Kp3Table
+
+SLOTS = ["00-03UT", "03-06UT", "06-09UT", "09-12UT"]
+SLOTS += ["12-15UT", "15-18UT", "18-21UT", "21-00UT"]
+
+
+def make_table(kps: dict[str, list[float]]) -> Kp3Table:
+    return Kp3Table(
+        None,
+        tuple(kps),
+        tuple(SLOTS),
+        tuple(zip(*kps.values())),
+    )
+
+
+def test_infer_date():
+    now = datetime(2024, 12, 31, 12, tzinfo=timezone.utc)
+    assert infer_date("Jan 01", now) == datetime(
+        2025, 1, 1, tzinfo=timezone.utc
+    )
+    assert infer_date("Dec 30", now).year == 2024
+
+
+def test_kp_forecast():
+    table = make_table(
+        {
+            "Dec 31": [1.33] * 8,
+            "Jan 01": [2, 2, 2, 2, 2, 2, 2, 5.67],
+            "Jan 02": [0.33] * 8,
+        }
+    )
+    now = datetime(2024, 12, 31, 7, tzinfo=timezone.utc)
+    engine = KpForecastEngine()
+    body = KpForecastBatchBody(
+        points=[
+            # Москва: местное солнечное время UTC+2
+            KpForecastPointBody(lat=55.75, lon=37.62),
+            KpForecastPointBody(lat=10, lon=0),
+        ],
+        clouds=0,
+    )
+    res = engine.evaluate(table, body, now)
+    assert len(res.slots) == 24
+    assert res.slots[8].start == datetime(2025, 1, 1, tzinfo=timezone.utc)
+    moscow, south = res.points
+    assert len(moscow.probability) == 24
+    # Kp 5.67 -> 6 в 21-00UT 1 января, ночь по местному времени
+    assert moscow.best is not None
+    assert moscow.best.start == datetime(2025, 1, 1, 21, tzinfo=timezone.utc)
+    assert moscow.best.probability == 100
+    assert south.best is None
+    assert max(south.probability) == 0
+    # Kp < 1 не означает сияние на любой широте
+    assert moscow.probability[-1] < 100
+
+    # Прошедшие слоты не попадают в лучшее окно
+    later = engine.evaluate(
+        table, body, datetime(2025, 1, 2, 1, tzinfo=timezone.utc)
+    )
+    assert later.points[0].best is not None
+    assert later.points[0].best.start.day == 2
+    assert later.version == res.version
+
+    point = KpForecastPointBody(lat=55.74, lon=37.62)
+    content = engine.point_json(table, point, 450, 0, now)
+    assert engine.point_json(table, point, 450, 0, now) is content
+    data = json.loads(content)
+    assert data["points"][0]["lat"] == 55.7
+    assert data["points"][0]["best"]["start"] == "2025-01-01T21:00:00Z"
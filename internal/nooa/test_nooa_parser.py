@@ -1,4 +1,16 @@
-from .nooa_parser import parse_kp_3_forecast, parse_kp_27_outlook
+from datetime import datetime, timezone
+
+from pydantic import TypeAdapter
+
+from .nooa_parser import (
+    NooaAuroraKp3Col,
+    NooaAuroraKp27Row,
+    parse_kp_3_forecast,
+    parse_kp_3_table,
+    parse_kp_27_outlook,
+    parse_kp_27_table,
+)
+from .nooa_req import TextProductCache
 
 
 def test_parse_kp_3_forecast():
@@ -185,3 +197,53 @@ def test_parse_kp_27_outlook():
             "largest_kp_index": 3,
         },
     ]
+
+
+def test_kp_3_table_storm_scale():
+    data = """
+:Product: 3-Day Forecast
+:Issued: 2025 Jun 01 0030 UTC
+NOAA Kp index breakdown Jun 01-Jun 03 2025
+
+             Jun 01       Jun 02       Jun 03
+00-03UT       8.00 (G4)    4.67 (G1)    3.00
+03-06UT       7.33 (G3)    4.00         2.67
+"""
+    table = parse_kp_3_table(data)
+    assert table.issued == datetime(2025, 6, 1, 0, 30, tzinfo=timezone.utc)
+    assert table.dates == ("Jun 01", "Jun 02", "Jun 03")
+    assert table.times == ("00-03UT", "03-06UT")
+    assert table.kp == ((8.0, 4.67, 3.0), (7.33, 4.0, 2.67))
+    # Готовый JSON совпадает с сериализацией моделей ответа
+    adapter = TypeAdapter(list[NooaAuroraKp3Col])
+    assert table.to_json() == adapter.dump_json(parse_kp_3_forecast(data))
+
+
+def test_kp_27_table_json():
+    data = """
+:Issued: 2025 Jan 06 0242 UTC
+#  Date       10.7 cm      A Index    Kp Index
+2025 Jan 06     172          22          5
+2025 Jan 07     165          12          4
+"""
+    table = parse_kp_27_table(data)
+    assert table.issued == datetime(2025, 1, 6, 2, 42, tzinfo=timezone.utc)
+    adapter = TypeAdapter(list[NooaAuroraKp27Row])
+    assert table.to_json() == adapter.dump_json(parse_kp_27_outlook(data))
+
+
+def test_text_product_cache():
+    calls = []
+
+    def parse(data: str):
+        calls.append(data)
+        return parse_kp_27_table(data)
+
+    cache = TextProductCache(parse)
+    raw = b"2025 Jan 06     172          22          5\n"
+    product = cache.get(raw)
+    assert cache.get(raw) is product
+    assert len(calls) == 1
+    assert product.content.bodies["identity"] == product.table.to_json()
+    assert cache.get(raw.replace(b"172", b"173")) is not product
+    assert len(calls) == 2
@@ -0,0 +1,109 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from . import swpc_req
+from .calc import (
+    AuroraProbabilityBatchBody,
+    AuroraProbabilityBody,
+    AuroraProbabilityPoint,
+    aurora_probability,
+)
+from .grid import nooa_cell
+from .probability_grid import (
+    aurora_probability_batch,
+    probability_grid,
+    probability_grid_json,
+)
+
+TIME_TAG = datetime(2025, 1, 11, 15)
+DST = swpc_req.SwpcDstReq(dst=-60, time_tag=TIME_TAG)
+BZ = swpc_req.SwpcBzReq(bz_gsm=-5, bz_gse=-6, time_tag=TIME_TAG)
+KP = swpc_req.SwpcKpReq(kp_index=4, time_tag=TIME_TAG)
+
+
+@pytest.mark.parametrize(
+    "lon, lat, utc_hour",
+    [
+        (0, 65, 23),
+        (30, 55, 20),
+        (-1, 70, 1),
+        (-180, -60, 12),
+        (179, 89, 18),
+        (-75, 60, 4),
+    ],
+)
+def test_grid_matches_point_model(lon: int, lat: int, utc_hour: int):
+    local_hour = (utc_hour + lon // 15) % 24
+    local_time = datetime(2025, 1, 11, local_hour, tzinfo=timezone.utc)
+    point = aurora_probability(
+        user_data=AuroraProbabilityBody(
+            local_time=local_time, lat=lat, lon=lon
+        ),
+        dst=DST,
+        bz=BZ,
+        kp=KP,
+        speed=450,
+        clouds=30,
+    )
+    grid = probability_grid(KP.kp, BZ.bz_gse, DST.dst, utc_hour, 450, 30)
+    assert grid.shape == (360, 181)
+    # Столбец сетки - долгота + 180, как в `grid.nooa_cell`
+    assert grid[lon + 180, lat + 90] == pytest.approx(
+        point.probability, rel=1e-5
+    )
+
+
+def test_grid_night_side():
+    # 23:00 UTC: ночь на 33° в. д., день на Аляске (150° з. д.)
+    grid = probability_grid(KP.kp, BZ.bz_gse, DST.dst, 23, 450, 30)
+    murmansk = grid.reshape(-1)[nooa_cell(50, 33)]
+    alaska = grid.reshape(-1)[nooa_cell(50, -150)]
+    assert 0 < murmansk < 100
+    assert murmansk == pytest.approx(alaska * 2)
+
+
+def test_grid_json_cached_per_hour():
+    now = datetime(2025, 1, 11, 15, 6, tzinfo=timezone.utc)
+    res = probability_grid_json(DST, BZ, KP, 450, 30, now=now)
+    same = probability_grid_json(
+        DST, BZ, KP, 450, 30, now=now + timedelta(minutes=30)
+    )
+    assert same is res
+    data = json.loads(res)
+    assert data["time"] == "2025-01-11T15:00:00+00:00"
+    assert len(data["coordinates"]) == 360 * 181
+    assert data["coordinates"][0] == [0, -90, 0]
+
+
+def test_batch_matches_point_model():
+    body = AuroraProbabilityBatchBody(
+        points=[
+            AuroraProbabilityPoint(lat=68.97, lon=33.09),
+            AuroraProbabilityPoint(lat=58.6, lon=49.6, clouds=80),
+            AuroraProbabilityPoint(
+                lat=55.75,
+                lon=37.62,
+                local_time=datetime(
+                    2023, 3, 1, tzinfo=timezone(timedelta(hours=3))
+                ),
+            ),
+        ],
+        clouds=10,
+    )
+    now = datetime(2025, 1, 11, 23, tzinfo=timezone.utc)
+    res = aurora_probability_batch(body, dst=DST, bz=BZ, kp=KP, now=now)
+    assert res == [
+        aurora_probability(
+            user_data=AuroraProbabilityBody(
+                local_time=p.local_time or now, lat=p.lat, lon=p.lon
+            ),
+            dst=DST,
+            bz=BZ,
+            kp=KP,
+            speed=body.speed,
+            clouds=body.clouds if p.clouds is None else p.clouds,
+        )
+        for p in body.points
+    ]
@@ -0,0 +1,80 @@
+import struct
+import zlib
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from .grid import AuroraGrid, nooa_cell
+from .raster import (
+    GRID_HEADER,
+    WORLD,
+    BBox,
+    crop,
+    encode_grid,
+    encode_png,
+    parse_bbox,
+)
+
+GRID = AuroraGrid.from_coordinates(
+    [lon, lat, (lon + lat + 90) % 101]
+    for lon in range(360)
+    for lat in range(-90, 91)
+)
+
+
+def test_parse_bbox():
+    assert parse_bbox(None) == WORLD
+    assert parse_bbox("-10.5,50,20.2,70") == BBox(-11, 50, 21, 70)
+    with pytest.raises(ValueError):
+        parse_bbox("1,2,3")
+    with pytest.raises(ValueError):
+        parse_bbox("0,80,10,70")
+
+
+def test_crop_north_up_with_step():
+    data = crop(GRID, BBox(-2, 60, 2, 64), step=2)
+    assert data.shape == (3, 3)
+    # Первая строка - северная широта 64, первый столбец - долгота -2 (178)
+    assert data[0, 0] == GRID.get(178, 64)
+    assert data[2, 2] == GRID.get(182, 60)
+    assert data[1, 1] == GRID.get(180, 62)
+
+
+def test_crop_matches_point_cell():
+    # Окрестность Мурманска и область через антимеридиан
+    for lat, lon, bbox in [
+        (68.9, 33.1, BBox(30, 65, 36, 72)),
+        (65.0, -179.0, BBox(170, 60, 190, 70)),
+        (65.0, 175.0, BBox(170, 60, 190, 70)),
+    ]:
+        data = crop(GRID, bbox, step=1)
+        row = bbox.max_lat - round(lat)
+        col = (round(lon) - bbox.min_lon) % 360
+        assert data[row, col] == GRID.data[nooa_cell(lat, lon)]
+
+
+def test_encode_grid_header():
+    data = crop(GRID, WORLD, step=10)
+    observation_time = datetime(2025, 1, 11, 15, 6, tzinfo=timezone.utc)
+    content = encode_grid(data, WORLD, 10, observation_time)
+    magic, version, step, width, height, lon0, lat0, ts = (
+        GRID_HEADER.unpack_from(content)
+    )
+    assert (magic, version, step) == (b"AURG", 1, 10)
+    assert (width, height, lon0, lat0) == (36, 19, -180, 90)
+    assert ts == int(observation_time.timestamp())
+    body = np.frombuffer(content, np.uint8, offset=GRID_HEADER.size)
+    assert np.array_equal(body.reshape(height, width), data)
+
+
+def test_encode_png():
+    data = crop(GRID, BBox(0, 0, 9, 4), step=1)
+    content = encode_png(data)
+    assert content[:8] == b"\x89PNG\r\n\x1a\n"
+    width, height, depth, color = struct.unpack(">IIBB", content[16:26])
+    assert (width, height, depth, color) == (10, 5, 8, 0)
+    idat_len = struct.unpack(">I", content[33:37])[0]
+    raw = zlib.decompress(content[41 : 41 + idat_len])
+    rows = np.frombuffer(raw, np.uint8).reshape(height, width + 1)
+    assert np.array_equal(rows[:, 1:], data)
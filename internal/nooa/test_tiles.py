@@ -0,0 +1,105 @@
+import asyncio
+import json
+
+import numpy as np
+
+from . import tiles
+from .aurora_snapshot import AuroraSnapshot
+from .calc import NooaAuroraReq, nearst_aurora_probability
+from .tiles import (
+    PALETTE,
+    get_tile,
+    is_valid_tile,
+    prerender,
+    render_tile,
+    tile_cache,
+    tile_lats,
+    tile_lons,
+    tile_values,
+)
+
+
+def make_snapshot(version: str, value=None) -> AuroraSnapshot:
+    value = value or (lambda lon, lat: 80 if lat >= 60 else 0)
+    raw = json.dumps(
+        {
+            "Observation Time": "2025-01-11T15:06:00Z",
+            "Forecast Time": "2025-01-11T16:06:00Z",
+            "Data Format": "[Longitude, Latitude, Aurora]",
+            "coordinates": [
+                [lon, lat, value(lon, lat)]
+                for lon in range(360)
+                for lat in range(-90, 91)
+            ],
+        }
+    ).encode()
+    return AuroraSnapshot(version, raw)
+
+
+def test_tile_coordinates():
+    assert tile_lons(0, 0)[0] > -180
+    assert tile_lons(0, 0)[-1] < 180
+    assert tile_lats(0, 0)[0] < 85.06
+    assert tile_lats(0, 0)[-1] > -85.06
+    assert np.all(np.diff(tile_lats(1, 1)) < 0)
+    assert is_valid_tile(2, 3, 3)
+    assert not is_valid_tile(2, 4, 0)
+    assert not is_valid_tile(-1, 0, 0)
+
+
+def test_render_tile_colors():
+    tile = render_tile(make_snapshot("v1"), 0, 0, 0)
+    assert tile.content.startswith(b"\x89PNG")
+    assert PALETTE[0][3] == 0
+    assert PALETTE[80][3] > 0
+
+
+def test_tile_matches_point_probability():
+    snapshot = make_snapshot("v1", lambda lon, lat: (lon * 7 + lat) % 101)
+    checked = 0
+    # Тайл z=4 с Мурманском и тайл в западном полушарии
+    for z, x, y in [(4, 9, 3), (4, 1, 4)]:
+        values = tile_values(snapshot, z, x, y)
+        lons = tile_lons(z, x)
+        lats = tile_lats(z, y)
+        for py in range(0, 256, 15):
+            for px in range(0, 256, 15):
+                lat, lon = float(lats[py]), float(lons[px])
+                # `NooaAuroraReq` сначала округляет до 0.1 градуса
+                if min(abs(lat % 1 - 0.5), abs(lon % 1 - 0.5)) < 0.05:
+                    continue
+                point = nearst_aurora_probability(
+                    NooaAuroraReq(lat=lat, lon=lon), snapshot.res
+                )
+                assert values[py, px] == point.probability
+                checked += 1
+    assert checked > 300
+
+
+def test_tile_cache_by_version():
+    tile_cache.clear()
+    snapshot = make_snapshot("v1")
+    prerender(snapshot, max_zoom=1)
+    assert len(tile_cache) == 5
+    assert get_tile(snapshot, 1, 1, 0) is get_tile(snapshot, 1, 1, 0)
+    other = get_tile(make_snapshot("v2"), 1, 1, 0)
+    assert other.etag != get_tile(snapshot, 1, 1, 0).etag
+
+
+def test_on_snapshot_prerenders_in_background():
+    tile_cache.clear()
+    snapshot = make_snapshot("v3")
+
+    async def main():
+        await tiles.on_snapshot(snapshot)
+        # Слушатель вернулся, пререндер ещё идёт в пуле потоков
+        task = tiles.prerender_task
+        assert task is not None and not task.done()
+        # Запросы читают кэш одновременно с пререндером
+        for _ in range(50):
+            get_tile(snapshot, 1, 0, 0)
+            await asyncio.sleep(0)
+        await task
+
+    asyncio.run(main())
+    assert (snapshot.version, 2, 3, 3) in tile_cache
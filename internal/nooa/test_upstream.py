@@ -0,0 +1,31 @@
+import asyncio
+
+import httpx
+from fastapi import Response
+
+from . import swpc_req, upstream
+from .history import HistoryStore
+
+
+def test_client_uses_injected_transport(monkeypatch, tmp_path):
+    monkeypatch.setattr(swpc_req, "history", HistoryStore(tmp_path))
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        return httpx.Response(
+            200,
+            json=[{"dst": -60, "time_tag": "2025-01-11T15:00:00"}],
+        )
+
+    async def fetch():
+        async with upstream.open_client(httpx.MockTransport(handler)):
+            client = upstream.use_client()
+            return await swpc_req.use_dst_client(client, response)
+
+    response = Response()
+    res = asyncio.run(fetch())
+    assert response.headers["X-Data-Age"] == "0"
+    assert res.dst == -60
+    assert calls == ["/json/geospace/geospace_dst_1_hour.json"]
+    assert (tmp_path / "dst.bin").stat().st_size == 12
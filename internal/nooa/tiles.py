@@ -0,0 +1,121 @@
+import asyncio
+import hashlib
+from typing import NamedTuple
+
+import numpy as np
+import structlog
+from starlette.concurrency import run_in_threadpool
+
+from internal.lru import LRUCache
+from internal.nooa.aurora_snapshot import AuroraSnapshot, ovation_feed
+from internal.nooa.grid import GRID_LON
+from internal.nooa.raster import encode_png
+from internal.settings import TILE_CACHE_SIZE, TILE_PRERENDER_ZOOM
+
+logger = structlog.stdlib.get_logger(__name__)
+
+TILE_SIZE = 256
+# Сетка OVATION 1 градус, дальше приближать нет смысла
+MAX_ZOOM = 10
+
+# Цвет (RGBA) для вероятности 0..100: прозрачный -> зелёный -> жёлтый -> красный
+COLOR_STOPS = np.array(
+    [
+        [0, 0, 255, 0, 0],
+        [5, 0, 255, 0, 0],
+        [10, 0, 255, 0, 110],
+        [50, 255, 255, 0, 190],
+        [90, 255, 0, 0, 230],
+        [255, 255, 0, 0, 230],
+    ],
+    dtype=np.float64,
+)
+PALETTE = np.stack(
+    [
+        np.interp(np.arange(256), COLOR_STOPS[:, 0], COLOR_STOPS[:, channel])
+        for channel in range(1, 5)
+    ],
+    axis=-1,
+).astype(np.uint8)
+
+
+class Tile(NamedTuple):
+    content: bytes
+    etag: str
+
+
+tile_cache: LRUCache[tuple[str, int, int, int], Tile] = LRUCache(
+    maxsize=TILE_CACHE_SIZE
+)
+
+
+def is_valid_tile(z: int, x: int, y: int) -> bool:
+    return 0 <= z <= MAX_ZOOM and 0 <= x < 2**z and 0 <= y < 2**z
+
+
+def tile_lons(z: int, x: int) -> np.ndarray:
+    """Долгота центров пикселей тайла (Web Mercator)"""
+    px = x + (np.arange(TILE_SIZE) + 0.5) / TILE_SIZE
+    return px / 2**z * 360 - 180
+
+
+def tile_lats(z: int, y: int) -> np.ndarray:
+    """Широта центров пикселей тайла (Web Mercator)"""
+    py = y + (np.arange(TILE_SIZE) + 0.5) / TILE_SIZE
+    return np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * py / 2**z))))
+
+
+def tile_values(snapshot: AuroraSnapshot, z: int, x: int, y: int) -> np.ndarray:
+    """Вероятности OVATION в пикселях тайла (строки с севера на юг)
+
+    Столбец сетки - долгота + 180, как в `grid.nooa_cell`
+    """
+    lons = np.rint(tile_lons(z, x)).astype(np.int32)
+    lon_idx = (lons + 180) % GRID_LON
+    lat_idx = np.rint(tile_lats(z, y)).astype(np.int32) + 90
+    return snapshot.grid.array[np.ix_(lon_idx, lat_idx)].T
+
+
+def render_tile(snapshot: AuroraSnapshot, z: int, x: int, y: int) -> Tile:
+    values = tile_values(snapshot, z, x, y)
+    digest = hashlib.sha1(snapshot.version.encode()).hexdigest()[:16]
+    return Tile(
+        content=encode_png(PALETTE[values]),
+        etag=f'"{digest}-{z}-{x}-{y}"',
+    )
+
+
+def get_tile(snapshot: AuroraSnapshot, z: int, x: int, y: int) -> Tile:
+    key = (snapshot.version, z, x, y)
+    tile = tile_cache.get(key)
+    if tile is None:
+        tile = render_tile(snapshot, z, x, y)
+        tile_cache.put(key, tile)
+    return tile
+
+
+def prerender(snapshot: AuroraSnapshot, max_zoom: int = TILE_PRERENDER_ZOOM):
+    for z in range(max_zoom + 1):
+        for x in range(2**z):
+            for y in range(2**z):
+                get_tile(snapshot, z, x, y)
+
+
+# Ссылка на фоновый пререндер, чтобы задачу не собрал сборщик мусора
+prerender_task: asyncio.Task | None = None
+
+
+async def _prerender(snapshot: AuroraSnapshot):
+    try:
+        await run_in_threadpool(prerender, snapshot)
+    except Exception:
+        logger.exception("Failed to prerender tiles")
+
+
+async def on_snapshot(snapshot: AuroraSnapshot):
+    """Пререндер в фоне: запрос, загрузивший снимок, его не ждёт"""
+    global prerender_task
+    prerender_task = asyncio.create_task(_prerender(snapshot))
+
+
+ovation_feed.subscribe(on_snapshot)
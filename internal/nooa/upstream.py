@@ -0,0 +1,78 @@
+import importlib.util
+from contextlib import asynccontextmanager
+from typing import Annotated, AsyncGenerator
+
+import hishel
+import httpx
+from fastapi import Depends
+
+from internal.settings import (
+    UPSTREAM_MAX_CONNECTIONS,
+    UPSTREAM_MAX_KEEPALIVE,
+    UPSTREAM_TIMEOUT,
+)
+
+# HTTP/2 доступен только при установленном пакете h2
+HTTP2 = importlib.util.find_spec("h2") is not None
+
+storage = hishel.AsyncInMemoryStorage(capacity=64, ttl=3600)
+# Текстовые прогнозы обновляются раз в сутки
+long_storage = hishel.AsyncInMemoryStorage(capacity=64, ttl=24 * 3600)
+LONG_CACHE_PREFIX = "https://services.swpc.noaa.gov/text/"
+
+_client: httpx.AsyncClient | None = None
+
+
+def create_client(
+    transport: httpx.AsyncBaseTransport | None = None,
+) -> httpx.AsyncClient:
+    """Общий клиент NOAA/SWPC: один пул соединений на все кэши
+
+    `transport` позволяет подменить сеть в тестах (например
+    `httpx.MockTransport`)
+    """
+    if transport is None:
+        transport = httpx.AsyncHTTPTransport(
+            http2=HTTP2,
+            limits=httpx.Limits(
+                max_connections=UPSTREAM_MAX_CONNECTIONS,
+                max_keepalive_connections=UPSTREAM_MAX_KEEPALIVE,
+            ),
+            retries=1,
+        )
+    return httpx.AsyncClient(
+        transport=hishel.AsyncCacheTransport(
+            transport=transport,
+            storage=storage,
+        ),
+        mounts={
+            LONG_CACHE_PREFIX: hishel.AsyncCacheTransport(
+                transport=transport,
+                storage=long_storage,
+            ),
+        },
+        timeout=UPSTREAM_TIMEOUT,
+    )
+
+
+@asynccontextmanager
+async def open_client(
+    transport: httpx.AsyncBaseTransport | None = None,
+) -> AsyncGenerator[httpx.AsyncClient, None]:
+    global _client
+    client = create_client(transport)
+    _client = client
+    try:
+        yield client
+    finally:
+        _client = None
+        await client.aclose()
+
+
+def use_client() -> httpx.AsyncClient:
+    if _client is None:
+        raise RuntimeError("Upstream client is not opened")
+    return _client
+
+
+UpstreamDep = Annotated[httpx.AsyncClient, Depends(use_client)]
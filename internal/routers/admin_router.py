@@ -1,12 +1,53 @@
+import io
+from datetime import datetime
 from pathlib import Path
+from typing import Annotated, Any, Callable
 
 import structlog
-from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+)
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from tortoise import models
 
 from internal.auth import check_credentials
+from internal.city_table import city_table
+from internal.db.bulk import (
+    BulkImportResponse,
+    ImportFormat,
+    bulk_import,
+    detect_format,
+    iter_rows,
+)
+from internal.db.export import (
+    ExportFormat,
+    customers_query,
+    export_csv,
+    export_ndjson,
+    page,
+    parse_geo_box,
+)
 from internal.db.models import Cities, Customers, Tours
-from internal.db.schemas import City, CityIn, Cust, Message, Tour, TourIn
-from internal.nooa import nooa_req, swpc_req
+from internal.db.schemas import (
+    City,
+    CityIn,
+    Cust,
+    CustIn,
+    Message,
+    Tour,
+    TourIn,
+)
+from internal.http_cache import NEXT_CURSOR_HEADER
+from internal.listing_cache import cities_cache, tours_cache
+from internal.nooa import nooa_req, refresher, upstream
+from internal.nooa.aurora_snapshot import snapshot_cache
 from internal.settings import MEDIA_FOLDER
 
 logger = structlog.stdlib.get_logger(__name__)
@@ -17,31 +58,147 @@ router = APIRouter(
 )
 
 
-@router.get("/all-customers", response_model=list[Cust])
-async def all_customers():
-    """Получение списка всех пользователей"""
-    ac = await Customers.all()
-    return ac
+@router.get(
+    "/all-customers",
+    response_model=list[Cust],
+    responses={
+        200: {"content": {"application/x-ndjson": {}, "text/csv": {}}},
+    },
+)
+async def all_customers(
+    response: Response,
+    after: int | None = Query(
+        None, description="id последнего пользователя предыдущей страницы"
+    ),
+    limit: int = Query(1000, ge=1, le=10000),
+    locale: str | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    bbox: str | None = Query(
+        None,
+        description="min_lon,min_lat,max_lon,max_lat выбранных координат",
+        examples=["20,60,45,72"],
+    ),
+    format: ExportFormat = "json",
+):
+    """Получение списка пользователей постранично или выгрузкой"""
+    try:
+        box = parse_geo_box(bbox) if bbox else None
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e)) from e
+    query = customers_query(locale, created_from, created_to, box)
+    # Выгрузка всех подходящих записей частями, без ограничения limit
+    if format == "ndjson":
+        return StreamingResponse(
+            export_ndjson(query, after), media_type="application/x-ndjson"
+        )
+    if format == "csv":
+        return StreamingResponse(
+            export_csv(query, after),
+            media_type="text/csv",
+            headers={
+                "Content-Disposition": 'attachment; filename="customers.csv"'
+            },
+        )
+    customers = await page(query, after, limit)
+    if len(customers) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = str(customers[-1].id)
+    return customers
 
 
 @router.post("/set-cities", response_model=list[City])
 async def set_cities(cities: list[CityIn]):
     """Перезапись списка городов"""
-    res = await Cities.all().delete()
-    logger.info(f"Deleted cities: {res} ", count=res)
-    cs = []
-    for c in cities:
-        nc = await Cities.create(**c.model_dump())
-        cs.append(nc)
-    return cs
+    res = await bulk_import(Cities, CityIn, cities, replace=True)
+    logger.info(f"Replaced cities: {res} ", count=res)
+    cities_cache.invalidate()
+    await city_table.load()
+    return await Cities.all()
+
+
+FormatQuery = Annotated[ImportFormat | None, Query(alias="format")]
+
+
+async def import_upload(
+    model: type[models.Model],
+    schema: type[BaseModel],
+    file: UploadFile,
+    fmt: ImportFormat | None,
+    replace: bool = False,
+    prepare: Callable[[Any], None] | None = None,
+) -> BulkImportResponse:
+    fmt = fmt or detect_format(file.filename, file.content_type)
+    # Файл читается построчно из временного файла загрузки
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        created = await bulk_import(
+            model, schema, iter_rows(stream, fmt), replace, prepare
+        )
+    finally:
+        stream.detach()
+    logger.info(f"Imported {model.__name__}: {created}", count=created)
+    return BulkImportResponse(created=created)
+
+
+@router.post(
+    "/import-cities",
+    response_model=BulkImportResponse,
+    responses={422: {"model": Message}},
+)
+async def import_cities(
+    file: UploadFile,
+    replace: bool = False,
+    fmt: FormatQuery = None,
+):
+    """Загрузка городов из JSON, NDJSON или CSV"""
+    res = await import_upload(Cities, CityIn, file, fmt, replace)
+    cities_cache.invalidate()
+    await city_table.load()
+    return res
+
+
+@router.post(
+    "/import-tours",
+    response_model=BulkImportResponse,
+    responses={422: {"model": Message}},
+)
+async def import_tours(
+    file: UploadFile,
+    replace: bool = False,
+    fmt: FormatQuery = None,
+):
+    """Загрузка туров из JSON, NDJSON или CSV"""
+    res = await import_upload(Tours, TourIn, file, fmt, replace)
+    tours_cache.invalidate()
+    return res
+
+
+@router.post(
+    "/import-customers",
+    response_model=BulkImportResponse,
+    responses={422: {"model": Message}},
+)
+async def import_customers(file: UploadFile, fmt: FormatQuery = None):
+    """Загрузка пользователей из JSON, NDJSON или CSV"""
+    # bulk_create не вызывает save, ячейки сетки считаются здесь
+    return await import_upload(
+        Customers, CustIn, file, fmt, prepare=Customers.update_cells
+    )
 
 
 @router.delete("/drop-cache")
 async def drop_cache():
-    """Очистка кэша запросов в NOOA"""
-    swpc_req.storage._cache.cache = {}
-    nooa_req.storage._cache.cache = {}
-    nooa_req.long_storage._cache.cache = {}
+    """Очистка кэша запросов в NOOA и списков городов и туров"""
+    upstream.storage._cache.cache = {}
+    upstream.long_storage._cache.cache = {}
+    snapshot_cache.clear()
+    cities_cache.invalidate()
+    tours_cache.invalidate()
+    nooa_req.kp_3_cache.clear()
+    nooa_req.kp_27_cache.clear()
+    for feed in refresher.FEEDS:
+        feed.clear()
+    await city_table.load()
     return {"message": "ok"}
 
 
@@ -49,6 +206,7 @@ async def drop_cache():
 async def set_tour(tour: TourIn):
     """Добавление тура"""
     t = await Tours.create(**tour.model_dump())
+    tours_cache.invalidate()
     return t
 
 
@@ -65,6 +223,7 @@ async def drop_tour(tour_id: int):
     if t is None:
         raise HTTPException(status_code=404, detail="Tour not found")
     await t.delete()
+    tours_cache.invalidate()
     return Message(detail="ok")
 
 
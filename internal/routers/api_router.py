@@ -1,29 +1,59 @@
-import json
+from datetime import datetime, timedelta, timezone
+from typing import Annotated, Literal
 
 from fastapi import (
     APIRouter,
+    HTTPException,
+    Query,
+    Request,
     Response,
 )
-from pydantic import BaseModel
+from fastapi.concurrency import run_in_threadpool
+from pydantic import AwareDatetime, BaseModel
 
-from internal.db.models import Cities, Tours
-from internal.db.schemas import City, Tour
+from internal.city_table import CitiesProbabilityResponse, city_table
+from internal.db.schemas import City, Message, Tour
+from internal.http_cache import NEXT_CURSOR_HEADER, http_date, is_not_modified
+from internal.listing_cache import cities_cache, tours_cache
 from internal.nooa import nooa_req, swpc_req
+from internal.nooa.aurora_snapshot import AuroraSnapshotDep, ovation_feed
 from internal.nooa.calc import (
     AuroraNooaProbabilityResponse,
     AuroraProbabilityBody,
     AuroraProbabilityCalculation,
+    NooaAuroraBatchReq,
     NooaAuroraReq,
+    UserBatchBody,
     UserBody,
     aurora_probability,
     nearst_aurora_probability,
+    nearst_aurora_probability_batch,
 )
+from internal.nooa.feed import set_age_header
+from internal.nooa.grid_archive import PointHistoryRes, grid_archive
+from internal.nooa.history import HistoryRes, HistorySeries, history
+from internal.nooa.kp_forecast import (
+    KpForecastBody,
+    KpForecastPointBody,
+    KpForecastRes,
+    kp_forecast_engine,
+)
+from internal.nooa.probability_grid import (
+    AuroraProbabilityGrid,
+    aurora_probability_batch,
+    probability_grid_json,
+)
+from internal.nooa.raster import parse_bbox, render_raster
+from internal.nooa.tiles import get_tile, is_valid_tile
 
 router = APIRouter(
     prefix="/api/v1",
     tags=["API"],
 )
 
+# Списки меняются редко: клиент всегда проверяет ETag
+NO_CACHE = "no-cache"
+
 
 class SwpcApiData(BaseModel):
     dst: swpc_req.SwpcDstReq
@@ -65,42 +95,342 @@ async def api_aurora_probability(
     )
 
 
+class AuroraProbabilityBatchResponse(BaseModel):
+    calc_data: list[AuroraProbabilityCalculation]
+    api_data: SwpcApiData
+
+
+@router.post(
+    "/aurora-probability-batch",
+    response_model=AuroraProbabilityBatchResponse,
+)
+async def api_aurora_probability_batch(
+    ub: UserBatchBody,
+    dst: swpc_req.DstDep,
+    bz: swpc_req.BzDep,
+    kp: swpc_req.KpDep,
+):
+    """Получение вероятности северного сияния для списка точек"""
+    return AuroraProbabilityBatchResponse(
+        calc_data=aurora_probability_batch(ub, dst=dst, bz=bz, kp=kp),
+        api_data=SwpcApiData(dst=dst, bz=bz, kp=kp),
+    )
+
+
+@router.get(
+    "/aurora-probability-grid",
+    response_model=AuroraProbabilityGrid,
+)
+async def api_aurora_probability_grid(
+    dst: swpc_req.DstDep,
+    bz: swpc_req.BzDep,
+    kp: swpc_req.KpDep,
+    speed: float = 450,
+    clouds: float = Query(default=30, ge=0, le=100),
+):
+    """Получение вероятности северного сияния по модели на всей сетке"""
+    content = await run_in_threadpool(
+        probability_grid_json,
+        dst=dst,
+        bz=bz,
+        kp=kp,
+        speed=speed,
+        clouds=clouds,
+    )
+    res = Response(content=content, media_type="application/json")
+    for feed in (swpc_req.dst_feed, swpc_req.bz_feed, swpc_req.kp_feed):
+        set_age_header(res, feed)
+    return res
+
+
 @router.post(
     "/aurora-nooa-probability", response_model=AuroraNooaProbabilityResponse
 )
 async def api_aurora_nooa_probability(
-    req: NooaAuroraReq, aurora_res: nooa_req.AuroraDep
+    req: NooaAuroraReq, snapshot: AuroraSnapshotDep
 ):
     """Получение вероятности северного сияния по заданным координатам из nooa"""
-    res = nooa_req.NooaAuroraRes.model_validate(json.loads(aurora_res))  # type: ignore
-    return nearst_aurora_probability(pos=req, prob_map=res)
+    return nearst_aurora_probability(pos=req, prob_map=snapshot.res)
+
+
+@router.post(
+    "/aurora-nooa-probability-batch",
+    response_model=list[AuroraNooaProbabilityResponse],
+)
+async def api_aurora_nooa_probability_batch(
+    req: NooaAuroraBatchReq, snapshot: AuroraSnapshotDep
+):
+    """Получение вероятности северного сияния из nooa для списка координат"""
+    return nearst_aurora_probability_batch(req.points, snapshot.grid)
 
 
 @router.get("/aurora-map", response_model=nooa_req.NooaAuroraRes)
-async def api_aurora_map(aurora_res: nooa_req.AuroraDep):
+async def api_aurora_map(request: Request, snapshot: AuroraSnapshotDep):
     """Получение карты северного сияния"""
-    return Response(content=aurora_res, media_type="application/json")
+    res = snapshot.encoded.response(
+        request,
+        media_type="application/json",
+        last_modified=snapshot.res.Observation_Time,
+        cache_control=snapshot.cache_control(),
+    )
+    set_age_header(res, ovation_feed)
+    return res
+
+
+RASTER_MEDIA_TYPES = {
+    "bin": "application/octet-stream",
+    "png": "image/png",
+}
+
+
+@router.get(
+    "/aurora-map/raster",
+    response_class=Response,
+    responses={
+        200: {"content": {media: {} for media in RASTER_MEDIA_TYPES.values()}},
+        422: {"model": Message},
+    },
+)
+async def api_aurora_map_raster(
+    request: Request,
+    snapshot: AuroraSnapshotDep,
+    format: Literal["bin", "png"] = "bin",
+    bbox: str | None = Query(
+        default=None,
+        description="min_lon,min_lat,max_lon,max_lat",
+        examples=["0,50,60,80"],
+    ),
+    step: int = Query(default=1, ge=1, le=30),
+):
+    """Получение карты северного сияния в виде растра uint8
+
+    `bin`: заголовок `<4sBBHHhhq` (AURG, версия, шаг, ширина, высота,
+    долгота первого столбца, широта первой строки, время наблюдения),
+    затем значения построчно с севера на юг. `png`: оттенки серого 0..100
+    """
+    try:
+        box = parse_bbox(bbox)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e)) from e
+    raster = render_raster(
+        snapshot.version,
+        snapshot.grid,
+        snapshot.res.Observation_Time,
+        format,
+        box,
+        step,
+    )
+    headers = {
+        "ETag": raster.etag,
+        "Last-Modified": http_date(snapshot.res.Observation_Time),
+        "Cache-Control": snapshot.cache_control(),
+    }
+    if is_not_modified(request, {raster.etag}, snapshot.res.Observation_Time):
+        res = Response(status_code=304, headers=headers)
+    else:
+        res = Response(
+            content=raster.content,
+            media_type=RASTER_MEDIA_TYPES[format],
+            headers=headers,
+        )
+    set_age_header(res, ovation_feed)
+    return res
+
+
+@router.get(
+    "/aurora-tiles/{z}/{x}/{y}.png",
+    response_class=Response,
+    responses={
+        200: {"content": {"image/png": {}}},
+        404: {"model": Message},
+    },
+)
+async def api_aurora_tile(
+    request: Request,
+    snapshot: AuroraSnapshotDep,
+    z: int,
+    x: int,
+    y: int,
+):
+    """Получение тайла карты северного сияния (Web Mercator, 256x256)"""
+    if not is_valid_tile(z, x, y):
+        raise HTTPException(status_code=404, detail="Tile not found")
+    tile = get_tile(snapshot, z, x, y)
+    headers = {
+        "ETag": tile.etag,
+        "Last-Modified": http_date(snapshot.res.Observation_Time),
+        "Cache-Control": snapshot.cache_control(),
+    }
+    if is_not_modified(request, {tile.etag}, snapshot.res.Observation_Time):
+        res = Response(status_code=304, headers=headers)
+    else:
+        res = Response(
+            content=tile.content, media_type="image/png", headers=headers
+        )
+    set_age_header(res, ovation_feed)
+    return res
 
 
 @router.get("/aurora-kp-3", response_model=nooa_req.NooaAuroraKp3Req)
-async def api_aurora_kp_3(aurora_kp_res: nooa_req.Kp3Dep):
+async def api_aurora_kp_3(request: Request, kp_3: nooa_req.Kp3Dep):
     """Получение планетарного k-индекса за 3 дня"""
-    return aurora_kp_res
+    res = kp_3.content.response(
+        request, "application/json", cache_control=NO_CACHE
+    )
+    set_age_header(res, nooa_req.kp_3_feed)
+    return res
+
+
+@router.get("/aurora-forecast", response_model=KpForecastRes)
+async def api_aurora_forecast(
+    kp_3: nooa_req.Kp3Dep,
+    lat: float = Query(ge=-90, le=90),
+    lon: float = Query(ge=-180, le=180),
+    speed: float = 450,
+    clouds: float = Query(default=30, ge=0, le=100),
+):
+    """Вероятность сияния в точке по 3-часовым слотам прогноза Kp на 3 дня
+
+    `best` - слот с наибольшей вероятностью среди ещё не закончившихся
+    """
+    content = kp_forecast_engine.point_json(
+        kp_3.table, KpForecastPointBody(lat=lat, lon=lon), speed, clouds
+    )
+    res = Response(content=content, media_type="application/json")
+    set_age_header(res, nooa_req.kp_3_feed)
+    return res
+
+
+@router.post("/aurora-forecast-batch", response_model=KpForecastRes)
+async def api_aurora_forecast_batch(
+    body: KpForecastBody,
+    kp_3: nooa_req.Kp3Dep,
+):
+    """Прогноз по 3-дневному Kp для списка точек за один проход"""
+    return kp_forecast_engine.evaluate(kp_3.table, body)
 
 
 @router.get("/aurora-kp-27", response_model=nooa_req.NooaAuroraKp27Req)
-async def api_aurora_kp_map(aurora_kp_res: nooa_req.Kp27Dep):
+async def api_aurora_kp_map(request: Request, kp_27: nooa_req.Kp27Dep):
     """Получение планетарного k-индекса за 27 дней"""
-    return aurora_kp_res
+    res = kp_27.content.response(
+        request, "application/json", cache_control=NO_CACHE
+    )
+    set_age_header(res, nooa_req.kp_27_feed)
+    return res
+
+
+@router.get(
+    "/history/{series}",
+    response_model=HistoryRes,
+    response_model_exclude_none=True,
+    responses={422: {"model": Message}},
+)
+async def api_history(
+    series: HistorySeries,
+    start: Annotated[
+        AwareDatetime | None, Query(description="По умолчанию - сутки до `end`")
+    ] = None,
+    end: Annotated[
+        AwareDatetime | None, Query(description="Не включая")
+    ] = None,
+    step: int | None = Query(
+        default=None, ge=1, description="Интервал прореживания в секундах"
+    ),
+):
+    """История DST, Bz, Kp и максимумов OVATION по полушариям
+
+    Без `step` - точки как есть; с `step` или при слишком большом числе
+    точек - min/max/mean/count по интервалам (время - начало интервала,
+    unix-секунды)
+    """
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(days=1)
+    if start >= end:
+        raise HTTPException(status_code=422, detail="start must be before end")
+    return await history.query(series, start, end, step)
+
+
+# Больше ~26 тыс. снимков за запрос не читается
+MAX_ARCHIVE_RANGE = timedelta(days=92)
+
+
+@router.get(
+    "/aurora-history",
+    response_model=PointHistoryRes,
+    responses={422: {"model": Message}},
+)
+async def api_aurora_history(
+    lat: float = Query(ge=-90, le=90),
+    lon: float = Query(ge=-180, le=180),
+    start: Annotated[
+        AwareDatetime | None,
+        Query(description="По умолчанию - 30 дней до `end`"),
+    ] = None,
+    end: Annotated[
+        AwareDatetime | None, Query(description="Не включая")
+    ] = None,
+    threshold: int = Query(default=50, ge=0, le=100),
+):
+    """Вероятность сияния OVATION в точке по архиву снимков
+
+    `above` - сколько снимков за период показывали вероятность не ниже
+    `threshold`
+    """
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(days=30)
+    if start >= end:
+        raise HTTPException(status_code=422, detail="start must be before end")
+    if end - start > MAX_ARCHIVE_RANGE:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Range must not exceed {MAX_ARCHIVE_RANGE.days} days",
+        )
+    return await grid_archive.query(lat, lon, start, end, threshold)
 
 
 @router.get("/all-cities", response_model=list[City])
-async def api_all_cities():
+async def api_all_cities(request: Request):
     """Получение списка всех городов для выбора"""
-    return await Cities.all()
+    content = await cities_cache.content()
+    return content.response(request, "application/json", cache_control=NO_CACHE)
+
+
+@router.get("/cities-probability", response_model=CitiesProbabilityResponse)
+async def api_cities_probability(
+    snapshot: AuroraSnapshotDep,
+    dst: swpc_req.DstDep,
+    bz: swpc_req.BzDep,
+    kp: swpc_req.KpDep,
+):
+    """Получение вероятности северного сияния для всех городов"""
+    content = await city_table.current()
+    res = Response(content=content, media_type="application/json")
+    for feed in (
+        ovation_feed,
+        swpc_req.dst_feed,
+        swpc_req.bz_feed,
+        swpc_req.kp_feed,
+    ):
+        set_age_header(res, feed)
+    return res
 
 
 @router.get("/all-tours", response_model=list[Tour])
-async def api_all_tours():
+async def api_all_tours(
+    request: Request,
+    after: int | None = Query(
+        default=None, description="id последнего тура предыдущей страницы"
+    ),
+    limit: int | None = Query(default=None, ge=1, le=1000),
+):
     """Получение списка всех туров для выбора"""
-    return await Tours.all()
+    next_cursor = None
+    if after is None and limit is None:
+        content = await tours_cache.content()
+    else:
+        content, next_cursor = await tours_cache.page(after, limit or 100)
+    res = content.response(request, "application/json", cache_control=NO_CACHE)
+    if next_cursor is not None:
+        res.headers[NEXT_CURSOR_HEADER] = str(next_cursor)
+    return res
@@ -1,11 +1,12 @@
 import uuid
 from typing import Annotated
 
-from fastapi import APIRouter, Body, HTTPException
+from fastapi import APIRouter, Body, HTTPException, Response
 from pydantic import BaseModel
 
 from internal.db.models import Customers, Subscriptions
 from internal.db.schemas import Cust, CustIn, Message, Sub, SubIn
+from internal.user_cache import GetUserResponse, user_cache
 
 router = APIRouter(
     prefix="/api/v1",
@@ -47,11 +48,6 @@ async def new_user(cust: NewUserBody):
     return c
 
 
-class GetUserResponse(BaseModel):
-    cust: Cust
-    subs: list[Sub]
-
-
 @router.get(
     "/user/{id}",
     response_model=GetUserResponse,
@@ -61,11 +57,10 @@ class GetUserResponse(BaseModel):
 )
 async def get_user(id: int):
     """Получение пользователя и его подписок по id"""
-    c = await Customers.get_or_none(id=id)
-    if c is None:
+    payload = await user_cache.get(id)
+    if payload is None:
         raise HTTPException(status_code=404, detail="Customer not found")
-    ss = await Subscriptions.filter(cust_id=c.id).all()
-    return GetUserResponse(cust=c, subs=[Sub.model_validate(s) for s in ss])
+    return Response(payload, media_type="application/json")
 
 
 NewSubBody = Annotated[
@@ -119,6 +114,7 @@ async def new_subscription(sub: NewSubBody):
     if c is None:
         raise HTTPException(status_code=404, detail="Customer not found")
     s = await Subscriptions.create(**sub.model_dump())
+    user_cache.invalidate(c.id)
     return CustSubResponse(sub=s, cust=c)
 
 
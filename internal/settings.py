@@ -5,7 +5,60 @@ IGNORE_CORS = bool(os.getenv("IGNORE_CORS", False))
 LOG_JSON = bool(os.getenv("LOG_JSON", not sys.stderr.isatty()))
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 DB_URL = os.getenv("DB_URL", "sqlite://data/db.sqlite3")
+DB_IS_POSTGRES = DB_URL.startswith(("postgres://", "asyncpg://"))
+# Миграции aerich при старте вместо generate_schemas: generate_schemas не
+# добавляет новые колонки в существующие таблицы. Базе в памяти миграции
+# не нужны, её соединение закрывается после них
+DB_MIGRATE = bool(os.getenv("DB_MIGRATE", ":memory:" not in DB_URL))
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", 2))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", 10))
+DB_STATEMENT_TIMEOUT = int(os.getenv("DB_STATEMENT_TIMEOUT", 30_000))  # ms
+# Кэш подготовленных выражений asyncpg; 0 для pgbouncer в режиме transaction
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 100))
+# Прагмы SQLite для нагрузки и пул соединений только для чтения
+SQLITE_PERFORMANCE = bool(os.getenv("SQLITE_PERFORMANCE", False))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", -64_000))  # KiB если < 0
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", 5000))  # ms
+SQLITE_READERS = int(os.getenv("SQLITE_READERS", 4))
 MEDIA_FOLDER = os.getenv("MEDIA_FOLDER", "media")
 
 ADMIN_USER = os.getenv("ADMIN_USER", "admin")
 ADMIN_PASS = os.getenv("ADMIN_PASS", "admin")
+
+UPSTREAM_TIMEOUT = float(os.getenv("UPSTREAM_TIMEOUT", 10))
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", 20))
+UPSTREAM_MAX_KEEPALIVE = int(os.getenv("UPSTREAM_MAX_KEEPALIVE", 10))
+FEED_MAX_STALENESS = float(os.getenv("FEED_MAX_STALENESS", 3600))
+DISABLE_FEED_REFRESHER = bool(os.getenv("DISABLE_FEED_REFRESHER", False))
+# Кэш GET /user/{id} свой у каждого процесса: с несколькими воркерами
+# (PostgreSQL) по умолчанию выключен
+USER_CACHE_SIZE = int(
+    os.getenv("USER_CACHE_SIZE", 0 if DB_IS_POSTGRES else 10_000)
+)
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", 300))
+# Списки городов и туров в памяти процесса: записи через другие процессы
+# (несколько воркеров с PostgreSQL) видны не позже чем через столько секунд
+LISTING_CACHE_TTL = float(
+    os.getenv("LISTING_CACHE_TTL", 5 if DB_IS_POSTGRES else 300)
+)
+TILE_CACHE_SIZE = int(os.getenv("TILE_CACHE_SIZE", 4096))
+TILE_PRERENDER_ZOOM = int(os.getenv("TILE_PRERENDER_ZOOM", 2))
+HISTORY_PATH = os.getenv("HISTORY_PATH", "data/history")
+GRID_ARCHIVE_PATH = os.getenv("GRID_ARCHIVE_PATH", "data/ovation")
+# Срок хранения снимков OVATION в архиве, секунды; 0 - без ограничения.
+# Снимок ~64 КБ, за неделю при обновлении раз в 5 минут ~130 МБ
+GRID_ARCHIVE_MAX_AGE = float(os.getenv("GRID_ARCHIVE_MAX_AGE", 7 * 24 * 3600))
+ALERT_BATCH_SIZE = int(os.getenv("ALERT_BATCH_SIZE", 5000))
+ALERT_COOLDOWN = float(os.getenv("ALERT_COOLDOWN", 6 * 3600))
+DISABLE_ALERTS = bool(os.getenv("DISABLE_ALERTS", False))
+ALERT_TRANSPORT = os.getenv("ALERT_TRANSPORT", "log")  # log | file | smtp
+ALERT_OUTBOX_FILE = os.getenv("ALERT_OUTBOX_FILE", "data/alerts.ndjson")
+ALERT_WORKERS = int(os.getenv("ALERT_WORKERS", 4))
+ALERT_SEND_RATE = float(os.getenv("ALERT_SEND_RATE", 10))
+ALERT_MAX_ATTEMPTS = int(os.getenv("ALERT_MAX_ATTEMPTS", 5))
+SMTP_HOST = os.getenv("SMTP_HOST", "localhost")
+SMTP_PORT = int(os.getenv("SMTP_PORT", 25))
+SMTP_USER = os.getenv("SMTP_USER")
+SMTP_PASS = os.getenv("SMTP_PASS")
+SMTP_SENDER = os.getenv("SMTP_SENDER", "aurora@localhost")
@@ -0,0 +1,96 @@
+import asyncio
+import json
+import math
+from datetime import datetime, timezone
+
+from internal.city_table import CityTable
+from internal.db.schemas import City
+from internal.nooa import swpc_req
+from internal.nooa.aurora_snapshot import AuroraSnapshot, ovation_feed
+
+
+def test_city_table_recompute():
+    raw = json.dumps(
+        {
+            "Observation Time": "2025-01-11T15:06:00Z",
+            "Forecast Time": "2025-01-11T16:06:00Z",
+            "Data Format": "[Longitude, Latitude, Aurora]",
+            "coordinates": [[213, 69, 42]],
+        }
+    ).encode()
+    time_tag = datetime(2025, 1, 11, 15)
+    table = CityTable()
+    table.cities = [
+        City(id=1, name="Murmansk", lat=68.9, long=33.1),
+        City(id=2, name="Moscow", lat=55.8, long=37.6),
+    ]
+    try:
+        ovation_feed.value = AuroraSnapshot("v1", raw)
+        swpc_req.dst_feed.value = swpc_req.SwpcDstReq(
+            dst=-60, time_tag=time_tag
+        )
+        swpc_req.bz_feed.value = swpc_req.SwpcBzReq(
+            bz_gsm=-5, bz_gse=-6, time_tag=time_tag
+        )
+        swpc_req.kp_feed.value = swpc_req.SwpcKpReq(
+            kp_index=2, time_tag=time_tag
+        )
+        now = datetime(2025, 1, 11, 20, tzinfo=timezone.utc)
+        res = json.loads(table.recompute(now=now))
+    finally:
+        for feed in (
+            ovation_feed,
+            swpc_req.dst_feed,
+            swpc_req.bz_feed,
+            swpc_req.kp_feed,
+        ):
+            feed.clear()
+
+    assert res["nooa_version"] == "v1"
+    murmansk, moscow = res["cities"]
+    assert murmansk["name"] == "Murmansk"
+    assert murmansk["nooa_probability"] == 42
+    # 20:00 UTC -> 22:00 местного времени, ночной вес 1.0
+    assert murmansk["probability"] == 100
+    assert moscow["nooa_probability"] == 0
+    assert 0 < moscow["probability"] < 100
+
+
+def test_city_table_skips_unchanged_inputs(monkeypatch):
+    time_tag = datetime(2025, 1, 11, 15)
+    # Без перечитывания городов из базы
+    table = CityTable(ttl=math.inf)
+    table.cities = [City(id=1, name="Murmansk", lat=68.9, long=33.1)]
+    calls = []
+    recompute = table.recompute
+
+    def count(now=None):
+        calls.append(now)
+        return recompute(now)
+
+    monkeypatch.setattr(table, "recompute", count)
+
+    async def update(bz_gsm: float, bz_gse: float):
+        value = swpc_req.SwpcBzReq(
+            bz_gsm=bz_gsm, bz_gse=bz_gse, time_tag=time_tag
+        )
+        swpc_req.bz_feed.value = value
+        await table.on_update(value)
+        assert table._task is not None
+        await table._task
+
+    async def main():
+        await update(-5, -6)
+        # Новая точка Bz с тем же bz_gse на вероятности не влияет
+        await update(-4, -6)
+        await update(-4, -7)
+        assert await table.current() is table.content
+
+    try:
+        asyncio.run(main())
+    finally:
+        swpc_req.bz_feed.clear()
+    assert len(calls) == 2
+    # Источник сброшен, а фоновый пересчёт не запускался
+    asyncio.run(table.current())
+    assert len(calls) == 3
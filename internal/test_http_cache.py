@@ -0,0 +1,72 @@
+import gzip
+from datetime import datetime, timezone
+
+import brotli  # type: ignore[import-untyped]
+from fastapi import Request
+
+from internal.http_cache import EncodedContent, accepted_encodings
+
+LAST_MODIFIED = datetime(2025, 1, 11, 15, 6, tzinfo=timezone.utc)
+
+
+def make_request(**headers: str) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "headers": [
+                (k.replace("_", "-").encode(), v.encode())
+                for k, v in headers.items()
+            ],
+        }
+    )
+
+
+def test_accepted_encodings():
+    assert accepted_encodings("gzip, deflate, br;q=0") == {"gzip", "deflate"}
+    assert accepted_encodings("br;q=0.5 , gzip") == {"br", "gzip"}
+    assert accepted_encodings("") == set()
+
+
+def test_encoded_response_negotiation():
+    content = b'{"coordinates": [[0, -90, 3]]}' * 100
+    encoded = EncodedContent(content)
+
+    res = encoded.response(make_request(accept_encoding="gzip, br"), "a/b")
+    assert res.headers["content-encoding"] == "br"
+    assert brotli.decompress(res.body) == content
+
+    res = encoded.response(make_request(accept_encoding="gzip"), "a/b")
+    assert res.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(res.body) == content
+    assert res.headers["etag"] == encoded.etag[:-1] + '-gzip"'
+
+    res = encoded.response(make_request(), "a/b", last_modified=LAST_MODIFIED)
+    assert "content-encoding" not in res.headers
+    assert res.body == content
+    assert res.headers["last-modified"] == "Sat, 11 Jan 2025 15:06:00 GMT"
+
+
+def test_encoded_response_not_modified():
+    encoded = EncodedContent(b"{}")
+    etag = encoded.etag_for("gzip")
+
+    res = encoded.response(make_request(if_none_match=etag), "a/b")
+    assert res.status_code == 304
+    assert res.body == b""
+
+    res = encoded.response(make_request(if_none_match='"other"'), "a/b")
+    assert res.status_code == 200
+
+    res = encoded.response(
+        make_request(if_modified_since="Sat, 11 Jan 2025 15:06:00 GMT"),
+        "a/b",
+        last_modified=LAST_MODIFIED,
+    )
+    assert res.status_code == 304
+
+    res = encoded.response(
+        make_request(if_modified_since="Sat, 11 Jan 2025 15:05:59 GMT"),
+        "a/b",
+        last_modified=LAST_MODIFIED,
+    )
+    assert res.status_code == 200
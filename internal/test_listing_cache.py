@@ -0,0 +1,63 @@
+import asyncio
+import json
+
+from internal.db.schemas import City
+from internal.http_cache import EncodedContent
+from internal.listing_cache import ListingCache
+
+
+def ids(content: EncodedContent) -> list[int]:
+    return [c["id"] for c in json.loads(content.bodies["identity"])]
+
+
+def test_listing_cache():
+    loads = 0
+    cities = [
+        {"id": i, "name": f"City {i}", "lat": 60.0, "long": 30.0}
+        for i in (1, 2, 5, 7)
+    ]
+
+    async def load():
+        nonlocal loads
+        loads += 1
+        return cities
+
+    async def run():
+        cache = ListingCache(load, City)
+        full = await cache.content()
+        assert await cache.content() is full
+        first, cursor = await cache.page(None, 3)
+        last, end = await cache.page(cursor, 3)
+        cities.append({"id": 9, "name": "New", "lat": 0.0, "long": 0.0})
+        cache.invalidate()
+        updated = await cache.content()
+        return full, first, cursor, last, end, updated
+
+    full, first, cursor, last, end, updated = asyncio.run(run())
+    assert loads == 2
+    assert ids(full) == [1, 2, 5, 7]
+    assert ids(first) == [1, 2, 5]
+    assert cursor == 5
+    assert ids(last) == [7]
+    assert end is None
+    assert updated.etag != full.etag
+
+
+def test_listing_cache_ttl():
+    loads = 0
+
+    async def load():
+        nonlocal loads
+        loads += 1
+        return [{"id": loads, "name": "City", "lat": 60.0, "long": 30.0}]
+
+    async def run():
+        cache = ListingCache(load, City, ttl=0)
+        first = await cache.content()
+        # Изменение из другого процесса видно после истечения ttl
+        second = await cache.content()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert ids(first) == [1]
+    assert ids(second) == [2]
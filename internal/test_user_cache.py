@@ -0,0 +1,67 @@
+import asyncio
+
+from tortoise import Tortoise
+
+from internal.db.models import Customers, Subscriptions
+from internal.db.schemas import Sub
+from internal.db.testing import init_test_db
+from internal.user_cache import GetUserResponse, UserCache
+
+
+async def subscribe(cust: Customers, email: str) -> Subscriptions:
+    return await Subscriptions.create(
+        cust=cust,
+        email=email,
+        cust_name="Test",
+        alert_probability=50,
+        sub_type=1,
+        geo_push_type="SELECTED",
+    )
+
+
+async def cached_users():
+    await init_test_db()
+    try:
+        cust = await Customers.create(selected_geo_lat=60, selected_geo_long=30)
+        lonely = await Customers.create(
+            selected_geo_lat=61, selected_geo_long=31
+        )
+        await subscribe(cust, "a@example.com")
+        await subscribe(cust, "b@example.com")
+        subs = await Subscriptions.filter(cust=cust)
+        expected = GetUserResponse(
+            cust=cust, subs=[Sub.model_validate(s) for s in subs]
+        )
+
+        cache = UserCache(maxsize=10, ttl=60)
+        payload = await cache.get(cust.id)
+        assert payload is not None
+        parsed = GetUserResponse.model_validate_json(payload)
+        assert parsed.cust == expected.cust
+        assert sorted(s.email for s in parsed.subs) == [
+            "a@example.com",
+            "b@example.com",
+        ]
+        assert await cache.get(cust.id) is payload
+
+        await subscribe(cust, "c@example.com")
+        stale = await cache.get(cust.id)
+        cache.invalidate(cust.id)
+        fresh = await cache.get(cust.id)
+        assert fresh is not None
+
+        empty = await cache.get(lonely.id)
+        missing = await cache.get(lonely.id + 100)
+        return stale is payload, fresh, empty, missing, len(cache)
+    finally:
+        await Tortoise.close_connections()
+
+
+def test_user_cache():
+    stale, fresh, empty, missing, size = asyncio.run(cached_users())
+    assert stale
+    assert len(GetUserResponse.model_validate_json(fresh).subs) == 3
+    assert empty is not None
+    assert GetUserResponse.model_validate_json(empty).subs == []
+    assert missing is None
+    assert size == 2
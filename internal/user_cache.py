@@ -0,0 +1,87 @@
+import time
+
+from pydantic import BaseModel
+
+from internal.db.config import read_db
+from internal.db.models import Customers
+from internal.db.schemas import Cust, Sub
+from internal.lru import LRUCache
+from internal.settings import USER_CACHE_SIZE, USER_CACHE_TTL
+
+CUST_FIELDS = tuple(Cust.model_fields)
+SUB_FIELDS = tuple(Sub.model_fields)
+
+
+class GetUserResponse(BaseModel):
+    cust: Cust
+    subs: list[Sub]
+
+
+async def load_user(id: int) -> bytes | None:
+    """Пользователь и его подписки одним запросом (LEFT JOIN)
+
+    Данные из базы уже проверены, поэтому модели собираются без валидации
+    """
+    rows = await (
+        Customers.filter(id=id)
+        .using_db(read_db())
+        .values(
+            *CUST_FIELDS,
+            **{f"sub_{f}": f"subscriptions__{f}" for f in SUB_FIELDS},
+        )
+    )
+    if not rows:
+        return None
+    cust = Cust.model_construct(**{f: rows[0][f] for f in CUST_FIELDS})
+    subs = [
+        Sub.model_construct(**{f: row[f"sub_{f}"] for f in SUB_FIELDS})
+        for row in rows
+        if row["sub_id"] is not None
+    ]
+    return (
+        GetUserResponse.model_construct(cust=cust, subs=subs)
+        .model_dump_json()
+        .encode()
+    )
+
+
+class UserCache:
+    """Готовые ответы GET /user/{id}
+
+    Сбрасывается обработчиками записи пользователей и подписок; записи
+    других процессов видны не позже чем через `ttl` секунд
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version = 0
+        self._items: LRUCache[int, tuple[float, bytes]] = LRUCache(maxsize)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    async def get(self, id: int) -> bytes | None:
+        """Ответ для пользователя; None - пользователь не найден"""
+        cached = self._items.get(id)
+        if cached is not None:
+            created, cached_payload = cached
+            if time.monotonic() - created < self.ttl:
+                return cached_payload
+            self._items.pop(id)
+        version = self.version
+        payload = await load_user(id)
+        # Запись во время загрузки: ответ мог устареть
+        if payload is not None and self.maxsize and version == self.version:
+            self._items.put(id, (time.monotonic(), payload))
+        return payload
+
+    def invalidate(self, id: int | None = None):
+        self.version += 1
+        if id is None:
+            self._items.clear()
+        else:
+            self._items.pop(id)
+
+
+user_cache = UserCache(USER_CACHE_SIZE, USER_CACHE_TTL)
@@ -1,4 +1,4 @@
-from contextlib import asynccontextmanager
+from contextlib import AsyncExitStack, asynccontextmanager
 from pathlib import Path
 from typing import AsyncGenerator
 
@@ -9,17 +9,32 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 
+from internal.alerts.engine import alert_engine, backfill_cells
+from internal.alerts.outbox import outbox
+from internal.city_table import city_table
+from internal.db import migrate
+from internal.db.bulk import BulkImportError
 from internal.db.config import register_orm
 from internal.logger import setup_logging, setup_uvicorn_logging
+from internal.nooa import refresher, upstream
+from internal.nooa.feed import UpstreamError
 from internal.routers import admin_router, api_router, user_router
-from internal.settings import IGNORE_CORS, LOG_JSON, LOG_LEVEL, MEDIA_FOLDER
+from internal.settings import (
+    DB_MIGRATE,
+    DISABLE_ALERTS,
+    DISABLE_FEED_REFRESHER,
+    IGNORE_CORS,
+    LOG_JSON,
+    LOG_LEVEL,
+    MEDIA_FOLDER,
+)
 
 setup_logging(
     json_logs=LOG_JSON,
     log_level=LOG_LEVEL,
 )
 access_logger = structlog.stdlib.get_logger("api.access")
-# log = structlog.stdlib.get_logger(__name__)
+logger = structlog.stdlib.get_logger(__name__)
 
 # Create data folder for db files
 (Path(".") / "data").mkdir(parents=True, exist_ok=True)
@@ -34,7 +49,21 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     #         yield
     # else:
     # app startup
-    async with register_orm(app):
+    if DB_MIGRATE:
+        applied = await migrate.upgrade()
+        logger.info(f"Applied migrations: {applied}", count=len(applied))
+    async with (
+        register_orm(app),
+        upstream.open_client(),
+        AsyncExitStack() as stack,
+    ):
+        await city_table.load()
+        await backfill_cells()
+        if not DISABLE_ALERTS:
+            await stack.enter_async_context(alert_engine.running())
+            await stack.enter_async_context(outbox.running())
+        if not DISABLE_FEED_REFRESHER:
+            await stack.enter_async_context(refresher.run_refresher())
         yield
 
 
@@ -71,6 +100,22 @@ async def integrity_exception_handler(request, exc):
     return JSONResponse(status_code=409, content={"detail": str(exc.args[0])})
 
 
+@app.exception_handler(BulkImportError)
+async def bulk_import_exception_handler(request, exc):
+    return JSONResponse(
+        status_code=422,
+        content={
+            "detail": str(exc),
+            "errors": [e.model_dump() for e in exc.errors],
+        },
+    )
+
+
+@app.exception_handler(UpstreamError)
+async def upstream_exception_handler(request, exc):
+    return JSONResponse(status_code=502, content={"detail": str(exc)})
+
+
 if IGNORE_CORS:
     app.add_middleware(
         CORSMiddleware,
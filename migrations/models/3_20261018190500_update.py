@@ -0,0 +1,29 @@
+# ruff: noqa: E501
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS "alert_outbox" (
+    "id" INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+    "email" VARCHAR(255) NOT NULL,
+    "probability" INT NOT NULL,
+    "lat" REAL NOT NULL,
+    "long" REAL NOT NULL,
+    "forecast_time" TIMESTAMP NOT NULL,
+    "status" VARCHAR(16) NOT NULL  DEFAULT 'PENDING',
+    "attempts" INT NOT NULL  DEFAULT 0,
+    "next_attempt_at" TIMESTAMP NOT NULL,
+    "last_error" TEXT,
+    "sent_at" TIMESTAMP,
+    "created_at" TIMESTAMP NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+    "updated_at" TIMESTAMP NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+    "subscription_id" CHAR(36) NOT NULL REFERENCES "subscriptions" ("id") ON DELETE CASCADE,
+    CONSTRAINT "uid_alert_outbo_subscri_b79c3e" UNIQUE ("subscription_id", "forecast_time")
+);
+CREATE INDEX IF NOT EXISTS "idx_alert_outbo_status_6afe19" ON "alert_outbox" ("status", "next_attempt_at");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS "alert_outbox";"""
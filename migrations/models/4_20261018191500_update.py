@@ -0,0 +1,33 @@
+# ruff: noqa: E501
+from tortoise import BaseDBAsyncClient
+
+CELL_COLUMNS = ("selected_cell", "current_cell")
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    # Колонки могли уже создать generate_schemas (запуск до миграций при
+    # старте). Индексы пересоздаются: на таблице без колонок SQLite строит
+    # их по строковому литералу "selected_cell"
+    columns = {
+        row["name"]
+        for row in await db.execute_query_dict('PRAGMA table_info("customers")')
+    }
+    add = "\n".join(
+        f'ALTER TABLE "customers" ADD "{column}" INT;'
+        for column in CELL_COLUMNS
+        if column not in columns
+    )
+    return f"""
+        {add}
+        DROP INDEX IF EXISTS "idx_customers_selecte_f028de";
+        DROP INDEX IF EXISTS "idx_customers_current_4a599f";
+        CREATE INDEX "idx_customers_selecte_f028de" ON "customers" ("selected_cell");
+        CREATE INDEX "idx_customers_current_4a599f" ON "customers" ("current_cell");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_customers_selecte_f028de";
+        DROP INDEX IF EXISTS "idx_customers_current_4a599f";
+        ALTER TABLE "customers" DROP COLUMN "selected_cell";
+        ALTER TABLE "customers" DROP COLUMN "current_cell";"""
@@ -0,0 +1,85 @@
+# ruff: noqa: E501
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS "cities" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "name" VARCHAR(255) NOT NULL,
+    "lat" DOUBLE PRECISION NOT NULL,
+    "long" DOUBLE PRECISION NOT NULL
+);
+CREATE TABLE IF NOT EXISTS "customers" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "current_geo_lat" DOUBLE PRECISION,
+    "current_geo_long" DOUBLE PRECISION,
+    "selected_geo_lat" DOUBLE PRECISION NOT NULL,
+    "selected_geo_long" DOUBLE PRECISION NOT NULL,
+    "locale" VARCHAR(2) NOT NULL  DEFAULT 'ru',
+    "selected_cell" INT,
+    "current_cell" INT,
+    "created_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+    "updated_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS "idx_customers_selecte_f028de" ON "customers" ("selected_cell");
+CREATE INDEX IF NOT EXISTS "idx_customers_current_4a599f" ON "customers" ("current_cell");
+CREATE TABLE IF NOT EXISTS "subscriptions" (
+    "id" UUID NOT NULL  PRIMARY KEY,
+    "email" VARCHAR(255) NOT NULL UNIQUE,
+    "cust_name" VARCHAR(255) NOT NULL,
+    "cust_surname" VARCHAR(255),
+    "cust_patronymic" VARCHAR(255),
+    "alert_probability" INT NOT NULL,
+    "sub_type" INT NOT NULL,
+    "geo_push_type" VARCHAR(255) NOT NULL,
+    "active" BOOL NOT NULL  DEFAULT False,
+    "created_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+    "updated_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+    "cust_id" INT NOT NULL REFERENCES "customers" ("id") ON DELETE CASCADE
+);
+CREATE TABLE IF NOT EXISTS "alert_outbox" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "email" VARCHAR(255) NOT NULL,
+    "probability" INT NOT NULL,
+    "lat" DOUBLE PRECISION NOT NULL,
+    "long" DOUBLE PRECISION NOT NULL,
+    "forecast_time" TIMESTAMPTZ NOT NULL,
+    "status" VARCHAR(16) NOT NULL  DEFAULT 'PENDING',
+    "attempts" INT NOT NULL  DEFAULT 0,
+    "next_attempt_at" TIMESTAMPTZ NOT NULL,
+    "last_error" TEXT,
+    "sent_at" TIMESTAMPTZ,
+    "created_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+    "updated_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+    "subscription_id" UUID NOT NULL REFERENCES "subscriptions" ("id") ON DELETE CASCADE,
+    CONSTRAINT "uid_alert_outbo_subscri_b79c3e" UNIQUE ("subscription_id", "forecast_time")
+);
+CREATE INDEX IF NOT EXISTS "idx_alert_outbo_status_6afe19" ON "alert_outbox" ("status", "next_attempt_at");
+CREATE TABLE IF NOT EXISTS "tours" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "name" VARCHAR(2000) NOT NULL,
+    "text_mini" VARCHAR(2000) NOT NULL,
+    "text" TEXT NOT NULL,
+    "text_head" VARCHAR(2000) NOT NULL,
+    "price" DOUBLE PRECISION NOT NULL,
+    "url" VARCHAR(2000) NOT NULL,
+    "image" VARCHAR(2000) NOT NULL,
+    "created_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+    "updated_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS "aerich" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "version" VARCHAR(255) NOT NULL,
+    "app" VARCHAR(100) NOT NULL,
+    "content" JSONB NOT NULL
+);"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS "alert_outbox";
+        DROP TABLE IF EXISTS "subscriptions";
+        DROP TABLE IF EXISTS "customers";
+        DROP TABLE IF EXISTS "cities";
+        DROP TABLE IF EXISTS "tours";"""